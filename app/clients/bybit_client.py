@@ -1,5 +1,21 @@
+from __future__ import annotations
+import asyncio
+import random
+import time
+from typing import TYPE_CHECKING
+
 import httpx
-import pandas as pd
+
+from app.services.metrics import UPSTREAM_REQUESTS, UPSTREAM_RETRIES, UPSTREAM_SECONDS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+try:  # HTTP/2 needs the optional `h2` package (pip install httpx[http2])
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 BASE_URL = "https://api.bybit.com"
 INTERVAL_MAP = {
@@ -7,28 +23,175 @@ INTERVAL_MAP = {
     "1h":"60","2h":"120","4h":"240","6h":"360","12h":"720",
     "d":"D","w":"W","m":"M",
 }
+CATEGORIES = ("linear", "spot")
+RATE_LIMITED_CODES = {10006, 10018}  # "too many visits" / IP rate limit
+RETRY_STATUS = {403, 429, 500, 502, 503, 504}  # Bybit answers IP throttling with 403
+SYMBOL_NOT_FOUND_CODES = {10001, 170121}  # "params error: symbol invalid" / spot "Invalid symbol"
 
 def to_bybit_interval(interval: str) -> str:
     return INTERVAL_MAP.get(interval.lower(), interval)
 
-async def fetch_klines(symbol: str, interval: str, limit: int = 400) -> pd.DataFrame:
-    bybit_int = to_bybit_interval(interval)
-    url = f"{BASE_URL}/v5/market/kline"
-    params = {"category":"linear","symbol":symbol,"interval":bybit_int,"limit":min(limit,1000)}
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.get(url, params=params)
-        data = r.json()
-        if r.status_code != 200 or data.get("retCode") != 0:
-            params["category"] = "spot"
-            r = await client.get(url, params=params)
-            r.raise_for_status()
-            data = r.json()
-            if data.get("retCode") != 0:
-                raise RuntimeError(f"Bybit error: {data}")
-    rows = list(reversed(data["result"]["list"]))
+def _to_frame(rows: list) -> pd.DataFrame:
+    import pandas as pd  # not needed to import the app, only once klines arrive
+    rows = list(reversed(rows))
     df = pd.DataFrame(rows, columns=["open_time","open","high","low","close","volume","turnover"])
-    df["open_time"] = pd.to_datetime(df["open_time"], unit="ms")
+    df["open_time"] = pd.to_datetime(pd.to_numeric(df["open_time"]), unit="ms")
     for col in ["open","high","low","close","volume"]:
         df[col] = pd.to_numeric(df[col], errors="coerce")
     df = df.dropna().reset_index(drop=True)
     return df[["open_time","open","high","low","close","volume"]]
+
+class AdaptiveRateLimiter:
+    """Paces requests to `rate` per second and adapts to Bybit's rate-limit feedback.
+
+    X-Bapi-Limit-Status / X-Bapi-Limit shrink the rate as the window drains, the reset
+    timestamp pauses everyone once it is exhausted, a throttled response halves the rate,
+    and every clean response creeps back up towards `max_rate`.
+    """
+
+    def __init__(self, rate: float = 10.0, max_rate: float | None = None, min_rate: float = 0.5):
+        self.rate = rate
+        self.max_rate = max_rate or rate
+        self.min_rate = min_rate
+        self._next = 0.0
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next, self._paused_until)
+            self._next = slot + 1.0 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def observe(self, headers: httpx.Headers, throttled: bool = False):
+        remaining, limit = headers.get("X-Bapi-Limit-Status"), headers.get("X-Bapi-Limit")
+        reset_ms = headers.get("X-Bapi-Limit-Reset-Timestamp")
+        wait = max(int(reset_ms) / 1000.0 - time.time(), 0.0) if reset_ms and reset_ms.isdigit() else 1.0
+        if throttled:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.pause(wait)
+            return
+        if remaining and limit and remaining.isdigit() and limit.isdigit() and int(limit) > 0:
+            left = int(remaining) / int(limit)
+            if int(remaining) <= 1:
+                self.pause(wait)
+            if left < 0.2:
+                self.rate = max(self.min_rate, self.rate * 0.8)
+                return
+        self.rate = min(self.max_rate, self.rate + 0.25)
+
+class BybitClient:
+    """Long-lived Bybit REST client: one pooled connection set + per-symbol category cache."""
+
+    def __init__(self, base_url: str = BASE_URL, timeout: float = 30.0,
+                 max_connections: int = 32, max_keepalive: int = 16, keepalive_expiry: float = 60.0,
+                 transport: httpx.AsyncBaseTransport | None = None,
+                 limiter: AdaptiveRateLimiter | None = None, retries: int = 3, backoff: float = 0.5):
+        self.base_url = base_url
+        self.limiter = limiter or AdaptiveRateLimiter()
+        self.retries = retries
+        self.backoff = backoff
+        self._transport = transport
+        self._timeout = timeout
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._http: httpx.AsyncClient | None = None
+        self._categories: dict[str, str] = {}
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self._timeout,
+                limits=self._limits, http2=HTTP2_AVAILABLE, transport=self._transport,
+            )
+        return self._http
+
+    def category_for(self, symbol: str) -> str | None:
+        return self._categories.get(symbol.upper())
+
+    async def aclose(self):
+        if self._http is not None and not self._http.is_closed:
+            await self._http.aclose()
+        self._http = None
+
+    async def _kline_request(self, category: str, params: dict) -> tuple[httpx.Response, dict]:
+        # Rate-limited GET; throttling, 5xx and transport errors are retried with jittered backoff
+        for attempt in range(self.retries + 1):
+            await self.limiter.acquire()
+            t0 = time.perf_counter()
+            try:
+                r = await self.http.get("/v5/market/kline", params={**params, "category": category})
+            except httpx.TransportError:
+                UPSTREAM_REQUESTS.inc(service="bybit", status="error")
+                if attempt == self.retries:
+                    raise
+                UPSTREAM_RETRIES.inc(service="bybit", reason="transport")
+                await asyncio.sleep(self.backoff * 2 ** attempt * (1 + random.random()))
+                continue
+            UPSTREAM_SECONDS.observe(time.perf_counter() - t0, service="bybit")
+            UPSTREAM_REQUESTS.inc(service="bybit", status=r.status_code)
+            try:
+                data = r.json()
+            except ValueError:
+                data = {}
+            throttled = r.status_code in (403, 429) or data.get("retCode") in RATE_LIMITED_CODES
+            self.limiter.observe(r.headers, throttled=throttled)
+            if (throttled or r.status_code in RETRY_STATUS) and attempt < self.retries:
+                UPSTREAM_RETRIES.inc(service="bybit", reason="throttled" if throttled else f"http_{r.status_code}")
+                await asyncio.sleep(self.backoff * 2 ** attempt * (1 + random.random()))
+                continue
+            return r, data
+        return r, data
+
+    async def fetch_kline_rows(self, symbol: str, interval: str, limit: int = 400,
+                               start: int | None = None, end: int | None = None) -> list:
+        params = {"symbol": symbol, "interval": to_bybit_interval(interval), "limit": min(limit, 1000)}
+        if start is not None:
+            params["start"] = int(start)
+        if end is not None:
+            params["end"] = int(end)
+        cached = self._categories.get(symbol.upper())
+        order = [cached] + [c for c in CATEGORIES if c != cached] if cached else list(CATEGORIES)
+        for i, category in enumerate(order):
+            r, data = await self._kline_request(category, params)
+            if r.status_code == 200 and data.get("retCode") == 0:
+                self._categories[symbol.upper()] = category
+                return data["result"]["list"]
+            # Only a symbol the category does not list moves on to the next one; throttling,
+            # 5xx and transport errors (raised above) keep the cached category
+            if data.get("retCode") not in SYMBOL_NOT_FOUND_CODES or i == len(order) - 1:
+                r.raise_for_status()
+                raise RuntimeError(f"Bybit error: {data}")
+        return []
+
+    async def fetch_klines(self, symbol: str, interval: str, limit: int = 400,
+                           start: int | None = None, end: int | None = None) -> pd.DataFrame:
+        return _to_frame(await self.fetch_kline_rows(symbol, interval, limit, start=start, end=end))
+
+# ---- shared instance (opened/closed by the FastAPI lifecycle in app.main) ----
+_shared: BybitClient | None = None
+
+def get_client() -> BybitClient:
+    global _shared
+    if _shared is None:
+        from app.config import settings
+        _shared = BybitClient(limiter=AdaptiveRateLimiter(rate=settings.bybit_rate_limit))
+    return _shared
+
+async def close_client():
+    global _shared
+    if _shared is not None:
+        await _shared.aclose()
+    _shared = None
+
+async def fetch_klines(symbol: str, interval: str, limit: int = 400) -> pd.DataFrame:
+    return await get_client().fetch_klines(symbol, interval, limit=limit)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import random
+from typing import Awaitable, Callable
+
+import numpy as np
+import pandas as pd
+
+from app.clients.bybit_client import INTERVAL_MAP, to_bybit_interval
+from app.indicators.buffer import Bars, CandleBuffer
+
+try:  # shipped with uvicorn[standard]; only needed when WS ingestion is enabled
+    import websockets
+except ImportError:
+    websockets = None
+
+log = logging.getLogger(__name__)
+
+WS_URLS = {
+    "linear": "wss://stream.bybit.com/v5/public/linear",
+    "spot": "wss://stream.bybit.com/v5/public/spot",
+}
+FROM_BYBIT_INTERVAL = {v: k for k, v in INTERVAL_MAP.items()}
+SUBSCRIBE_BATCH = 10  # Bybit spot accepts at most 10 args per subscribe request
+REST_PAGE = 1000  # bars per kline request when filling a gap
+
+OnClose = Callable[[str, str, Bars], Awaitable[None]]
+
+def kline_topic(symbol: str, timeframe: str) -> str:
+    return f"kline.{to_bybit_interval(timeframe)}.{symbol.upper()}"
+
+def parse_topic(topic: str) -> tuple[str, str]:
+    _, interval, symbol = topic.split(".", 2)
+    return symbol, FROM_BYBIT_INTERVAL.get(interval, interval)
+
+class KlineStream:
+    """Push-based kline ingestion for (symbols x timeframes) over Bybit's public WebSocket.
+
+    Confirmed bars go into a CandleBuffer per (symbol, timeframe) and
+    `on_close(symbol, timeframe, bars)` runs as soon as a candle closes, with a copy of the
+    buffer's window. Buffers are seeded from REST; after every reconnect the gap is paged
+    in from REST before resuming; `dtype=np.float32` nearly halves their footprint.
+    """
+
+    def __init__(self, symbols: list[str], timeframes: list[str], on_close: OnClose,
+                 client=None, url: str = WS_URLS["linear"], history: int = 500,
+                 ping_interval: float = 20.0, max_backoff: float = 60.0, dtype=np.float64):
+        if websockets is None:
+            raise RuntimeError("WebSocket ingestion needs the `websockets` package")
+        self.symbols = [s.upper() for s in symbols]
+        self.timeframes = list(timeframes)
+        self.on_close = on_close
+        self.client = client
+        self.url = url
+        self.history = history
+        self.ping_interval = ping_interval
+        self.max_backoff = max_backoff
+        self.buffers: dict[tuple[str, str], CandleBuffer] = {
+            (s, tf): CandleBuffer(history, dtype) for s in self.symbols for tf in self.timeframes
+        }
+        self.reconnects = 0
+        self._task: asyncio.Task | None = None
+        self._pending: set[asyncio.Task] = set()
+
+    # ---------- buffers ----------
+    def bars(self, symbol: str, timeframe: str) -> Bars:
+        # A copy: the buffer keeps taking bars while the consumer works on this one
+        return self.buffers[(symbol.upper(), timeframe)].window().copy()
+
+    def frame(self, symbol: str, timeframe: str) -> pd.DataFrame:
+        return self.bars(symbol, timeframe).to_frame()
+
+    def _append(self, key: tuple[str, str], bar: tuple) -> bool:
+        buf = self.buffers[key]
+        last = buf.last_open_time
+        if last is not None and bar[0] < last:
+            return False
+        return buf.update(*bar)
+
+    def _append_rows(self, key: tuple[str, str], df: pd.DataFrame) -> bool:
+        ot = df["open_time"].values.astype("datetime64[ms]").astype("i8")
+        ohlcv = df[["open", "high", "low", "close", "volume"]].to_numpy(float)
+        added = False
+        for i in range(len(df)):
+            added |= self._append(key, (int(ot[i]), *ohlcv[i]))
+        return added
+
+    async def _fill_from_rest(self, key: tuple[str, str]) -> bool:
+        # Append every bar that closed while we were not listening; the open one is left for the stream
+        if self.client is None:
+            return False
+        symbol, tf = key
+        start = self.buffers[key].last_open_time
+        if start is None:
+            df = await self.client.fetch_klines(symbol, tf, limit=self.history)
+            self._append_rows(key, df.iloc[:-1])
+            return False
+        # One request returns at most REST_PAGE bars, the newest of its range: page forward from
+        # the last stored bar so a long outage leaves no hole. Each page's last bar is held back
+        # and fetched again as the next page's first, so the still-open bar is never appended.
+        from app.services.resample import INTERVAL_MS
+        step = INTERVAL_MS.get(tf)
+        added = False
+        while True:
+            end = start + (REST_PAGE - 1) * step if step else None
+            df = await self.client.fetch_klines(symbol, tf, limit=REST_PAGE, start=start, end=end)
+            if len(df) < 2:
+                return added
+            added |= self._append_rows(key, df.iloc[:-1])
+            if step is None or len(df) < REST_PAGE:
+                return added
+            start = int(df["open_time"].values[-1].astype("datetime64[ms]").astype("i8"))
+
+    async def backfill(self):
+        results = await asyncio.gather(*(self._fill_from_rest(k) for k in self.buffers), return_exceptions=True)
+        for key, gap in zip(self.buffers, results):
+            if isinstance(gap, Exception):
+                log.warning("gap-fill %s failed: %r", key, gap)
+            elif gap:
+                self._emit(key)  # bars closed while disconnected: evaluate the latest once
+
+    # ---------- stream ----------
+    def _emit(self, key: tuple[str, str]):
+        t = asyncio.create_task(self.on_close(key[0], key[1], self.bars(*key)))
+        self._pending.add(t)
+        t.add_done_callback(self._pending.discard)
+
+    def handle_message(self, msg: dict):
+        topic = msg.get("topic") or ""
+        if not topic.startswith("kline."):
+            return
+        key = parse_topic(topic)
+        if key not in self.buffers:
+            return
+        for k in msg.get("data") or []:
+            if not k.get("confirm"):
+                continue
+            bar = (int(k["start"]), float(k["open"]), float(k["high"]), float(k["low"]), float(k["close"]), float(k["volume"]))
+            if self._append(key, bar):
+                self._emit(key)
+
+    async def _ping(self, ws):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send(json.dumps({"op": "ping"}))
+
+    async def _session(self):
+        async with websockets.connect(self.url, ping_interval=None) as ws:
+            topics = [kline_topic(s, tf) for (s, tf) in self.buffers]
+            for i in range(0, len(topics), SUBSCRIBE_BATCH):
+                await ws.send(json.dumps({"op": "subscribe", "args": topics[i:i + SUBSCRIBE_BATCH]}))
+            await self.backfill()
+            pinger = asyncio.create_task(self._ping(ws))
+            try:
+                async for raw in ws:
+                    try:
+                        self.handle_message(json.loads(raw))
+                    except (ValueError, KeyError, TypeError) as e:
+                        log.warning("bad kline message: %r", e)
+            finally:
+                pinger.cancel()
+
+    async def run(self):
+        attempt = 0
+        while True:
+            try:
+                await self._session()
+                attempt = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("kline stream dropped: %r", e)
+                attempt += 1
+            self.reconnects += 1
+            await asyncio.sleep(min(self.max_backoff, 0.5 * 2 ** attempt) * (0.5 + random.random() / 2))
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        pending = list(self._pending)
+        for t in pending:
+            t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
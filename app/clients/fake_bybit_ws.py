@@ -0,0 +1,88 @@
+"""Local stand-in for Bybit's public kline WebSocket that replays recorded messages.
+
+    python -m app.clients.fake_bybit_ws --recording tests/data/kline_btcusdt_1m.jsonl --port 8765
+    WS_INGEST=1 BYBIT_WS_URL=ws://127.0.0.1:8765 uvicorn app.main:app
+
+The recording is JSON lines of Bybit push messages ({"topic": "kline.1.BTCUSDT", "data": [...]}).
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+from pathlib import Path
+
+import websockets
+
+class FakeBybitWS:
+    def __init__(self, messages: list[dict], delay: float = 0.0, drop_after: int | None = None):
+        self.messages = messages
+        self.delay = delay
+        # Close each connection after N pushes; the next push is lost, as if sent while disconnected
+        self.drop_after = drop_after
+        self.connections = 0
+        self.server = None
+        self._cursor = 0  # replay position shared by all connections, like a live feed
+
+    @classmethod
+    def from_file(cls, path: str | Path, **kw) -> "FakeBybitWS":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls([json.loads(line) for line in f if line.strip()], **kw)
+
+    async def _replay(self, ws, topics: set[str]):
+        sent = 0
+        while self._cursor < len(self.messages):
+            msg = self.messages[self._cursor]
+            self._cursor += 1
+            if msg.get("topic") not in topics:
+                continue
+            if self.drop_after is not None and sent >= self.drop_after:
+                await ws.close()
+                return
+            await asyncio.sleep(self.delay)
+            await ws.send(json.dumps(msg))
+            sent += 1
+
+    async def _handler(self, ws, path=None):
+        self.connections += 1
+        conn = str(self.connections)
+        topics: set[str] = set()
+        task = None
+        try:
+            async for raw in ws:
+                req = json.loads(raw)
+                if req.get("op") == "ping":
+                    await ws.send(json.dumps({"success": True, "ret_msg": "pong", "op": "ping", "conn_id": conn}))
+                elif req.get("op") == "subscribe":
+                    topics.update(req.get("args") or [])
+                    await ws.send(json.dumps({"success": True, "ret_msg": "", "op": "subscribe", "conn_id": conn}))
+                    if task is None:
+                        task = asyncio.create_task(self._replay(ws, topics))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if task is not None:
+                task.cancel()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self.server = await websockets.serve(self._handler, host, port)
+        sock = next(iter(self.server.sockets))
+        return f"ws://{host}:{sock.getsockname()[1]}"
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+async def _main(args):
+    fake = FakeBybitWS.from_file(args.recording, delay=args.delay)
+    url = await fake.start(args.host, args.port)
+    print(f"replaying {len(fake.messages)} messages on {url}")
+    await asyncio.Future()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--recording", required=True)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--delay", type=float, default=0.5)
+    asyncio.run(_main(ap.parse_args()))
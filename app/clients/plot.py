@@ -1,23 +1,154 @@
 from __future__ import annotations
-import io, numpy as np, pandas as pd
+import io, threading, numpy as np, pandas as pd
 import matplotlib
 matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-
-def _candles(ax, df: pd.DataFrame):
-    o, h, l, c = df["open"].values, df["high"].values, df["low"].values, df["close"].values
-    x = np.arange(len(df))
-    up = c >= o
-    dn = ~up
-    w = 0.6
-    for i in range(len(df)):
-        ax.vlines(x[i], l[i], h[i], linewidth=0.8, alpha=0.7)
-    ax.bar(x[up], (c - o)[up], bottom=o[up], width=w, alpha=0.85)
-    ax.bar(x[dn], (o - c)[dn], bottom=c[dn], width=w, alpha=0.85)
-
-def _hband(ax, ylow: float, yhigh: float, x0: float, x1: float, alpha: float = 0.12, lw: float = 1.0):
-    ax.axhspan(ylow, yhigh, xmin=0, xmax=1, alpha=alpha)
-    ax.hlines([ylow, yhigh], x0, x1, linewidth=lw, alpha=0.8)
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+from PIL import Image
+
+BARS = 200
+BODY_WIDTH = 0.6
+# name -> (figsize inches, dpi); "full" matches the legacy chart (benchmarks/bench_plot.py)
+CHART_SIZES = {
+    "full": ((11, 5.2), 140),
+    "small": ((8, 3.8), 90),
+}
+EMA_STYLE = [("ema_fast", 1.2, "C0"), ("ema_mid", 1.4, "C1"), ("ema_slow", 1.6, "C2")]
+
+class ChartTemplate:
+    """A pre-built figure whose artists are updated in place for every chart.
+
+    Wicks are one LineCollection and bodies one PolyCollection, so a 200-bar chart is a
+    handful of artists instead of ~200. Layout is recomputed only when the price scale
+    (and with it the tick label width) changes.
+    """
+
+    def __init__(self, figsize: tuple[float, float], dpi: int):
+        self.dpi = dpi
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        ax = self.ax = self.fig.add_subplot()
+        ax.set_title(" ")
+        ax.grid(True, alpha=0.25)
+        self.wicks = LineCollection([], linewidths=0.8, alpha=0.7, colors="C0")
+        self.bodies = PolyCollection([], alpha=0.85, linewidths=0)
+        ax.add_collection(self.wicks)
+        ax.add_collection(self.bodies)
+        self.emas = {col: ax.plot([], [], linewidth=lw, alpha=0.95, color=color, label=col)[0]
+                     for col, lw, color in EMA_STYLE}
+        ytrans = ax.get_yaxis_transform()  # x in axes fraction, y in data, like axhspan
+        self.zones = {}
+        for name in ("demand", "supply"):
+            band = Rectangle((0, 0), 1, 0, transform=ytrans, alpha=0.16, facecolor="C0", visible=False)
+            ax.add_patch(band)
+            edges = LineCollection([], linewidths=1.0, alpha=0.8, colors="C0", visible=False)
+            ax.add_collection(edges)
+            label = ax.text(0, 0, name.capitalize(), va="center", ha="right", fontsize=9, alpha=0.9, visible=False)
+            self.zones[name] = (band, edges, label)
+        self.fib_line = ax.plot([], [], linewidth=1.6, alpha=0.95, linestyle="--", color="C0", visible=False)[0]
+        self.fib_text = ax.text(0, 0, "", va="bottom", ha="left", fontsize=9, alpha=0.95, visible=False)
+        self._legend_cols: tuple | None = None
+        self._layout_key = None
+        self.lock = threading.Lock()
+
+    def _candles(self, data: pd.DataFrame, x: np.ndarray):
+        o, h, low, c = (data[k].to_numpy(float) for k in ("open", "high", "low", "close"))
+        ok = np.isfinite(o) & np.isfinite(h) & np.isfinite(low) & np.isfinite(c)
+        x, o, h, low, c = x[ok], o[ok], h[ok], low[ok], c[ok]
+        self.wicks.set_segments(np.stack([np.c_[x, low], np.c_[x, h]], axis=1))
+        lo, hi = np.minimum(o, c), np.maximum(o, c)
+        x0, x1 = x - BODY_WIDTH / 2, x + BODY_WIDTH / 2
+        self.bodies.set_verts(np.stack([np.c_[x0, lo], np.c_[x0, hi], np.c_[x1, hi], np.c_[x1, lo]], axis=1))
+        self.bodies.set_facecolor(np.where(c >= o, "C0", "C1"))
+        return [low, h]
+
+    def render(self, df: pd.DataFrame, symbol: str, timeframe: str, fib: dict | None = None,
+               zones: dict | None = None, quantize: bool = False) -> bytes:
+        data = df.tail(BARS)
+        n = len(data)
+        x = np.arange(n, dtype=float)
+        x0, x1 = 0, n - 1 if n else 1
+        ax = self.ax
+        ax.title.set_text(f"{symbol} · {timeframe}")
+
+        extent = self._candles(data, x)
+        shown = []
+        for col, line in self.emas.items():
+            has = col in data
+            line.set_visible(has)
+            if has:
+                y = data[col].to_numpy(float)
+                line.set_data(x, y)
+                extent.append(y)
+                shown.append(col)
+
+        zones = zones if isinstance(zones, dict) else {}
+        for name, (band, edges, label) in self.zones.items():
+            z = zones.get(name) or {}
+            vis = z.get("low") is not None and z.get("high") is not None
+            for a in (band, edges, label):
+                a.set_visible(vis)
+            if vis:
+                lo, hi = float(z["low"]), float(z["high"])
+                band.set_y(lo)
+                band.set_height(hi - lo)
+                edges.set_segments([[(x0, lo), (x1, lo)], [(x0, hi), (x1, hi)]])
+                label.set_position((x1, (lo + hi) / 2.0))
+                extent.append(np.array([lo, hi]))
+
+        has_fib = isinstance(fib, dict) and fib.get("level") is not None
+        self.fib_line.set_visible(has_fib)
+        self.fib_text.set_visible(has_fib)
+        if has_fib:
+            lvl = float(fib["level"])
+            self.fib_line.set_data([x0, x1], [lvl, lvl])
+            self.fib_text.set_position((x0, lvl))
+            self.fib_text.set_text(f"Fib 0.31 {lvl:.2f} ({fib.get('direction', '')})")
+            extent.append(np.array([lvl]))
+
+        if tuple(shown) != self._legend_cols:
+            if shown:
+                ax.legend(handles=[self.emas[c] for c in shown], loc="upper left")
+            elif ax.get_legend() is not None:
+                ax.get_legend().remove()
+            self._legend_cols = tuple(shown)
+
+        vals = np.concatenate(extent) if extent else np.empty(0)
+        vals = vals[np.isfinite(vals)]
+        if len(vals):
+            ymin, ymax = float(vals.min()), float(vals.max())
+            pad = (ymax - ymin) * 0.05 or abs(ymax) * 0.01 or 1.0
+            ax.set_ylim(ymin - pad, ymax + pad)
+        ax.set_xlim(0, max(x1, 1))
+
+        # Tick labels only get wider/narrower when the magnitude of the prices changes
+        layout_key = (int(np.floor(np.log10(abs(ymax)))) if len(vals) and ymax else 0, tuple(shown) != ())
+        if layout_key != self._layout_key:
+            self.fig.tight_layout()
+            self._layout_key = layout_key
+
+        self.canvas.draw()
+        img = Image.frombuffer("RGBA", self.canvas.get_width_height(), self.canvas.buffer_rgba(), "raw", "RGBA", 0, 1)
+        buf = io.BytesIO()
+        if quantize:
+            # Flat chart colours survive a 64-colour palette; the PNG shrinks several-fold
+            img.convert("RGB").quantize(64, method=Image.Quantize.FASTOCTREE).save(buf, format="PNG")
+        else:
+            img.convert("RGB").save(buf, format="PNG", compress_level=3)
+        return buf.getvalue()
+
+_templates: dict[str, ChartTemplate] = {}
+_templates_lock = threading.Lock()
+
+def get_template(size: str = "full") -> ChartTemplate:
+    with _templates_lock:
+        tpl = _templates.get(size)
+        if tpl is None:
+            figsize, dpi = CHART_SIZES[size]
+            tpl = _templates[size] = ChartTemplate(figsize, dpi)
+        return tpl
 
 def plot_chart(
     df: pd.DataFrame,
@@ -25,41 +156,10 @@ def plot_chart(
     timeframe: str,
     fib: dict | None = None,
     zones: dict | None = None,
+    size: str = "full",
+    quantize: bool = False,
 ) -> bytes:
-    data = df.tail(200).reset_index(drop=True) if len(df) > 200 else df.copy().reset_index(drop=True)
-    fig, ax = plt.subplots(figsize=(11, 5.2), dpi=140)
-    ax.set_title(f"{symbol} · {timeframe}")
-
-    _candles(ax, data)
-
-    for col, lw in [("ema_fast", 1.2), ("ema_mid", 1.4), ("ema_slow", 1.6)]:
-        if col in data:
-            ax.plot(data.index, data[col].values, linewidth=lw, alpha=0.95, label=col)
-
-    x0, x1 = 0, len(data) - 1 if len(data) else 1
-
-    if zones and isinstance(zones, dict):
-        dem = zones.get("demand") or {}
-        sup = zones.get("supply") or {}
-        if dem.get("low") is not None and dem.get("high") is not None:
-            _hband(ax, float(dem["low"]), float(dem["high"]), x0, x1, alpha=0.16, lw=1.0)
-            ax.text(x1, (dem["low"] + dem["high"]) / 2.0, "Demand", va="center", ha="right", fontsize=9, alpha=0.9)
-        if sup.get("low") is not None and sup.get("high") is not None:
-            _hband(ax, float(sup["low"]), float(sup["high"]), x0, x1, alpha=0.16, lw=1.0)
-            ax.text(x1, (sup["low"] + sup["high"]) / 2.0, "Supply", va="center", ha="right", fontsize=9, alpha=0.9)
-
-    if fib and isinstance(fib, dict) and fib.get("level") is not None:
-        lvl = float(fib["level"])
-        ax.hlines(lvl, x0, x1, linewidth=1.6, alpha=0.95, linestyles="--")
-        dir_txt = fib.get("direction", "")
-        ax.text(x0, lvl, f"Fib 0.31 {lvl:.2f} ({dir_txt})", va="bottom", ha="left", fontsize=9, alpha=0.95)
-
-    ax.grid(True, alpha=0.25)
-    ax.legend(loc="upper left")
-    ax.set_xlim(0, max(x1, 1))
-    buf = io.BytesIO()
-    plt.tight_layout()
-    fig.savefig(buf, format="png")
-    plt.close(fig)
-    buf.seek(0)
-    return buf.read()
\ No newline at end of file
+    """Render the alert chart as PNG bytes; `size="small"` / `quantize=True` trade detail for speed and bytes."""
+    tpl = get_template(size)
+    with tpl.lock:  # a template's artists are shared state
+        return tpl.render(df, symbol, timeframe, fib=fib, zones=zones, quantize=quantize)
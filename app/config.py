@@ -15,5 +15,21 @@ class Settings(BaseModel):
     telegram_chat_id: str | None = os.getenv("TELEGRAM_CHAT_ID")
     risk_reward: float = float(os.getenv("RISK_REWARD", "3.0"))
     port: int = int(os.getenv("PORT", "7000"))
+    # Scheduler dispatch: concurrent Bybit fetches per tick and the starting request rate (req/s)
+    scheduler_concurrency: int = int(os.getenv("SCHEDULER_CONCURRENCY", "8"))
+    bybit_rate_limit: float = float(os.getenv("BYBIT_RATE_LIMIT", "10"))
+    # Push ingestion over Bybit's kline WebSocket instead of the cron polling
+    ws_ingest: bool = os.getenv("WS_INGEST", "0").lower() in ("1", "true", "yes")
+    bybit_ws_url: str = os.getenv("BYBIT_WS_URL", "wss://stream.bybit.com/v5/public/linear")
+    # Preload candles and indicator state for every configured series at startup (/api/ready waits for it)
+    warmup: bool = os.getenv("WARMUP", "1").lower() in ("1", "true", "yes")
+
+    # Alert chart output: "full" (legacy size) or "small", optionally palette-quantized PNG
+    chart_size: str = os.getenv("CHART_SIZE", "full")
+    chart_quantize: bool = os.getenv("CHART_QUANTIZE", "0").lower() in ("1", "true", "yes")
+    # Executors: threads for NumPy/pandas stages, processes for matplotlib (which holds the
+    # GIL for a whole render); RENDER_PROCESSES=0 renders on the thread pool instead
+    cpu_threads: int = int(os.getenv("CPU_THREADS", str(min(4, os.cpu_count() or 1))))
+    render_processes: int = int(os.getenv("RENDER_PROCESSES", "1"))
 
 settings = Settings()
\ No newline at end of file
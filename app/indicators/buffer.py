@@ -0,0 +1,191 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+OHLCV = ("open", "high", "low", "close", "volume")
+
+def open_time_ms(data) -> np.ndarray:
+    """open_time of a kline frame or Bars as int64 epoch ms (positions when there is none)."""
+    if isinstance(data, (Bars, CandleBuffer)):
+        return data["open_time"]
+    ot = data["open_time"] if "open_time" in data.columns else pd.Series(np.arange(len(data)))
+    if pd.api.types.is_datetime64_any_dtype(ot):
+        return ot.values.astype("datetime64[ms]").astype("i8")
+    return ot.to_numpy(dtype="i8")
+
+class Bars:
+    """Column arrays of one candle window: what the hot path passes instead of a DataFrame.
+
+    `open_time` is int64 epoch ms, every other column a 1-D float array of the same length.
+    Arrays are shared, not copied; a window of a CandleBuffer is only valid until the
+    buffer's next write, so `copy()` it to keep it.
+    """
+    __slots__ = ("_cols",)
+
+    def __init__(self, cols: dict[str, np.ndarray]):
+        self._cols = cols
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> Bars:
+        cols = {"open_time": open_time_ms(df)}
+        for c in df.columns:
+            if c != "open_time":
+                cols[c] = df[c].to_numpy()
+        return cls(cols)
+
+    @property
+    def columns(self) -> tuple[str, ...]:
+        return tuple(self._cols)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(v.nbytes for v in self._cols.values())
+
+    def __len__(self) -> int:
+        return len(self._cols["open_time"])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._cols[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._cols
+
+    def get(self, name: str, default=None):
+        return self._cols.get(name, default)
+
+    def tail(self, n: int) -> Bars:
+        start = max(len(self) - n, 0)
+        return Bars({c: v[start:] for c, v in self._cols.items()})
+
+    def assign(self, **cols: np.ndarray) -> Bars:
+        return Bars({**self._cols, **cols})
+
+    def copy(self) -> Bars:
+        return Bars({c: v.copy() for c, v in self._cols.items()})
+
+    def to_frame(self) -> pd.DataFrame:
+        # For the API boundary; shares the arrays like everything else here
+        cols = dict(self._cols)
+        cols["open_time"] = np.asarray(cols["open_time"], dtype="i8").view("datetime64[ms]")
+        return pd.DataFrame(cols, copy=False)
+
+class CandleBuffer:
+    """Fixed-capacity ring of candles, one array per column (float64 or float32).
+
+    Every row is written twice, at `i` and `i + capacity`, so the newest k <= capacity
+    rows are always one contiguous slice: appending and replacing the still-open bar are
+    O(1) and `window()` hands out views without copying or compacting. `extra` columns
+    (e.g. indicator values) ride along and read NaN until written.
+    """
+    __slots__ = ("capacity", "dtype", "columns", "_ot", "_cols", "_n")
+
+    def __init__(self, capacity: int = 1000, dtype=np.float64, extra: tuple[str, ...] = ()):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        self.columns = ("open_time",) + OHLCV + tuple(extra)
+        self._ot = np.zeros(2 * capacity, dtype="i8")
+        self._cols = np.full((len(self.columns) - 1, 2 * capacity), np.nan, dtype=self.dtype)
+        self._n = 0  # rows written; the next one goes to _n % capacity
+
+    @classmethod
+    def from_frame(cls, df, capacity: int | None = None, dtype=np.float64) -> CandleBuffer:
+        buf = cls(capacity or max(len(df), 1), dtype)
+        buf.extend(df)
+        return buf
+
+    def __len__(self) -> int:
+        return min(self._n, self.capacity)
+
+    @property
+    def nbytes(self) -> int:
+        return self._ot.nbytes + self._cols.nbytes
+
+    @property
+    def last_open_time(self) -> int | None:
+        return int(self._ot[(self._n - 1) % self.capacity]) if self._n else None
+
+    def clear(self):
+        self._n = 0
+
+    def _write(self, pos: int, open_time: int, values: tuple):
+        if len(values) > len(self._cols):
+            raise ValueError(f"expected at most {len(self._cols)} values, got {len(values)}")
+        row = np.full(len(self._cols), np.nan)
+        row[:len(values)] = values
+        self._ot[pos] = self._ot[pos + self.capacity] = open_time
+        self._cols[:, pos] = self._cols[:, pos + self.capacity] = row
+
+    def append(self, open_time: int, *values: float):
+        """Add a bar after the newest one; `values` follow `columns` after open_time."""
+        last = self.last_open_time
+        if last is not None and open_time <= last:
+            raise ValueError("bars must be appended in open_time order")
+        self._write(self._n % self.capacity, int(open_time), values)
+        self._n += 1
+
+    def replace_last(self, open_time: int, *values: float):
+        if not self._n:
+            raise IndexError("replace_last on an empty buffer")
+        self._write((self._n - 1) % self.capacity, int(open_time), values)
+
+    def update(self, open_time: int, *values: float) -> bool:
+        """Append a new bar or replace the still-open last one; True when a bar was added."""
+        if self._n and open_time == self.last_open_time:
+            self.replace_last(open_time, *values)
+            return False
+        self.append(open_time, *values)
+        return True
+
+    def extend(self, data) -> int:
+        """Bulk update from a kline frame or Bars; bars older than the last one are ignored."""
+        ot = open_time_ms(data)
+        last = self.last_open_time
+        start = 0 if last is None else int(np.searchsorted(ot, last, side="left"))
+        if start < len(ot) and ot[start] == last:
+            self.replace_last(ot[start], *(np.asarray(data[c])[start] if c in data.columns else np.nan
+                                           for c in self.columns[1:]))
+            start += 1
+        fresh = ot[start:][-self.capacity:]
+        k = len(fresh)
+        if k:
+            first = len(ot) - k
+            pos = (self._n + np.arange(k)) % self.capacity
+            self._ot[pos] = self._ot[pos + self.capacity] = fresh
+            for j, c in enumerate(self.columns[1:]):
+                v = np.asarray(data[c], dtype=self.dtype)[first:] if c in data.columns else np.nan
+                self._cols[j, pos] = self._cols[j, pos + self.capacity] = v
+            self._n += k
+        return len(ot) - start
+
+    def _slice(self, n: int | None = None) -> slice:
+        size = len(self)
+        k = size if n is None else max(0, min(n, size))
+        end = (self._n - 1) % self.capacity + self.capacity + 1 if self._n else self.capacity
+        return slice(end - k, end)
+
+    def window(self, n: int | None = None) -> Bars:
+        """Zero-copy view of the newest `n` bars (all of them by default)."""
+        sl = self._slice(n)
+        cols = {"open_time": self._ot[sl]}
+        for j, c in enumerate(self.columns[1:]):
+            cols[c] = self._cols[j, sl]
+        return Bars(cols)
+
+    # The Bars interface over the whole window, so callers need not tell the two apart
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in self.columns:
+            raise KeyError(name)
+        if name == "open_time":
+            return self._ot[self._slice()]
+        return self._cols[self.columns.index(name) - 1, self._slice()]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def tail(self, n: int) -> Bars:
+        return self.window(n)
+
+    def to_frame(self) -> pd.DataFrame:
+        return self.window().copy().to_frame()
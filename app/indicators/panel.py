@@ -0,0 +1,170 @@
+from __future__ import annotations
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.indicators.buffer import OHLCV, Bars, open_time_ms
+from app.indicators.ta import IndicatorParams
+
+ATR_LEN = 14
+
+@dataclass
+class Panel:
+    """OHLCV for many symbols aligned on a shared open_time axis: arrays are (symbols x bars)."""
+    symbols: list[str]
+    open_time: np.ndarray  # int64 epoch ms, shape (bars,)
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def bars(self, i: int, ind: dict[str, np.ndarray] | None = None) -> Bars:
+        # One symbol's row as compute_indicators-shaped Bars, no copies. Leading padding is
+        # dropped, and so is trailing padding: a symbol whose newest bar has not arrived yet
+        # ends at its own last bar
+        valid = np.flatnonzero(~np.isnan(self.close[i]))
+        start, end = (int(valid[0]), int(valid[-1]) + 1) if len(valid) else (0, 0)
+        cols = {"open_time": self.open_time[start:end]}
+        for c in OHLCV:
+            cols[c] = getattr(self, c)[i, start:end]
+        for k, v in (ind or {}).items():
+            cols[k] = v[i, start:end]
+        return Bars(cols)
+
+    def frame(self, i: int, ind: dict[str, np.ndarray] | None = None) -> pd.DataFrame:
+        return self.bars(i, ind).to_frame()
+
+def build_panel(frames: dict, limit: int | None = None) -> Panel:
+    """Align per-symbol kline frames (or Bars) by open_time; bars a symbol does not have are NaN."""
+    symbols = list(frames)
+    ots = {s: open_time_ms(df) for s, df in frames.items()}
+    axis = np.unique(np.concatenate(list(ots.values()))) if ots else np.empty(0, dtype="i8")
+    if limit:
+        axis = axis[-limit:]
+    shape = (len(symbols), len(axis))
+    out = {c: np.full(shape, np.nan) for c in ("open", "high", "low", "close", "volume")}
+    for i, s in enumerate(symbols):
+        if not len(axis):
+            break
+        keep = ots[s] >= axis[0]  # bars cut off by `limit`
+        pos = np.searchsorted(axis, ots[s][keep])
+        for c, arr in out.items():
+            arr[i, pos] = np.asarray(frames[s][c], dtype=float)[keep]
+    return Panel(symbols, axis, **out)
+
+def ewm_panel(x: np.ndarray, alpha: np.ndarray | float) -> np.ndarray:
+    """Row-wise `ewm(alpha, adjust=False).mean()` with pandas' exact update rule.
+
+    Every row may have its own alpha, so several EMAs of the whole symbol universe advance
+    together in one pass over the bars.
+    """
+    rows, n = x.shape
+    a = np.broadcast_to(np.asarray(alpha, dtype=float), (rows,))
+    out = np.empty_like(x, dtype=float)
+    w = np.full(rows, np.nan)
+    old_wt = np.ones(rows)
+    for t in range(n):
+        xt = x[:, t]
+        obs = ~np.isnan(xt)
+        started = ~np.isnan(w)
+        old_wt = np.where(started, old_wt * (1.0 - a), old_wt)
+        upd = started & obs & (w != xt)
+        w = np.where(upd, (old_wt * w + a * xt) / (old_wt + a), w)
+        w = np.where(~started & obs, xt, w)
+        old_wt = np.where(obs, 1.0, old_wt)
+        out[:, t] = w
+    return out
+
+def _rolling(x: np.ndarray, n: int, fn) -> np.ndarray:
+    # rolling(n) with min_periods=n: any NaN in the window yields NaN
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] >= n:
+        out[:, n - 1:] = fn(sliding_window_view(x, n, axis=1), axis=2)
+    return out
+
+def compute_panel(panel: Panel, p: IndicatorParams) -> dict[str, np.ndarray]:
+    """compute_indicators for every symbol at once; each output is (symbols x bars)."""
+    close, high, low = panel.close, panel.high, panel.low
+    S = close.shape[0]
+    prev_close = np.concatenate([np.full((S, 1), np.nan), close[:, :-1]], axis=1)
+    delta = close - prev_close
+    with np.errstate(invalid="ignore"):
+        up = np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None))
+        down = np.where(np.isnan(delta), np.nan, -np.clip(delta, None, 0))
+    tr = np.fmax(np.fmax(np.abs(high - low), np.abs(high - prev_close)), np.abs(low - prev_close))
+
+    # All first-stage recursions share one pass: 5 close EMAs, Wilder RSI up/down and ATR
+    spans = [p.ema_fast, p.ema_mid, p.ema_slow, p.macd_fast, p.macd_slow]
+    stacked = np.concatenate([close] * 5 + [up, down, tr], axis=0)
+    alphas = np.concatenate([np.full(S, 2 / (sp + 1)) for sp in spans]
+                            + [np.full(S, 1 / p.rsi_len)] * 2 + [np.full(S, 1 / ATR_LEN)])
+    ew = ewm_panel(stacked, alphas).reshape(8, S, -1)
+    ema_fast, ema_mid, ema_slow, macd_f, macd_s, roll_up, roll_down, atr = ew
+
+    macd = macd_f - macd_s
+    macd_signal = ewm_panel(macd, 2 / (p.macd_signal + 1))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = roll_up / np.where(roll_down == 0, np.nan, roll_down)
+        rsi = 100 - (100 / (1 + rs))
+        min_rsi = _rolling(rsi, p.stoch_len, np.min)
+        max_rsi = _rolling(rsi, p.stoch_len, np.max)
+        stoch_rsi = (rsi - min_rsi) / (max_rsi - min_rsi)
+        stoch_k = _rolling(stoch_rsi, p.stoch_k, np.mean)
+        stoch_d = _rolling(stoch_k, p.stoch_d, np.mean)
+
+    return {
+        "ema_fast": ema_fast, "ema_mid": ema_mid, "ema_slow": ema_slow,
+        "macd": macd, "macd_signal": macd_signal,
+        "stoch_k": stoch_k, "stoch_d": stoch_d, "atr": atr,
+    }
+
+def confirmed_cross_panel(a: np.ndarray, b: np.ndarray, end: np.ndarray | None = None) -> np.ndarray:
+    """Row-wise `_last_cross_confirmed` over the last three bars: +1 / -1 / 0 per symbol.
+
+    `end` (per row, exclusive) evaluates each row at its own last bar instead of the axis end.
+    """
+    rows, n = a.shape
+    end = np.full(rows, n) if end is None else np.asarray(end)
+    cols = np.clip(end[:, None] + np.arange(-3, 0), 0, max(n - 1, 0))
+    if n == 0:
+        return np.zeros(rows, dtype=np.int8)
+    d = np.take_along_axis(a, cols, axis=1) - np.take_along_axis(b, cols, axis=1)
+    d2, d1, d0 = d[:, 0], d[:, 1], d[:, 2]
+    up = (d2 <= 0) & (d1 > 0) & (d0 > 0)
+    down = (d2 >= 0) & (d1 < 0) & (d0 < 0)
+    return np.where(end < 3, 0, np.where(up, 1, np.where(down, -1, 0))).astype(np.int8)
+
+def make_signal_panel(panel: Panel, ind: dict[str, np.ndarray], timeframe: str, params: IndicatorParams,
+                      risk_reward: float = 3.0, decision_threshold: float = 1.0, swing_window: int = 5) -> list[dict]:
+    """make_signal for every symbol of the panel; returns one signal dict per panel.symbols entry."""
+    from app.strategies.rules import _stoch_rsi_divergence, neutral_signal, signal_from_votes
+
+    has_bar = ~np.isnan(panel.close)
+    n = panel.close.shape[1]
+    # per-symbol frames run from the symbol's first to its last bar, as they would in
+    # make_signal: a symbol whose newest bar is late is evaluated at the bar it has
+    first = np.where(has_bar.any(axis=1), has_bar.argmax(axis=1), n)
+    end = np.where(has_bar.any(axis=1), n - has_bar[:, ::-1].argmax(axis=1), 0)
+    ema_fm = confirmed_cross_panel(ind["ema_fast"], ind["ema_mid"], end)
+    ema_ms = confirmed_cross_panel(ind["ema_mid"], ind["ema_slow"], end)
+    macd = confirmed_cross_panel(ind["macd"], ind["macd_signal"], end)
+
+    out = []
+    for i in range(len(panel.symbols)):
+        start, stop = int(first[i]), int(end[i])
+        if stop - start < 30:
+            out.append(neutral_signal(timeframe))
+            continue
+        last = panel.close[i, stop - 1]
+        votes = {
+            "EMA 35/75": int(ema_fm[i]),
+            "EMA 75/200": int(ema_ms[i]),
+            "MACD Cross": int(macd[i]),
+            "StochRSI Divergence": _stoch_rsi_divergence(panel.close[i, start:stop], ind["stoch_k"][i, start:stop],
+                                                         win=swing_window),
+        }
+        out.append(signal_from_votes(timeframe, None if np.isnan(last) else float(last), votes, decision_threshold))
+    return out
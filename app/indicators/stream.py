@@ -0,0 +1,248 @@
+from __future__ import annotations
+import math
+import threading
+from collections import deque
+from dataclasses import astuple
+import numpy as np
+import pandas as pd
+
+from app.indicators.buffer import Bars, CandleBuffer, open_time_ms
+from app.indicators.ta import IndicatorParams
+
+NAN = float("nan")
+CANDLE_COLS = ["open_time", "open", "high", "low", "close", "volume"]
+INDICATOR_COLS = ["ema_fast", "ema_mid", "ema_slow", "macd", "macd_signal", "stoch_k", "stoch_d", "atr"]
+ATR_LEN = 14
+
+class _Ewm:
+    """Recursive state of `Series.ewm(alpha=..., adjust=False).mean()` (pandas' exact update rule)."""
+    __slots__ = ("alpha", "value", "old_wt", "prev_value", "prev_wt")
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.value = NAN
+        self.old_wt = 1.0
+        self.prev_value, self.prev_wt = NAN, 1.0  # state before the last push, for `replace`
+
+    def push(self, x: float, replace: bool = False) -> float:
+        # replace=True recomputes the last push with a new value (the still-open bar)
+        if replace:
+            self.value, self.old_wt = self.prev_value, self.prev_wt
+        else:
+            self.prev_value, self.prev_wt = self.value, self.old_wt
+        if math.isnan(self.value):
+            if not math.isnan(x):
+                self.value, self.old_wt = x, 1.0
+            return self.value
+        self.old_wt *= 1.0 - self.alpha  # NaN gaps keep decaying the old weight (ignore_na=False)
+        if not math.isnan(x):
+            if self.value != x:
+                self.value = (self.old_wt * self.value + self.alpha * x) / (self.old_wt + self.alpha)
+            self.old_wt = 1.0
+        return self.value
+
+class _Window:
+    """`rolling(n).min/max/mean()` with pandas' default min_periods=n, O(1) amortized per bar.
+
+    The newest value stays pending, so the still-open bar is replaced without undoing
+    anything; the n-1 values before it live in monotonic deques (min/max) and a
+    compensated running sum with a NaN count (mean), as pandas' own rolling kernels do.
+    """
+    __slots__ = ("n", "ring", "lo", "hi", "sum", "comp", "nans", "seen", "pending")
+
+    def __init__(self, n: int):
+        self.n = n
+        self.ring: deque = deque()  # committed values, at most n-1
+        self.lo: deque = deque()  # (index, value), values increasing from the front
+        self.hi: deque = deque()  # (index, value), values decreasing from the front
+        self.sum = self.comp = 0.0  # Kahan sum of the committed non-NaN values
+        self.nans = 0
+        self.seen = 0
+        self.pending: float | None = None
+
+    def _add(self, x: float):
+        y = x - self.comp
+        t = self.sum + y
+        self.comp = (t - self.sum) - y
+        self.sum = t
+
+    def _commit(self, x: float):
+        i = self.seen
+        self.seen += 1
+        self.ring.append(x)
+        if math.isnan(x):
+            self.nans += 1
+        else:
+            self._add(x)
+            while self.lo and self.lo[-1][1] >= x:
+                self.lo.pop()
+            self.lo.append((i, x))
+            while self.hi and self.hi[-1][1] <= x:
+                self.hi.pop()
+            self.hi.append((i, x))
+        if len(self.ring) == self.n:
+            old = self.ring.popleft()
+            if math.isnan(old):
+                self.nans -= 1
+            else:
+                self._add(-old)
+            first = self.seen - (self.n - 1)
+            while self.lo and self.lo[0][0] < first:
+                self.lo.popleft()
+            while self.hi and self.hi[0][0] < first:
+                self.hi.popleft()
+        if self.nans == len(self.ring):
+            self.sum = self.comp = 0.0  # nothing left to sum: drop the accumulated rounding
+
+    def push(self, x: float, replace: bool = False):
+        if not replace and self.pending is not None:
+            self._commit(self.pending)
+        self.pending = x
+
+    def _full(self) -> bool:
+        return (self.pending is not None and len(self.ring) == self.n - 1 and self.nans == 0
+                and not math.isnan(self.pending))
+
+    def min(self) -> float:
+        if not self._full():
+            return NAN
+        return min(self.lo[0][1], self.pending) if self.lo else self.pending
+
+    def max(self) -> float:
+        if not self._full():
+            return NAN
+        return max(self.hi[0][1], self.pending) if self.hi else self.pending
+
+    def mean(self) -> float:
+        return (self.sum + self.pending) / self.n if self._full() else NAN
+
+def _div(a: float, b: float) -> float:
+    # numpy/pandas float semantics instead of ZeroDivisionError
+    if b == 0.0:
+        return NAN if (a == 0.0 or math.isnan(a)) else math.copysign(math.inf, a)
+    return a / b
+
+class IndicatorEngine:
+    """O(1)-per-bar equivalent of `compute_indicators` for one (symbol, timeframe, params).
+
+    Bars are fed in open_time order; feeding a bar with the same open_time as the last one
+    replaces it (the still-open candle), which rolls the state back one step first.
+    """
+
+    def __init__(self, params: IndicatorParams, capacity: int = 1000):
+        self.params = params
+        self.capacity = capacity
+        self._reset_state()
+        self._buf = CandleBuffer(capacity, extra=tuple(INDICATOR_COLS))
+        self.lock = threading.Lock()  # held by callers that feed it from worker threads
+
+    def _reset_state(self):
+        p = self.params
+        self._st = {
+            "ema_fast": _Ewm(2 / (p.ema_fast + 1)),
+            "ema_mid": _Ewm(2 / (p.ema_mid + 1)),
+            "ema_slow": _Ewm(2 / (p.ema_slow + 1)),
+            "macd_f": _Ewm(2 / (p.macd_fast + 1)),
+            "macd_s": _Ewm(2 / (p.macd_slow + 1)),
+            "macd_sig": _Ewm(2 / (p.macd_signal + 1)),
+            "rsi_up": _Ewm(1 / p.rsi_len),
+            "rsi_down": _Ewm(1 / p.rsi_len),
+            "rsi_win": _Window(p.stoch_len),
+            "stoch_win": _Window(p.stoch_k),
+            "k_win": _Window(p.stoch_d),
+            "atr": _Ewm(1 / ATR_LEN),
+            "prev_close": NAN,
+            "close": NAN,
+        }
+
+    def _step(self, o: float, h: float, low: float, c: float, replace: bool) -> tuple:
+        # replace=True recomputes the last bar in place: every piece of state keeps what it
+        # needs to redo its last push, so nothing is copied per bar
+        st = self._st
+        ema_fast = st["ema_fast"].push(c, replace)
+        ema_mid = st["ema_mid"].push(c, replace)
+        ema_slow = st["ema_slow"].push(c, replace)
+        macd = st["macd_f"].push(c, replace) - st["macd_s"].push(c, replace)
+        macd_signal = st["macd_sig"].push(macd, replace)
+
+        if not replace:
+            st["prev_close"] = st["close"]
+        prev_c = st["prev_close"]
+        delta = c - prev_c
+        roll_up = st["rsi_up"].push(max(delta, 0.0) if not math.isnan(delta) else NAN, replace)
+        roll_down = st["rsi_down"].push(max(-delta, 0.0) if not math.isnan(delta) else NAN, replace)
+        rs = roll_up / roll_down if roll_down != 0.0 and not math.isnan(roll_down) else NAN
+        rsi = 100 - (100 / (1 + rs)) if not math.isnan(rs) else NAN
+
+        w = st["rsi_win"]
+        w.push(rsi, replace)
+        stoch = _div(rsi - w.min(), w.max() - w.min())
+        st["stoch_win"].push(stoch, replace)
+        stoch_k = st["stoch_win"].mean()
+        st["k_win"].push(stoch_k, replace)
+        stoch_d = st["k_win"].mean()
+
+        tr_parts = [abs(h - low), abs(h - prev_c), abs(low - prev_c)]
+        tr_parts = [x for x in tr_parts if not math.isnan(x)]
+        atr = st["atr"].push(max(tr_parts) if tr_parts else NAN, replace)
+
+        st["close"] = c
+        return ema_fast, ema_mid, ema_slow, macd, macd_signal, stoch_k, stoch_d, atr
+
+    def __len__(self) -> int:
+        return len(self._buf)
+
+    @property
+    def last_open_time(self) -> int | None:
+        return self._buf.last_open_time
+
+    def update(self, open_time: int, o: float, h: float, low: float, c: float, v: float = 0.0):
+        last = self._buf.last_open_time
+        replace = last is not None and open_time == last
+        if not replace and last is not None and open_time < last:
+            raise ValueError("bars must be fed in open_time order")
+        out = self._step(float(o), float(h), float(low), float(c), replace)
+        write = self._buf.replace_last if replace else self._buf.append
+        write(int(open_time), o, h, low, c, v, *out)
+
+    def seed(self, df: pd.DataFrame):
+        self._reset_state()
+        self._buf.clear()
+        o, h, low, c, v = (np.asarray(df[k], dtype=float) for k in ("open", "high", "low", "close", "volume"))
+        for row in zip(open_time_ms(df), o, h, low, c, v):
+            self.update(*row)
+
+    def sync(self, df):
+        """Feed the bars of `df` not seen yet and return (a copy of) the indicators for the same span.
+
+        A kline frame gets a DataFrame back, Bars get Bars.
+        """
+        ot = open_time_ms(df)
+        last = self.last_open_time
+        if last is None or len(ot) == 0 or ot[0] > last:
+            self.seed(df)
+        else:
+            start = int(np.searchsorted(ot, last, side="left"))
+            o, h, low, c, v = (np.asarray(df[k], dtype=float) for k in ("open", "high", "low", "close", "volume"))
+            for i in range(start, len(ot)):
+                self.update(ot[i], o[i], h[i], low[i], c[i], v[i])
+        if isinstance(df, (Bars, CandleBuffer)):
+            return self.bars(tail=len(df)).copy()
+        return self.frame(tail=len(df)).copy()
+
+    def bars(self, tail: int | None = None) -> Bars:
+        # Zero-copy view over the engine's buffer: only valid until the next update()
+        return self._buf.window(tail or None)
+
+    def frame(self, tail: int | None = None) -> pd.DataFrame:
+        return self.bars(tail).to_frame()
+
+# ---- engines per (symbol, timeframe); a params change re-seeds from history ----
+_engines: dict[tuple[str, str], IndicatorEngine] = {}
+
+def get_engine(symbol: str, timeframe: str, params: IndicatorParams) -> IndicatorEngine:
+    k = (symbol.upper(), timeframe)
+    eng = _engines.get(k)
+    if eng is None or astuple(eng.params) != astuple(params):
+        eng = _engines[k] = IndicatorEngine(params)
+    return eng
@@ -1,9 +1,12 @@
 from __future__ import annotations
 import math
 from dataclasses import dataclass
+from typing import Callable
 import numpy as np
 import pandas as pd
 
+from app.indicators.buffer import OHLCV, Bars, CandleBuffer
+
 @dataclass
 class IndicatorParams:
     ema_fast: int = 35
@@ -37,53 +40,136 @@ def _atr(df: pd.DataFrame, length: int = 14) -> pd.Series:
     tr = pd.concat([hl, hc, lc], axis=1).max(axis=1)
     return tr.ewm(alpha=1/length, adjust=False).mean()
 
+def crosses(a: pd.Series, b: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Every cross of `a` over/under `b`: (indices, directions) with +1 = up, -1 = down.
+
+    A cross at i compares diff[i-1] and diff[i]; pairs touching a NaN are skipped and a
+    move from exactly 0 counts (0 -> +x is up, 0 -> -x is down).
+    """
+    diff = pd.to_numeric(a - b, errors="coerce").to_numpy(dtype=float)
+    if len(diff) < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int8)
+    prev, curr = diff[:-1], diff[1:]
+    # NaN compares False, so gaps never produce a cross
+    up = (prev <= 0) & (curr > 0)
+    down = (prev >= 0) & (curr < 0)
+    idx = np.flatnonzero(up | down) + 1
+    return idx, np.where(up[idx - 1], 1, -1).astype(np.int8)
+
 def last_cross(a: pd.Series, b: pd.Series) -> int:
     if len(a) < 2 or len(b) < 2:
         return 0
-    diff = pd.to_numeric(a - b, errors="coerce")
-    last_dir = 0
-    prev = diff.iloc[0]
-    for i in range(1, len(diff)):
-        curr = diff.iloc[i]
-        if pd.isna(prev) or pd.isna(curr):
-            prev = curr
-            continue
-        if prev <= 0 and curr > 0:
-            last_dir = 1
-        elif prev >= 0 and curr < 0:
-            last_dir = -1
-        prev = curr
-    return last_dir
-
-def compute_indicators(df: pd.DataFrame, p: IndicatorParams) -> pd.DataFrame:
-    data = df.copy()
-    data["ema_fast"] = _ema(data["close"], p.ema_fast)
-    data["ema_mid"]  = _ema(data["close"], p.ema_mid)
-    data["ema_slow"] = _ema(data["close"], p.ema_slow)
-    ema_f = _ema(data["close"], p.macd_fast)
-    ema_s = _ema(data["close"], p.macd_slow)
-    data["macd"] = ema_f - ema_s
-    data["macd_signal"] = _ema(data["macd"], p.macd_signal)
-    rsi = _rsi(data["close"], p.rsi_len)
+    _, dirs = crosses(a, b)
+    return int(dirs[-1]) if len(dirs) else 0
+
+@dataclass(frozen=True)
+class Indicator:
+    """One node of the indicator graph: `fn(values, params)` -> Series.
+
+    `inputs` are OHLCV columns or other indicator names; `params` lists the
+    IndicatorParams fields it reads. Intermediates (public=False) are computed when
+    something needs them but never become output columns.
+    """
+    name: str
+    inputs: tuple[str, ...]
+    params: tuple[str, ...]
+    fn: Callable[[dict, IndicatorParams], pd.Series]
+    public: bool = True
+
+INDICATORS: dict[str, Indicator] = {}
+
+def register(name: str, inputs: tuple[str, ...], params: tuple[str, ...] = (), public: bool = True):
+    def deco(fn):
+        INDICATORS[name] = Indicator(name, inputs, params, fn, public)
+        return fn
+    return deco
+
+register("ema_fast", ("close",), ("ema_fast",))(lambda v, p: _ema(v["close"], p.ema_fast))
+register("ema_mid", ("close",), ("ema_mid",))(lambda v, p: _ema(v["close"], p.ema_mid))
+register("ema_slow", ("close",), ("ema_slow",))(lambda v, p: _ema(v["close"], p.ema_slow))
+register("macd_fast_ema", ("close",), ("macd_fast",), public=False)(lambda v, p: _ema(v["close"], p.macd_fast))
+register("macd_slow_ema", ("close",), ("macd_slow",), public=False)(lambda v, p: _ema(v["close"], p.macd_slow))
+register("macd", ("macd_fast_ema", "macd_slow_ema"))(lambda v, p: v["macd_fast_ema"] - v["macd_slow_ema"])
+register("macd_signal", ("macd",), ("macd_signal",))(lambda v, p: _ema(v["macd"], p.macd_signal))
+register("rsi", ("close",), ("rsi_len",), public=False)(lambda v, p: _rsi(v["close"], p.rsi_len))
+
+@register("stoch_rsi", ("rsi",), ("stoch_len",), public=False)
+def _stoch_rsi(v: dict, p: IndicatorParams) -> pd.Series:
+    rsi = v["rsi"]
     min_rsi = rsi.rolling(p.stoch_len).min()
     max_rsi = rsi.rolling(p.stoch_len).max()
-    stoch_rsi = (rsi - min_rsi) / (max_rsi - min_rsi)
-    data["stoch_k"] = stoch_rsi.rolling(p.stoch_k).mean()
-    data["stoch_d"] = data["stoch_k"].rolling(p.stoch_d).mean()
-    data["atr"] = _atr(data, 14)
+    return (rsi - min_rsi) / (max_rsi - min_rsi)
+
+register("stoch_k", ("stoch_rsi",), ("stoch_k",))(lambda v, p: v["stoch_rsi"].rolling(p.stoch_k).mean())
+register("stoch_d", ("stoch_k",), ("stoch_d",))(lambda v, p: v["stoch_k"].rolling(p.stoch_d).mean())
+register("atr", ("high", "low", "close"))(lambda v, p: _atr(pd.DataFrame({c: v[c] for c in ("high", "low", "close")}), 14))
+
+# Output columns in compute_indicators order
+ALL_OUTPUTS = tuple(name for name, ind in INDICATORS.items() if ind.public)
+
+def required(outputs) -> list[str]:
+    """The indicator subgraph needed for `outputs`, in evaluation order."""
+    order: list[str] = []
+    seen: set[str] = set()
+
+    def visit(name: str):
+        if name in seen or name not in INDICATORS:
+            return  # OHLCV columns are leaves
+        seen.add(name)
+        for dep in INDICATORS[name].inputs:
+            visit(dep)
+        order.append(name)
+
+    for name in outputs:
+        if name not in INDICATORS:
+            raise KeyError(f"unknown indicator: {name}")
+        visit(name)
+    return order
+
+def compute_indicators(df, p: IndicatorParams, outputs=None):
+    """Input frame plus the requested indicator columns (all of them by default).
+
+    Only the dependency subgraph of `outputs` is evaluated; shared intermediates (the
+    RSI behind StochRSI, the MACD EMAs) are computed once. Bars (or a CandleBuffer) come
+    back as Bars sharing the candle arrays, so the hot path copies nothing but the
+    indicator columns it adds.
+    """
+    wanted = ALL_OUTPUTS if outputs is None else tuple(outputs)
+    if isinstance(df, (Bars, CandleBuffer)):
+        bars = df.window() if isinstance(df, CandleBuffer) else df
+        values: dict[str, pd.Series] = {c: pd.Series(bars[c], copy=False) for c in OHLCV if c in bars}
+        for name in required(wanted):
+            values[name] = INDICATORS[name].fn(values, p)
+        dtype = bars["close"].dtype
+        return bars.assign(**{name: values[name].to_numpy(dtype=dtype) for name in ALL_OUTPUTS if name in wanted})
+    data = df.copy()
+    values = {c: data[c] for c in OHLCV if c in data}
+    for name in required(wanted):
+        values[name] = INDICATORS[name].fn(values, p)
+    for name in ALL_OUTPUTS:
+        if name in wanted:
+            data[name] = values[name]
     return data
 
-def compute_fib_031(df: pd.DataFrame, lookback: int = 180) -> dict | None:
+def _window_atr(df, lookback: int) -> float:
+    # last ATR of the window: the precomputed column when there is one
+    if "atr" in df.columns:
+        return float(np.asarray(df["atr"])[-1])
+    tail = pd.DataFrame({c: np.asarray(df[c], dtype=float)[-lookback:] for c in ("high", "low", "close")})
+    return float(_atr(tail, 14).iloc[-1])
+
+def compute_fib_031(df, lookback: int = 180) -> dict | None:
     if df is None or len(df) < max(lookback, 50):
         return None
-    data = df.copy()
-    last = data.iloc[-1]
-    if "ema_mid" not in data.columns:
-        data["ema_mid"] = _ema(data["close"], 75)
-    window = data.tail(lookback)
-    swing_high = float(window["high"].max())
-    swing_low  = float(window["low"].min())
-    direction = "up" if (last["close"] > last["ema_mid"] and ("ema_fast" not in data.columns or last.get("ema_fast", last["close"]) > last["ema_mid"])) else "down"
+    close = np.asarray(df["close"], dtype=float)
+    ema_mid = np.asarray(df["ema_mid"], dtype=float) if "ema_mid" in df.columns else _ema(pd.Series(close), 75).to_numpy()
+    high = np.asarray(df["high"], dtype=float)[-lookback:]
+    low = np.asarray(df["low"], dtype=float)[-lookback:]
+    swing_high = float(np.nanmax(high))
+    swing_low  = float(np.nanmin(low))
+    last_close, last_mid = close[-1], ema_mid[-1]
+    up = last_close > last_mid and ("ema_fast" not in df.columns or np.asarray(df["ema_fast"])[-1] > last_mid)
+    direction = "up" if up else "down"
     rng = swing_high - swing_low
     if rng <= 0 or math.isnan(rng):
         return None
@@ -91,15 +177,15 @@ def compute_fib_031(df: pd.DataFrame, lookback: int = 180) -> dict | None:
         level = swing_low + 0.31 * rng
     else:
         level = swing_high - 0.31 * rng
-    atr_val = float(window["atr"].iloc[-1] if "atr" in window.columns else _atr(window, 14).iloc[-1])
-    last_price = float(last["close"])
+    atr_val = _window_atr(df, lookback)
+    last_price = float(last_close)
     distance_pct = abs(level - last_price) / last_price * 100.0
     return {
         "direction": direction,
         "swing_low": round(swing_low, 3),
         "swing_high": round(swing_high, 3),
         "level": round(level, 3),
-        "basis_time": str(len(window)),
+        "basis_time": str(len(high)),
         "atr": round(atr_val, 2),
         "distance_pct": round(distance_pct, 3),
     }
@@ -122,14 +208,12 @@ def suggest_entry_from_fib(fib: dict, rr: float = 3.0) -> dict | None:
         "basis": {"type": "fib_0.31", "swing_low": fib["swing_low"], "swing_high": fib["swing_high"]},
     }
 
-def approximate_zones(df: pd.DataFrame, lookback: int = 200) -> dict | None:
+def approximate_zones(df, lookback: int = 200) -> dict | None:
     if df is None or len(df) < max(lookback, 50):
         return None
-    data = df.copy()
-    window = data.tail(lookback)
-    swing_high = float(window["high"].max())
-    swing_low  = float(window["low"].min())
-    atr_val = float(window["atr"].iloc[-1] if "atr" in window.columns else _atr(window, 14).iloc[-1])
+    swing_high = float(np.nanmax(np.asarray(df["high"], dtype=float)[-lookback:]))
+    swing_low  = float(np.nanmin(np.asarray(df["low"], dtype=float)[-lookback:]))
+    atr_val = _window_atr(df, lookback)
     demand = {"low": round(swing_low, 3), "high": round(swing_low + atr_val, 3)}
     supply = {"low": round(swing_high - atr_val, 3), "high": round(swing_high, 3)}
-    return {"demand": demand, "supply": supply, "atr": round(atr_val, 2)}
\ No newline at end of file
+    return {"demand": demand, "supply": supply, "atr": round(atr_val, 2)}
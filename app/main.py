@@ -1,25 +1,50 @@
 from __future__ import annotations
 
-import os, re
-from typing import List, Optional
+import asyncio
+import functools
+import os
+import re
+import time
+import uuid
+from dataclasses import astuple
+from typing import TYPE_CHECKING, List, Optional
 
 from fastapi import FastAPI, Query, Body, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
 from app.services.settings_store import load_settings, save_settings
-from app.indicators.ta import (
-    IndicatorParams,
-    compute_indicators,
-    compute_fib_031,
-    suggest_entry_from_fib,
-    approximate_zones,
-)
+from app.services.executor import LoopLagMonitor, run_cpu
+from app.services.response_cache import get_response_cache
+from app.services.metrics import HTTP_SECONDS, REGISTRY, render as render_metrics
+from app.services.warmup import Readiness, warm_up
+from app.config import settings as env_settings
+from app.clients.bybit_client import get_client, close_client
+from app.services.signal_state import get_store as get_state_store
+from app.services.executor import shutdown as shutdown_executors
+from app.notifiers.telegram import close_outbox, get_outbox
+from app.notifiers.webhook import close_client as close_webhooks
+
+if TYPE_CHECKING:
+    from app.indicators.ta import IndicatorParams
+
+_IMPORT_STARTED = time.perf_counter()  # startup timings in /api/ready count from here
+# pandas, the indicator math and APScheduler load on first use, so /api/health answers
+# (and the warm-up starts) as soon as possible after a restart
 
 # ---------------- Constants ----------------
 ALLOWED_TF = {"1m","5m","15m","30m","1h","2h","4h","6h","12h","d","w","m"}
+# Bars a route may ask for. One Bybit page (1000) is open to anyone; beyond that the store
+# pages history in, so deeper limits need the API token when one is configured
+PUBLIC_LIMIT = 1000
+MAX_LIMIT = 20000
+# Sweep processes an /api/optimize job starts unless it asks for more (at most one per CPU)
+OPTIMIZE_WORKERS = int(os.getenv("OPTIMIZE_WORKERS", "2"))
+# Indicator columns the lightweight endpoints actually read
+FIB_OUTPUTS = ("ema_fast", "ema_mid", "atr")
+ZONE_OUTPUTS = ("atr",)
 
 # ---------------- Models ----------------
 class SettingsModel(BaseModel):
@@ -32,6 +57,34 @@ class SettingsModel(BaseModel):
     macd:  List[int] = [33, 55, 55]      # fast, slow, signal
     decision_threshold: float = 1.5
 
+class SubscriberModel(BaseModel):
+    kind: str = "telegram"           # telegram (address = chat id) | webhook (address = URL)
+    address: str
+    symbols: List[str] = []          # empty = any
+    timeframes: List[str] = []
+    indicators: List[str] = []       # "EMA 35/75", "EMA 75/200", "MACD Cross"
+    sides: List[str] = []            # "BUY" / "SELL"
+    charts: bool = True
+
+class BackfillModel(BaseModel):
+    symbols: List[str] = []          # empty = settings.symbols
+    timeframes: List[str] = []       # empty = settings.timeframes
+    start: str                       # ISO date/datetime or epoch ms
+    end: Optional[str] = None        # default: now
+    concurrency: int = 8
+
+class OptimizeModel(BaseModel):
+    name: str                        # checkpoint name; posting the same name again resumes
+    symbols: List[str] = []          # empty = settings.symbols
+    timeframe: str = "1h"
+    space: dict[str, List[float]]    # IndicatorParams field / decision_threshold -> candidates
+    samples: int = 0                 # random search size, 0 = full grid
+    seed: int = 0
+    bars: Optional[int] = None       # most recent stored bars per symbol, None = all
+    exit_mode: str = "fixed"         # fixed (1% target) | fib (fib 0.31 ATR stop/target)
+    risk_reward: Optional[float] = None
+    workers: Optional[int] = None    # sweep processes, None = OPTIMIZE_WORKERS; at most one per CPU
+
 # ---------------- Utils ----------------
 def _validate_settings(s: SettingsModel):
     if not s.symbol:
@@ -54,9 +107,53 @@ def _validate_settings(s: SettingsModel):
     if not (0.5 <= s.decision_threshold <= 5):
         raise ValueError("decision_threshold must be between 0.5 and 5")
 
+def _validate_subscriber(s: SubscriberModel):
+    from app.scheduler import CROSS_KEYS
+    if s.kind not in ("telegram", "webhook"):
+        raise ValueError("kind must be 'telegram' or 'webhook'")
+    if not s.address:
+        raise ValueError("address is required")
+    if s.kind == "webhook" and not s.address.startswith(("http://", "https://")):
+        raise ValueError("webhook address must be an http(s) URL")
+    bad = [tf for tf in s.timeframes if tf not in ALLOWED_TF]
+    if bad:
+        raise ValueError(f"invalid timeframes: {bad}")
+    bad = [k for k in s.indicators if k not in CROSS_KEYS]
+    if bad:
+        raise ValueError(f"invalid indicators: {bad}")
+    bad = [x for x in s.sides if x.upper() not in ("BUY", "SELL")]
+    if bad:
+        raise ValueError(f"invalid sides: {bad}")
+
+def _last_open_ms(df) -> int:
+    # ETag basis: the newest bar the response was computed from
+    if df is None or not len(df):
+        return 0
+    return int(df["open_time"].iloc[-1].value // 1_000_000)
+
+def _params_from_settings(s: SettingsModel) -> IndicatorParams:
+    from app.indicators.ta import IndicatorParams
+    return IndicatorParams(
+        ema_fast=s.ema[0], ema_mid=s.ema[1], ema_slow=s.ema[2],
+        rsi_len=s.stoch[0], stoch_len=s.stoch[1], stoch_k=s.stoch[2], stoch_d=s.stoch[3],
+        macd_fast=s.macd[0], macd_slow=s.macd[1], macd_signal=s.macd[2],
+    )
+
+def _csv(s: Optional[str]) -> List[str]:
+    return [x.strip() for x in (s or "").split(",") if x.strip()]
+
 def _csv_ints(s: str) -> List[int]:
     return [int(x.strip()) for x in (s or "").split(",") if x.strip()]
 
+def _check_timeframe(timeframe: str):
+    # the timeframe names a directory of the candle store: nothing else gets that far
+    if timeframe not in ALLOWED_TF:
+        raise HTTPException(status_code=422, detail=f"invalid timeframe: {timeframe!r}")
+
+def _check_limit(limit: int, request: Request):
+    if limit > PUBLIC_LIMIT:
+        _require_auth_if_configured(request)
+
 def _load_initial_settings() -> SettingsModel:
     file_cfg = load_settings() or {}
     env = {}
@@ -86,17 +183,85 @@ if os.path.isdir(_static_dir):
     app.mount("/static", StaticFiles(directory=_static_dir), name="static")
 
 app.state.settings = _load_initial_settings()
+app.state.loop_lag = LoopLagMonitor()
+app.state.optimize_jobs = {}
+app.state.backfill_jobs = {}
+app.state.readiness = Readiness(started=_IMPORT_STARTED)
 AUTH_TOKEN = os.getenv("AUTH_TOKEN")
 
 def _require_auth_if_configured(request: Request):
     if AUTH_TOKEN and request.headers.get("Authorization") != f"Bearer {AUTH_TOKEN}":
         raise HTTPException(status_code=401, detail="Unauthorized")
 
+# ---------------- Metrics ----------------
+@app.middleware("http")
+async def _time_requests(request: Request, call_next):
+    app.state.readiness.mark("first_request")
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # route template, not the raw path; symbols outside the configured list share one label
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        q = request.query_params
+        sym = (q.get("symbol") or "").upper()
+        tf = q.get("timeframe") or ""
+        HTTP_SECONDS.observe(
+            time.perf_counter() - t0, route=route, method=request.method, status=status,
+            symbol=sym if not sym or sym in app.state.settings.symbols else "other",
+            timeframe=tf if tf in ALLOWED_TF else ("other" if tf else ""),
+        )
+
+def _cache_ratios() -> dict:
+    from app.services.frame_cache import get_frame_cache
+    out = {}
+    for name, c in (("frame", get_frame_cache()), ("response", get_response_cache())):
+        total = c.hits + c.misses
+        out[name] = c.hits / total if total else 0.0
+    return out
+
+def _queue_depths() -> dict:
+    from app.notifiers import telegram, webhook
+    stream = getattr(app.state, "kline_stream", None)
+    return {
+        "telegram_outbox": telegram._outbox.pending() if telegram._outbox is not None else 0,
+        "webhooks": len(webhook._pending),
+        "kline_stream": len(stream._pending) if stream is not None else 0,
+        "optimize_jobs": sum(not j["task"].done() for j in app.state.optimize_jobs.values()),
+        "backfill_jobs": sum(not j["task"].done() for j in app.state.backfill_jobs.values()),
+    }
+
+REGISTRY.gauge("cache_hit_ratio", "Hits / lookups since startup.", _cache_ratios, ("cache",))
+REGISTRY.gauge("queue_depth", "Items waiting in background queues.", _queue_depths, ("queue",))
+REGISTRY.gauge("event_loop_lag_seconds", "Most recent event-loop wake-up delay.", lambda: app.state.loop_lag.last_lag)
+REGISTRY.gauge("startup_phase_seconds", "Seconds from importing the app to each startup phase.",
+               lambda: app.state.readiness.phases, ("phase",))
+
 # ---------------- Routes ----------------
 @app.get("/api/health")
 async def health():
+    # Liveness: the process serves requests; see /api/ready for warm caches
     return {"ok": True}
 
+@app.get("/api/ready")
+async def ready():
+    r = app.state.readiness
+    return JSONResponse(r.report(), status_code=200 if r.ready else 503)
+
+@app.get("/api/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/loop-lag")
+async def loop_lag():
+    # Worst event-loop stalls since startup; CPU stages belong on the executors, not the loop
+    return app.state.loop_lag.report()
+
 @app.get("/")
 async def root():
     index_path = os.path.join(_static_dir, "index.html")
@@ -125,6 +290,34 @@ async def put_settings(
         save_settings(payload.dict())
     return {"ok": True}
 
+# ---------- SUBSCRIBERS ----------
+@app.get("/api/subscribers")
+async def list_subscribers(request: Request):
+    from dataclasses import asdict
+    from app.services.subscribers import get_registry
+    _require_auth_if_configured(request)
+    return [asdict(sub) for sub in get_registry().all()]
+
+@app.post("/api/subscribers")
+async def add_subscriber(payload: SubscriberModel = Body(...), request: Request = None):
+    from dataclasses import asdict
+    from app.services.subscribers import Subscription, get_registry
+    _require_auth_if_configured(request)
+    try:
+        _validate_subscriber(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    sub = get_registry().add(Subscription(**payload.dict()))
+    return asdict(sub)
+
+@app.delete("/api/subscribers/{sub_id}")
+async def delete_subscriber(sub_id: str, request: Request):
+    from app.services.subscribers import get_registry
+    _require_auth_if_configured(request)
+    if not get_registry().remove(sub_id):
+        raise HTTPException(status_code=404, detail="subscriber not found")
+    return {"ok": True}
+
 # ---------- ANALYZE ----------
 @app.get("/api/analyze")
 async def analyze(
@@ -134,12 +327,17 @@ async def analyze(
     stoch: Optional[str] = Query(None),
     macd: Optional[str] = Query(None),
     risk_reward: Optional[float] = Query(None),
-    limit: int = Query(500, ge=100, le=1000),
+    limit: int = Query(500, ge=100, le=MAX_LIMIT),
     fib031: bool = Query(False),
+    request: Request = None,
 ):
-    from app.clients.bybit_client import fetch_klines
+    from app.indicators.ta import IndicatorParams, compute_fib_031, suggest_entry_from_fib
+    from app.services.candle_store import get_klines
+    from app.services.frame_cache import cached_indicators
     from app.strategies.rules import make_signal
 
+    _check_timeframe(timeframe)
+    _check_limit(limit, request)
     s = app.state.settings
     sym = (symbol or s.symbol or "BTCUSDT").upper()
     sym = re.sub(r'[^A-Z0-9]', '', sym)
@@ -175,66 +373,293 @@ async def analyze(
         macd_fast=macd_f, macd_slow=macd_s, macd_signal=macd_sig
     )
 
-    df = await fetch_klines(sym, timeframe, limit=limit)
-    data = compute_indicators(df, params)
+    threshold = s.decision_threshold
 
-    sig = make_signal(data, timeframe, params, risk_reward=rr, decision_threshold=s.decision_threshold)
+    async def compute():
+        df = await get_klines(sym, timeframe, limit=limit)
+        data = await run_cpu(cached_indicators, sym, timeframe, df, params)
 
-    result = {
-        "symbol": sym,
-        "timeframe": timeframe,
-        "params": params.__dict__,
-        "decision_threshold": s.decision_threshold,
-        "signal": sig,
-    }
+        sig = await run_cpu(make_signal, data, timeframe, params, risk_reward=rr, decision_threshold=threshold)
+
+        result = {
+            "symbol": sym,
+            "timeframe": timeframe,
+            "params": params.__dict__,
+            "decision_threshold": threshold,
+            "signal": sig,
+        }
+
+        if fib031:
+            fib = await run_cpu(compute_fib_031, data)
+            if fib:
+                entry_sugg = suggest_entry_from_fib(fib, rr)
+                result["fib031"] = fib
+                result["entry_suggestion"] = entry_sugg
 
-    if fib031:
-        fib = compute_fib_031(data)
-        if fib:
-            entry_sugg = suggest_entry_from_fib(fib, rr)
-            result["fib031"] = fib
-            result["entry_suggestion"] = entry_sugg
+        return result, _last_open_ms(df)
 
-    return result
+    key = ("analyze", sym, timeframe, astuple(params), rr, threshold, limit, fib031)
+    return await get_response_cache().respond(request, key, timeframe, compute)
 
 # ---------- FIB 0.31 ----------
 @app.get("/api/fib031")
-async def api_fib031(symbol: str = Query(...), timeframe: str = Query("1h"), limit: int = Query(500, ge=100, le=1000)):
-    from app.clients.bybit_client import fetch_klines
+async def api_fib031(symbol: str = Query(...), timeframe: str = Query("1h"), limit: int = Query(500, ge=100, le=MAX_LIMIT),
+                     request: Request = None):
+    from app.indicators.ta import IndicatorParams, compute_fib_031, suggest_entry_from_fib
+    from app.services.candle_store import get_klines
+    from app.services.frame_cache import cached_indicators
+    _check_timeframe(timeframe)
+    _check_limit(limit, request)
     s = app.state.settings
     sym = (symbol or s.symbol or "BTCUSDT").upper()
     sym = re.sub(r'[^A-Z0-9]', '', sym)
+    rr = s.risk_reward
 
-    df = await fetch_klines(sym, timeframe, limit=limit)
-    data = compute_indicators(df, IndicatorParams())
-    fib = compute_fib_031(data)
-    if not fib:
-        raise HTTPException(status_code=404, detail="not enough data for fib 0.31")
-    entry_sugg = suggest_entry_from_fib(fib, s.risk_reward)
-    return {"symbol": sym, "timeframe": timeframe, "fib031": fib, "entry_suggestion": entry_sugg}
+    async def compute():
+        df = await get_klines(sym, timeframe, limit=limit)
+        data = await run_cpu(cached_indicators, sym, timeframe, df, IndicatorParams(), FIB_OUTPUTS)
+        fib = await run_cpu(compute_fib_031, data)
+        if not fib:
+            raise HTTPException(status_code=404, detail="not enough data for fib 0.31")
+        entry_sugg = suggest_entry_from_fib(fib, rr)
+        return {"symbol": sym, "timeframe": timeframe, "fib031": fib, "entry_suggestion": entry_sugg}, _last_open_ms(df)
+
+    return await get_response_cache().respond(request, ("fib031", sym, timeframe, limit, rr), timeframe, compute)
 
 # ---------- Demand / Supply ----------
 @app.get("/api/zones")
-async def api_zones(symbol: str = Query(...), timeframe: str = Query("1h"), limit: int = Query(500, ge=100, le=1000)):
-    from app.clients.bybit_client import fetch_klines
+async def api_zones(symbol: str = Query(...), timeframe: str = Query("1h"), limit: int = Query(500, ge=100, le=MAX_LIMIT),
+                    request: Request = None):
+    from app.indicators.ta import IndicatorParams, approximate_zones
+    from app.services.candle_store import get_klines
+    from app.services.frame_cache import cached_indicators
+    _check_timeframe(timeframe)
+    _check_limit(limit, request)
     sym = symbol.upper()
     sym = re.sub(r'[^A-Z0-9]', '', sym)
-    df = await fetch_klines(sym, timeframe, limit=limit)
-    data = compute_indicators(df, IndicatorParams())
-    zones = approximate_zones(data)
-    if not zones:
-        raise HTTPException(status_code=404, detail="zones unavailable")
-    return {"symbol": sym, "timeframe": timeframe, "zones": zones}
 
-# ---------------- Scheduler Startup ----------------
-from app.scheduler import configure_scheduler
+    async def compute():
+        df = await get_klines(sym, timeframe, limit=limit)
+        data = await run_cpu(cached_indicators, sym, timeframe, df, IndicatorParams(), ZONE_OUTPUTS)
+        zones = await run_cpu(approximate_zones, data)
+        if not zones:
+            raise HTTPException(status_code=404, detail="zones unavailable")
+        return {"symbol": sym, "timeframe": timeframe, "zones": zones}, _last_open_ms(df)
+
+    return await get_response_cache().respond(request, ("zones", sym, timeframe, limit), timeframe, compute)
+
+# ---------- SCAN ----------
+@app.get("/api/scan")
+async def api_scan(
+    symbols: Optional[str] = Query(None),
+    timeframes: Optional[str] = Query(None),
+    format: Optional[str] = Query(None, pattern="^(ndjson|sse)$"),
+    limit: int = Query(500, ge=100, le=MAX_LIMIT),
+    concurrency: int = Query(8, ge=1, le=32),
+    request: Request = None,
+):
+    """make_signal for symbols x timeframes, streamed one result per line as each finishes."""
+    import json
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import StreamingResponse
+    from app.services.candle_store import get_klines
+    from app.services.frame_cache import cached_indicators
+    from app.strategies.rules import make_signal
+
+    _check_limit(limit, request)
+    s = app.state.settings
+    syms = [re.sub(r'[^A-Z0-9]', '', x.upper()) for x in (_csv(symbols) or s.symbols)]
+    tfs = [x.lower() for x in _csv(timeframes)] or list(s.timeframes)
+    bad = [tf for tf in tfs if tf not in ALLOWED_TF]
+    if bad:
+        raise HTTPException(status_code=422, detail=f"invalid timeframes: {bad}")
+    params = _params_from_settings(s)
+    rr, threshold = s.risk_reward, s.decision_threshold
+    sse = format == "sse" or (format is None and "text/event-stream" in (request.headers.get("accept") or ""))
+    sem = asyncio.Semaphore(concurrency)
 
+    async def one(sym: str, tf: str) -> dict:
+        try:
+            async with sem:
+                df = await get_klines(sym, tf, limit=limit)
+            data = await run_cpu(cached_indicators, sym, tf, df, params)
+            sig = await run_cpu(make_signal, data, tf, params, risk_reward=rr, decision_threshold=threshold)
+            return {"symbol": sym, "timeframe": tf, "signal": sig}
+        except Exception as e:
+            return {"symbol": sym, "timeframe": tf, "error": str(e) or repr(e)}
+
+    async def stream():
+        tasks = [asyncio.create_task(one(sym, tf)) for tf in tfs for sym in syms]
+        try:
+            for done in asyncio.as_completed(tasks):
+                line = json.dumps(jsonable_encoder(await done), ensure_ascii=False)
+                yield f"event: signal\ndata: {line}\n\n" if sse else line + "\n"
+            if sse:
+                yield f"event: done\ndata: {json.dumps({'count': len(tasks)})}\n\n"
+        finally:
+            for t in tasks:
+                t.cancel()  # client went away: stop the rest of the board
+
+    media = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media, headers={"Cache-Control": "no-store"})
+
+# ---------- BACKFILL ----------
+@app.post("/api/backfill")
+async def start_backfill(payload: BackfillModel = Body(...), request: Request = None):
+    from app.services.backfill import backfill_many, parse_time
+    from app.services.candle_store import get_store
+    _require_auth_if_configured(request)
+    s = app.state.settings
+    symbols = [re.sub(r'[^A-Z0-9]', '', x.upper()) for x in (payload.symbols or s.symbols)]
+    timeframes = payload.timeframes or list(s.timeframes)
+    bad = [tf for tf in timeframes if tf not in ALLOWED_TF or tf == "m"]
+    if bad:
+        raise HTTPException(status_code=422, detail=f"invalid timeframes: {bad}")
+    try:
+        start = parse_time(payload.start)
+        end = parse_time(payload.end) if payload.end else int(time.time() * 1000)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if start >= end:
+        raise HTTPException(status_code=422, detail="start must be before end")
+
+    job_id = uuid.uuid4().hex[:12]
+    job = {"id": job_id, "start": start, "end": end, "progress": {}, "bars": None}
+    def progress(symbol: str, interval: str, done: int, total: int):
+        job["progress"][f"{symbol} {interval}"] = [done, total]
+    async def run():
+        job["bars"] = await backfill_many(get_client(), get_store(), symbols, timeframes, start, end,
+                                          max(1, min(payload.concurrency, 32)), progress)
+    job["task"] = asyncio.create_task(run())
+    app.state.backfill_jobs[job_id] = job
+    return {"id": job_id, "symbols": symbols, "timeframes": timeframes, "start": start, "end": end}
+
+@app.get("/api/backfill/{job_id}")
+async def backfill_status(job_id: str):
+    job = app.state.backfill_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="backfill not found")
+    task = job["task"]
+    out = {k: v for k, v in job.items() if k != "task"}
+    out["running"] = not task.done()
+    if task.done() and not task.cancelled() and task.exception() is not None:
+        out["error"] = str(task.exception()) or repr(task.exception())
+    return out
+
+# ---------- OPTIMIZE ----------
+@app.post("/api/optimize")
+async def start_optimize(payload: OptimizeModel = Body(...), request: Request = None):
+    from app.strategies import optimize as opt
+    _require_auth_if_configured(request)
+    name = re.sub(r'[^A-Za-z0-9_.-]', '', payload.name)
+    if not name:
+        raise HTTPException(status_code=422, detail="name is required")
+    if payload.timeframe not in ALLOWED_TF:
+        raise HTTPException(status_code=422, detail=f"invalid timeframe: {payload.timeframe}")
+    if payload.exit_mode not in ("fixed", "fib"):
+        raise HTTPException(status_code=422, detail="exit_mode must be 'fixed' or 'fib'")
+    jobs = app.state.optimize_jobs
+    if name in jobs and not jobs[name]["task"].done():
+        raise HTTPException(status_code=409, detail="optimization already running")
+    try:
+        space = {k: [v if k == "decision_threshold" else int(v) for v in vals] for k, vals in payload.space.items()}
+        combos = opt.random_combos(space, payload.samples, payload.seed) if payload.samples else opt.grid(space)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    s = app.state.settings
+    symbols = [x.upper() for x in (payload.symbols or s.symbols)]
+    history = await run_cpu(opt.load_history, symbols, payload.timeframe, payload.bars)
+    if not history:
+        raise HTTPException(status_code=404, detail="no stored candles for these symbols")
+
+    job = {"done": 0, "total": len(combos), "symbols": list(history), "error": None}
+    def progress(done: int, total: int):
+        job["done"], job["total"] = done, total
+    rr = payload.risk_reward if payload.risk_reward is not None else s.risk_reward
+    path = opt.CHECKPOINT_DIR / f"{name}.jsonl"
+    run = {"timeframe": payload.timeframe, "bars": payload.bars}
+    try:  # a name reused for different symbols / bars / exits must not resume the old results
+        await run_cpu(opt.read_checkpoint, path, opt.run_header(history, payload.exit_mode, rr, **run))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    workers = min(payload.workers if payload.workers is not None else OPTIMIZE_WORKERS, os.cpu_count() or 1)
+    call = functools.partial(opt.optimize, history, combos, path, workers,
+                             exit_mode=payload.exit_mode, risk_reward=rr, progress=progress, run=run)
+    job["task"] = asyncio.create_task(asyncio.to_thread(call))  # the sweep blocks on its process pool
+    jobs[name] = job
+    return {"name": name, "total": len(combos), "symbols": list(history)}
+
+@app.get("/api/optimize/{name}")
+async def optimize_status(name: str, top: int = Query(10, ge=1, le=100), objective: str = Query("expectancy"),
+                          min_trades: int = Query(10, ge=0)):
+    from app.strategies import optimize as opt
+    name = re.sub(r'[^A-Za-z0-9_.-]', '', name)
+    path = opt.CHECKPOINT_DIR / f"{name}.jsonl"
+    job = app.state.optimize_jobs.get(name)
+    if job is None and not path.exists():
+        raise HTTPException(status_code=404, detail="optimization not found")
+    if objective not in opt.OBJECTIVES:
+        raise HTTPException(status_code=422, detail=f"objective must be one of {list(opt.OBJECTIVES)}")
+    results = list((await run_cpu(opt.read_checkpoint, path)).values())
+    state = {"name": name, "done": len(results), "running": False}
+    if job is not None:
+        task = job["task"]
+        state.update(done=job["done"], total=job["total"], symbols=job["symbols"], running=not task.done())
+        if task.done() and not task.cancelled() and task.exception() is not None:
+            state["error"] = str(task.exception()) or repr(task.exception())
+    state["top"] = opt.rank(results, objective, min_trades)[:top]
+    return state
+
+# ---------------- Bybit client lifecycle ----------------
+@app.on_event("startup")
+async def _open_bybit_client():
+    # One pooled client shared by the routes above and the scheduler jobs
+    app.state.bybit = get_client()
+    get_state_store().load()  # signal state is read once, then served from memory
+    app.state.loop_lag.start()
+    if env_settings.telegram_bot_token:
+        get_outbox(env_settings.telegram_bot_token).start()  # resend what the last run left queued
+
+# ---------------- Scheduler Startup ----------------
 @app.on_event("startup")
 async def _start_scheduler():
-    s = app.state.settings
-    params = IndicatorParams(
-        ema_fast=s.ema[0], ema_mid=s.ema[1], ema_slow=s.ema[2],
-        rsi_len=s.stoch[0], stoch_len=s.stoch[1], stoch_k=s.stoch[2], stoch_d=s.stoch[3],
-        macd_fast=s.macd[0], macd_slow=s.macd[1], macd_signal=s.macd[2],
-    )
-    configure_scheduler(app.state, params)
\ No newline at end of file
+    from app.scheduler import configure_scheduler, start_kline_stream
+    params = _params_from_settings(app.state.settings)
+    if env_settings.ws_ingest:
+        start_kline_stream(app.state, params)
+    else:
+        configure_scheduler(app.state, params)
+    readiness = app.state.readiness
+    readiness.mark("startup")
+    if not env_settings.warmup:
+        readiness.ready = True
+        return
+
+    async def warm():
+        s = app.state.settings
+        await warm_up(s.symbols, s.timeframes, params, readiness, concurrency=env_settings.scheduler_concurrency)
+
+    # In the background: liveness answers right away, /api/ready turns 200 when this ends
+    app.state.warmup = asyncio.create_task(warm())
+
+# ---------------- Shutdown ----------------
+@app.on_event("shutdown")
+async def _shutdown():
+    # One hook, producers first: the warm-up, the stream's on_close tasks and the scheduler
+    # jobs all use the clients, outbox, state store and executors closed at the end
+    warmup = getattr(app.state, "warmup", None)
+    if warmup is not None:
+        warmup.cancel()
+        await asyncio.gather(warmup, return_exceptions=True)
+    stream = getattr(app.state, "kline_stream", None)
+    if stream is not None:
+        await stream.stop()
+    scheduler = getattr(app.state, "scheduler", None)
+    if scheduler is not None and scheduler.running:
+        scheduler.shutdown(wait=False)
+    await close_client()
+    await close_outbox()
+    await close_webhooks()
+    get_state_store().close()  # flushes pending signal state
+    await app.state.loop_lag.stop()
+    shutdown_executors()
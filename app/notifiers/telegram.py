@@ -1,19 +1,352 @@
 from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+
 import httpx
 
+from app.clients.bybit_client import AdaptiveRateLimiter
+from app.services.metrics import UPSTREAM_REQUESTS, UPSTREAM_RETRIES, UPSTREAM_SECONDS
+
+log = logging.getLogger(__name__)
+
+API_URL = "https://api.telegram.org"
+OUTBOX_PATH = os.environ.get("TELEGRAM_OUTBOX_PATH", "data/telegram_outbox.db")
+# Telegram: ~30 messages/s per bot, 1/s per private chat, 20/min per group (negative chat ids)
+GLOBAL_RATE = 30.0
+CHAT_RATE = 1.0
+GROUP_RATE = 20 / 60
+MEDIA_GROUP_MAX = 10
+# A worker's claim on the rows it sends; renewed while it runs, so the rows of a worker
+# that died pass to another one
+LEASE_SECONDS = 60.0
+
+_http: httpx.AsyncClient | None = None
+
+def _client() -> httpx.AsyncClient:
+    global _http
+    if _http is None or _http.is_closed:
+        _http = httpx.AsyncClient(timeout=60, limits=httpx.Limits(max_connections=8, max_keepalive_connections=4))
+    return _http
+
+async def close_client():
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
 async def send_telegram(bot_token: str, chat_id: str, text: str, parse_mode: str = "HTML"):
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+    url = f"{API_URL}/bot{bot_token}/sendMessage"
     payload = {"chat_id": chat_id, "text": text, "parse_mode": parse_mode, "disable_web_page_preview": True}
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.post(url, json=payload)
-        r.raise_for_status()
+    r = await _client().post(url, json=payload)
+    r.raise_for_status()
     return True
 
 async def send_telegram_photo(bot_token: str, chat_id: str, photo_bytes: bytes, caption: str = "", parse_mode: str = "HTML"):
-    url = f"https://api.telegram.org/bot{bot_token}/sendPhoto"
+    url = f"{API_URL}/bot{bot_token}/sendPhoto"
     data = {"chat_id": chat_id, "caption": caption, "parse_mode": parse_mode}
     files = {"photo": ("chart.png", photo_bytes, "image/png")}
-    async with httpx.AsyncClient(timeout=60) as client:
-        r = await client.post(url, data=data, files=files)
-        r.raise_for_status()
-    return True
\ No newline at end of file
+    r = await _client().post(url, data=data, files=files)
+    r.raise_for_status()
+    return True
+
+@dataclass
+class OutboxItem:
+    id: int
+    chat_id: str
+    kind: str  # "message" | "photo"
+    text: str
+    photo: bytes | None = None
+    attempts: int = 0
+    not_before: float = 0.0
+    queued_at: float = field(default_factory=time.monotonic)
+
+class TelegramOutbox:
+    """Background Telegram delivery: jobs enqueue and return, a per-chat sender drains.
+
+    Every item is written to SQLite before it is queued and deleted once Telegram accepts
+    it, so undelivered alerts survive a restart. The writes happen off the event loop, one
+    transaction per batch of enqueued items. Rows carry the worker that owns them and a
+    lease it keeps renewing: with several workers on one outbox file each sends only its
+    own rows, and picks up those of a worker that stopped or died. Sends are paced by a bot-wide and a
+    per-chat limiter; a 429 pauses the chat for `retry_after`, network/5xx errors back off
+    exponentially. Charts queued for a chat within `batch_window` go out as one album
+    (sendMediaGroup) after the text alerts.
+    """
+
+    def __init__(self, bot_token: str, path: str = OUTBOX_PATH, transport: httpx.AsyncBaseTransport | None = None,
+                 batch_window: float = 1.0, max_attempts: int = 8, backoff: float = 1.0, max_backoff: float = 300.0):
+        self.bot_token = bot_token
+        self.path = path
+        self.batch_window = batch_window
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.limiter = AdaptiveRateLimiter(rate=GLOBAL_RATE)
+        self.sent = 0
+        self.dropped = 0
+        self._transport = transport
+        self._http: httpx.AsyncClient | None = None
+        self._queues: dict[str, deque[OutboxItem]] = {}
+        self._chat_limiters: dict[str, AdaptiveRateLimiter] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._unsaved: list[OutboxItem] = []
+        self._saver: asyncio.Task | None = None
+        self._lease: asyncio.Task | None = None
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._lock = threading.Lock()  # the connection is shared with the writer thread
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, chat_id TEXT NOT NULL,"
+                         " kind TEXT NOT NULL, text TEXT NOT NULL, photo BLOB, attempts INTEGER NOT NULL DEFAULT 0,"
+                         " owner TEXT, lease_until REAL NOT NULL DEFAULT 0)")
+        if "owner" not in {r[1] for r in self._db.execute("PRAGMA table_info(outbox)")}:
+            try:  # an outbox file from before rows had owners; another worker may be adding them too
+                self._db.execute("ALTER TABLE outbox ADD COLUMN owner TEXT")
+                self._db.execute("ALTER TABLE outbox ADD COLUMN lease_until REAL NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                pass
+        self._db.commit()
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._transport is None:
+            return _client()
+        if self._http is None:
+            self._http = httpx.AsyncClient(transport=self._transport, timeout=60)
+        return self._http
+
+    def pending(self) -> int:
+        return len(self._unsaved) + sum(len(q) for q in self._queues.values())
+
+    # ---------- enqueue ----------
+    def _put(self, item: OutboxItem):
+        self._queues.setdefault(item.chat_id, deque()).append(item)
+        task = self._tasks.get(item.chat_id)
+        if task is None or task.done():
+            try:
+                self._tasks[item.chat_id] = asyncio.get_running_loop().create_task(self._drain(item.chat_id))
+            except RuntimeError:
+                pass  # no loop yet: start() picks it up
+
+    def _store(self, items: list[OutboxItem]):
+        # One transaction for the batch: the charts of a whole tick share one commit
+        lease = time.time() + LEASE_SECONDS
+        with self._lock, self._db:
+            for it in items:
+                it.id = self._db.execute(
+                    "INSERT INTO outbox (chat_id, kind, text, photo, owner, lease_until) VALUES (?, ?, ?, ?, ?, ?)",
+                    (it.chat_id, it.kind, it.text, it.photo, self.owner, lease)).lastrowid
+
+    async def _save(self):
+        # Items enqueued while a batch is being written go into the next one
+        while self._unsaved:
+            batch, self._unsaved = self._unsaved, []
+            try:
+                await asyncio.to_thread(self._store, batch)
+            except Exception as e:
+                log.warning("telegram outbox: %d item(s) not persisted: %s", len(batch), e)
+            for it in batch:
+                self._put(it)
+
+    def _insert(self, chat_id: str, kind: str, text: str, photo: bytes | None) -> OutboxItem:
+        item = OutboxItem(0, str(chat_id), kind, text, photo)  # the id is assigned once it is stored
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:  # no loop yet: store it here, start() sends it
+            self._store([item])
+            self._put(item)
+            return item
+        self._unsaved.append(item)
+        if self._saver is None or self._saver.done():
+            self._saver = loop.create_task(self._save())
+        return item
+
+    def enqueue_message(self, chat_id: str, text: str) -> OutboxItem:
+        return self._insert(chat_id, "message", text, None)
+
+    def enqueue_photo(self, chat_id: str, photo: bytes, caption: str = "") -> OutboxItem:
+        return self._insert(chat_id, "photo", caption, photo)
+
+    # ---------- delivery ----------
+    def _chat_limiter(self, chat_id: str) -> AdaptiveRateLimiter:
+        lim = self._chat_limiters.get(chat_id)
+        if lim is None:
+            lim = self._chat_limiters[chat_id] = AdaptiveRateLimiter(rate=GROUP_RATE if chat_id.startswith("-") else CHAT_RATE)
+        return lim
+
+    async def _post(self, chat_id: str, group: list[OutboxItem]) -> httpx.Response:
+        base = f"{API_URL}/bot{self.bot_token}"
+        first = group[0]
+        if first.kind == "message":
+            return await self.http.post(f"{base}/sendMessage", json={
+                "chat_id": chat_id, "text": first.text, "parse_mode": "HTML", "disable_web_page_preview": True})
+        if len(group) == 1:
+            return await self.http.post(f"{base}/sendPhoto", data={"chat_id": chat_id, "caption": first.text, "parse_mode": "HTML"},
+                                        files={"photo": ("chart.png", first.photo, "image/png")})
+        media = [{"type": "photo", "media": f"attach://p{i}", "caption": it.text, "parse_mode": "HTML"} for i, it in enumerate(group)]
+        files = {f"p{i}": (f"chart{i}.png", it.photo, "image/png") for i, it in enumerate(group)}
+        return await self.http.post(f"{base}/sendMediaGroup", data={"chat_id": chat_id, "media": json.dumps(media)}, files=files)
+
+    def _done(self, chat_id: str, group: list[OutboxItem]):
+        q = self._queues[chat_id]
+        for it in group:
+            q.remove(it)
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM outbox WHERE id = ?", [(it.id,) for it in group])
+
+    def _retry(self, chat_id: str, group: list[OutboxItem], delay: float | None, reason: str):
+        UPSTREAM_RETRIES.inc(service="telegram", reason="429" if delay is not None else "error")
+        now = time.monotonic()
+        for it in group:
+            it.attempts += 1
+            if delay is None:
+                if it.attempts >= self.max_attempts:
+                    continue
+                it.not_before = now + min(self.max_backoff, self.backoff * 2 ** (it.attempts - 1))
+            else:
+                it.not_before = now + delay
+        gone = [it for it in group if delay is None and it.attempts >= self.max_attempts]
+        if gone:
+            log.warning("telegram %s: giving up on %d item(s) after %s", chat_id, len(gone), reason)
+            self.dropped += len(gone)
+            self._done(chat_id, gone)
+        with self._lock, self._db:
+            self._db.executemany("UPDATE outbox SET attempts = ? WHERE id = ?", [(it.attempts, it.id) for it in group])
+
+    async def _send(self, chat_id: str, group: list[OutboxItem]):
+        await self.limiter.acquire()
+        await self._chat_limiter(chat_id).acquire()
+        t0 = time.perf_counter()
+        try:
+            r = await self._post(chat_id, group)
+        except httpx.TransportError as e:
+            UPSTREAM_REQUESTS.inc(service="telegram", status="error")
+            self._retry(chat_id, group, None, repr(e))
+            return
+        UPSTREAM_SECONDS.observe(time.perf_counter() - t0, service="telegram")
+        UPSTREAM_REQUESTS.inc(service="telegram", status=r.status_code)
+        if r.status_code == 200:
+            self.sent += len(group)
+            self._done(chat_id, group)
+        elif r.status_code == 429:
+            try:
+                wait = float(r.json().get("parameters", {}).get("retry_after", 1))
+            except ValueError:
+                wait = 1.0
+            self._chat_limiter(chat_id).pause(wait)
+            self._retry(chat_id, group, wait, "429")
+        elif r.status_code >= 500:
+            self._retry(chat_id, group, None, f"HTTP {r.status_code}")
+        else:
+            log.warning("telegram %s rejected %s: %s %s", chat_id, group[0].kind, r.status_code, r.text[:200])
+            self.dropped += len(group)
+            self._done(chat_id, group)
+
+    def _batches(self, due: list[OutboxItem]) -> list[list[OutboxItem]]:
+        # Texts first, in order; then the charts as albums of up to ten
+        photos = [it for it in due if it.kind == "photo"]
+        out = [[it] for it in due if it.kind == "message"]
+        out += [photos[i:i + MEDIA_GROUP_MAX] for i in range(0, len(photos), MEDIA_GROUP_MAX)]
+        return out
+
+    async def _drain(self, chat_id: str):
+        q = self._queues[chat_id]
+        while q:
+            now = time.monotonic()
+            fresh = [it.queued_at for it in q if it.kind == "photo" and it.attempts == 0]
+            if fresh and now - max(fresh) < self.batch_window:
+                await asyncio.sleep(max(fresh) + self.batch_window - now)  # let the rest of the tick's charts arrive
+                continue
+            wait = min(it.not_before for it in q) - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            for group in self._batches([it for it in q if it.not_before <= now]):
+                await self._send(chat_id, group)
+
+    # ---------- lifecycle ----------
+    def _claim(self) -> list[OutboxItem]:
+        """Renew the lease on this worker's rows and take over unowned or expired ones."""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")  # one worker claims at a time
+            rows = self._db.execute("SELECT id, chat_id, kind, text, photo, attempts FROM outbox"
+                                    " WHERE owner IS NULL OR (owner != ? AND lease_until < ?) ORDER BY id",
+                                    (self.owner, now)).fetchall()
+            self._db.executemany("UPDATE outbox SET owner = ? WHERE id = ?", [(self.owner, r[0]) for r in rows])
+            self._db.execute("UPDATE outbox SET lease_until = ? WHERE owner = ?", (now + LEASE_SECONDS, self.owner))
+        return [OutboxItem(id_, chat_id, kind, text, photo, attempts, queued_at=0.0)
+                for id_, chat_id, kind, text, photo, attempts in rows]
+
+    async def _renew(self):
+        while True:
+            await asyncio.sleep(LEASE_SECONDS / 3)
+            try:
+                for item in await asyncio.to_thread(self._claim):
+                    self._put(item)
+            except sqlite3.Error as e:
+                log.warning("telegram outbox: lease renewal failed: %s", e)
+
+    def start(self):
+        """Re-queue what a previous run (or a worker that died) left undelivered.
+
+        Rows another live worker holds are left to it.
+        """
+        for item in self._claim():
+            self._put(item)
+        loop = asyncio.get_running_loop()
+        for chat_id in list(self._queues):
+            if self._queues[chat_id] and (chat_id not in self._tasks or self._tasks[chat_id].done()):
+                self._tasks[chat_id] = loop.create_task(self._drain(chat_id))
+        if self._lease is None or self._lease.done():
+            self._lease = loop.create_task(self._renew())
+
+    async def flush(self, timeout: float | None = None):
+        """Wait until every queue is drained (or `timeout` passes)."""
+        if self._saver is not None and not self._saver.done():
+            await asyncio.wait([self._saver], timeout=timeout)
+        tasks = [t for t in self._tasks.values() if not t.done()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+    async def stop(self):
+        if self._saver is not None:
+            await asyncio.gather(self._saver, return_exceptions=True)  # what was enqueued is kept
+        tasks = [*self._tasks.values(), *([self._lease] if self._lease is not None else [])]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._lease = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        with self._lock, self._db:  # hand the undelivered rows straight to the next worker that starts
+            self._db.execute("UPDATE outbox SET owner = NULL WHERE owner = ?", (self.owner,))
+        self._db.close()
+
+_outbox: TelegramOutbox | None = None
+
+def get_outbox(bot_token: str) -> TelegramOutbox:
+    global _outbox
+    if _outbox is None:
+        _outbox = TelegramOutbox(bot_token)
+    return _outbox
+
+async def close_outbox():
+    global _outbox
+    if _outbox is not None:
+        await _outbox.stop()
+        _outbox = None
+    await close_client()
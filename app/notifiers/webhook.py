@@ -0,0 +1,54 @@
+from __future__ import annotations
+import asyncio
+import logging
+import time
+
+import httpx
+
+from app.services.metrics import UPSTREAM_REQUESTS, UPSTREAM_RETRIES, UPSTREAM_SECONDS
+
+log = logging.getLogger(__name__)
+
+_http: httpx.AsyncClient | None = None
+_pending: set[asyncio.Task] = set()
+
+def _client() -> httpx.AsyncClient:
+    global _http
+    if _http is None or _http.is_closed:
+        _http = httpx.AsyncClient(timeout=15, limits=httpx.Limits(max_connections=32, max_keepalive_connections=16))
+    return _http
+
+async def post_webhook(url: str, payload: dict, retries: int = 3, backoff: float = 1.0) -> bool:
+    for attempt in range(retries + 1):
+        t0 = time.perf_counter()
+        try:
+            r = await _client().post(url, json=payload)
+            UPSTREAM_SECONDS.observe(time.perf_counter() - t0, service="webhook")
+            UPSTREAM_REQUESTS.inc(service="webhook", status=r.status_code)
+            if r.status_code < 500 and r.status_code != 429:
+                if r.status_code >= 400:
+                    log.warning("webhook %s rejected alert: %s", url, r.status_code)
+                return r.status_code < 400
+        except httpx.TransportError as e:
+            UPSTREAM_REQUESTS.inc(service="webhook", status="error")
+            log.debug("webhook %s: %r", url, e)
+        if attempt < retries:
+            UPSTREAM_RETRIES.inc(service="webhook", reason="error")
+            await asyncio.sleep(backoff * 2 ** attempt)
+    log.warning("webhook %s: giving up after %d attempts", url, retries + 1)
+    return False
+
+def enqueue_webhook(url: str, payload: dict) -> asyncio.Task:
+    # Fire-and-forget: the signal job does not wait for the receiver
+    t = asyncio.get_running_loop().create_task(post_webhook(url, payload))
+    _pending.add(t)
+    t.add_done_callback(_pending.discard)
+    return t
+
+async def close_client():
+    global _http
+    for t in list(_pending):
+        t.cancel()
+    if _http is not None:
+        await _http.aclose()
+        _http = None
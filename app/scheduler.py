@@ -1,20 +1,31 @@
 from __future__ import annotations
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
 import asyncio
+import logging
+import time
+from datetime import datetime
 
 from app.config import settings
-from app.clients.bybit_client import fetch_klines
+from app.services.candle_store import get_bars
 from app.indicators.ta import (
     IndicatorParams,
-    compute_indicators,
     compute_fib_031,
     approximate_zones,
 )
+from app.indicators.stream import get_engine
+from app.indicators.panel import build_panel, compute_panel, make_signal_panel
 from app.strategies.rules import make_signal
-from app.clients.plot import plot_chart
-from app.notifiers.telegram import send_telegram, send_telegram_photo
-from app.services.signal_state import load_for, save_for, diff_indicators
+from app.services.executor import render_chart, run_cpu
+from app.services.frame_cache import frame_key, get_frame_cache
+from app.notifiers.telegram import get_outbox
+from app.notifiers.webhook import enqueue_webhook
+from app.services.subscribers import Subscription, get_registry
+from app.services.metrics import JOB_LAG_SECONDS, JOB_MISFIRES, JOBS_SKIPPED, STAGE_SECONDS
+from app.services.signal_state import load_for, save_for, diff_indicators, flush_state
+
+log = logging.getLogger(__name__)
 
 CRON_MAP = {
     "1m":  CronTrigger(minute="*"),
@@ -30,6 +41,7 @@ CRON_MAP = {
     "w":   CronTrigger(day_of_week="mon", hour=0, minute=10),
     "m":   CronTrigger(day=1, hour=0, minute=15),
 }
+TICK_TRIGGER = CronTrigger(minute="*")
 
 def _format_caption(symbol: str, timeframe: str, sig: dict, changed: list[str], fib: dict | None, zones: dict | None) -> str:
     ind = sig.get("metadata", {}).get("indicators", {})
@@ -61,41 +73,213 @@ def _format_caption(symbol: str, timeframe: str, sig: dict, changed: list[str],
         f"{body}{fib_line}{z_line}"
     )
 
-async def run_signal_once(symbol: str, timeframe: str, params: "IndicatorParams"):
-    df = await fetch_klines(symbol, timeframe, limit=500)
-    data = compute_indicators(df, params)
+def _fib_and_zones(data):
+    return compute_fib_031(data), approximate_zones(data)
+
+CROSS_KEYS = ("EMA 35/75", "EMA 75/200", "MACD Cross")
 
-    fib = compute_fib_031(data)
-    zones = approximate_zones(data)
+def _recipients(symbol: str, timeframe: str, events: list[tuple[str, str]]) -> list[Subscription]:
+    subs = get_registry().match(symbol, timeframe, events)
+    # The configured chat keeps getting every cross alert, as before subscriptions existed
+    if settings.telegram_chat_id and not any(s.kind == "telegram" and s.address == str(settings.telegram_chat_id) for s in subs):
+        subs.append(Subscription(kind="telegram", address=str(settings.telegram_chat_id), id="default"))
+    if not settings.telegram_bot_token:
+        subs = [s for s in subs if s.kind != "telegram"]
+    return subs
 
-    sig = make_signal(data, timeframe, params, risk_reward=settings.risk_reward)
+async def _deliver(symbol: str, timeframe: str, data, sig: dict):
     new_ind = sig.get("metadata", {}).get("indicators", {})
     old_ind = load_for(symbol, timeframe)
     changed = diff_indicators(old_ind, new_ind)
 
-    # Send notifications ONLY when EMA/MACD crosses change (not other indicators)
-    if settings.telegram_bot_token and settings.telegram_chat_id and changed:
-        cross_keys = {"MACD Cross", "EMA 35/75", "EMA 75/200"}
-        # Only send signal when EMA/MACD indicators change to BUY/SELL
-        should_signal = any(
-            (k in cross_keys) and (new_ind.get(k) in ("BUY", "SELL")) for k in changed
-        )
-        
-        if should_signal:
-            caption = _format_caption(symbol, timeframe, sig, changed, fib, zones)
-            await send_telegram(settings.telegram_bot_token, settings.telegram_chat_id, caption)
-
-            # Send snapshot ONLY on EMA/MACD crosses
-            should_snapshot = any(
-                (k in cross_keys) and (new_ind.get(k) in ("BUY", "SELL")) for k in changed
-            )
-            if should_snapshot:
-                png = plot_chart(data, symbol, timeframe, fib=fib, zones=zones)
-                await send_telegram_photo(settings.telegram_bot_token, settings.telegram_chat_id, png, caption)
+    # Alerts fire ONLY when an EMA/MACD cross changes to BUY/SELL (not other indicators)
+    events = [(k, new_ind[k]) for k in changed if k in CROSS_KEYS and new_ind.get(k) in ("BUY", "SELL")]
+    subs = _recipients(symbol, timeframe, events) if events else []
+    if subs:
+        # fib/zones, caption and chart are built once and shared by every recipient
+        labels = {"symbol": symbol, "timeframe": timeframe}
+        with STAGE_SECONDS.time(stage="fib_zones", **labels):
+            fib, zones = await run_cpu(_fib_and_zones, data)
+        caption = _format_caption(symbol, timeframe, sig, changed, fib, zones)
+        png = None
+        if any(sub.charts for sub in subs):
+            with STAGE_SECONDS.time(stage="chart", **labels):
+                png = await render_chart(data, symbol, timeframe, fib=fib, zones=zones,
+                                         size=settings.chart_size, quantize=settings.chart_quantize)
+        payload = None
+        t0 = time.perf_counter()
+        for sub in subs:
+            # Delivery is queued: the job never waits on Telegram or a webhook
+            if sub.kind == "telegram":
+                outbox = get_outbox(settings.telegram_bot_token)
+                outbox.enqueue_message(sub.address, caption)
+                if sub.charts:
+                    outbox.enqueue_photo(sub.address, png, caption)
+            elif sub.kind == "webhook":
+                if payload is None:
+                    payload = {"symbol": symbol, "timeframe": timeframe, "changed": changed, "signal": sig,
+                               "fib031": fib, "zones": zones, "caption": caption}
+                enqueue_webhook(sub.address, payload)
+        STAGE_SECONDS.observe(time.perf_counter() - t0, stage="enqueue", **labels)
 
     save_for(symbol, timeframe, new_ind)
+
+def indicators_on_bars(symbol: str, timeframe: str, params: "IndicatorParams", df):
+    # Incremental: only the bars that closed since the last run go through the indicator math
+    cache = get_frame_cache()
+    eng = get_engine(symbol, timeframe, params)
+    if len(df) > eng.capacity:
+        # the engine keeps `capacity` bars: a longer window gets the batch computation
+        return cache.get_or_compute(symbol, timeframe, df, params)
+    # The engine's EMAs carry state from before this window, so its output is cached apart
+    # from the batch frames under frame_key that the API routes serve
+    key = frame_key(symbol, timeframe, df, params) + ("stream",) if len(df) else None
+    data = cache.get(key) if key else None
+    if data is None:
+        with eng.lock:
+            data = eng.sync(df)
+        if key:
+            cache.put(key, data)
+    return data
+
+def _signal_on_bars(symbol: str, timeframe: str, params: "IndicatorParams", df):
+    labels = {"symbol": symbol, "timeframe": timeframe}
+    with STAGE_SECONDS.time(stage="indicators", **labels):
+        data = indicators_on_bars(symbol, timeframe, params, df)
+    with STAGE_SECONDS.time(stage="signal", **labels):
+        sig = make_signal(data, timeframe, params, risk_reward=settings.risk_reward)
+    return data, sig
+
+def _signal_panel(frames: dict, timeframe: str, params: "IndicatorParams"):
+    # symbol="*": one pass covers the timeframe's whole universe
+    with STAGE_SECONDS.time(stage="indicators", symbol="*", timeframe=timeframe):
+        panel = build_panel(frames)
+        ind = compute_panel(panel, params)
+    with STAGE_SECONDS.time(stage="signal", symbol="*", timeframe=timeframe):
+        sigs = make_signal_panel(panel, ind, timeframe, params, risk_reward=settings.risk_reward)
+    # Share the per-symbol frames with the API routes asking for the same bars and params
+    cache = get_frame_cache()
+    for i, sym in enumerate(panel.symbols):
+        df, data = frames[sym], panel.bars(i, ind)
+        if len(df) and len(data) == len(df):  # no holes padded in by the shared axis
+            cache.put(frame_key(sym, timeframe, df, params), data)
+    return panel, ind, sigs
+
+async def run_signal_on_bars(symbol: str, timeframe: str, params: "IndicatorParams", df):
+    data, sig = await run_cpu(_signal_on_bars, symbol, timeframe, params, df)
+    await _deliver(symbol, timeframe, data, sig)
     return sig
 
+async def run_signal_once(symbol: str, timeframe: str, params: "IndicatorParams"):
+    with STAGE_SECONDS.time(stage="fetch", symbol=symbol, timeframe=timeframe):
+        df = await get_bars(symbol, timeframe, limit=500)
+    try:
+        return await run_signal_on_bars(symbol, timeframe, params, df)
+    finally:
+        flush_state()
+
+async def evaluate_timeframe(frames: dict, timeframe: str, params: "IndicatorParams") -> dict[str, dict]:
+    # One panel pass for the math, then per-symbol alerts/state
+    if not frames:
+        return {}
+    panel, ind, sigs = await run_cpu(_signal_panel, frames, timeframe, params)
+
+    results = {}
+    for i, sym in enumerate(panel.symbols):
+        try:
+            await _deliver(sym, timeframe, panel.bars(i, ind), sigs[i])
+        except Exception as e:
+            log.warning("deliver %s %s failed: %s", sym, timeframe, e)
+        results[sym] = sigs[i]
+    return results
+
+async def run_timeframe_once(symbols: list[str], timeframe: str, params: "IndicatorParams") -> dict[str, dict]:
+    # Whole symbol universe of one timeframe: concurrent fetch, then one panel pass
+    fetched = await asyncio.gather(*(get_bars(s, timeframe, limit=500) for s in symbols), return_exceptions=True)
+    frames = {}
+    for sym, df in zip(symbols, fetched):
+        if isinstance(df, Exception):
+            log.warning("fetch %s %s failed: %s", sym, timeframe, df)
+        else:
+            frames[sym] = df
+    return await evaluate_timeframe(frames, timeframe, params)
+
+# ---------------- Dispatcher ----------------
+TF_SECONDS = {
+    "1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "2h": 7200, "4h": 14400,
+    "6h": 21600, "12h": 43200, "d": 86400, "w": 604800, "m": 2592000,
+}
+MAX_JOB_DELAY = 300  # seconds after the fire time a job may still start
+
+def job_deadline(timeframe: str) -> float:
+    return min(TF_SECONDS.get(timeframe, 3600) / 4, MAX_JOB_DELAY)
+
+def due_timeframes(timeframes: list[str], now: datetime) -> list[str]:
+    """Timeframes whose CRON_MAP trigger fires in the minute of `now`, shortest first."""
+    minute = now.replace(second=0, microsecond=0)
+    due = [tf for tf in timeframes
+           if tf in CRON_MAP and CRON_MAP[tf].get_next_fire_time(None, minute) == minute]
+    return sorted(due, key=lambda tf: TF_SECONDS.get(tf, 0))
+
+class Dispatcher:
+    """Runs every (symbol, timeframe) due on a tick as one batch.
+
+    Fetches share a bounded semaphore (FIFO, so shorter timeframes queued first go first),
+    pacing/backoff comes from the Bybit client's adaptive rate limiter, and a fetch that
+    cannot start before its timeframe's deadline is skipped instead of piling up.
+    """
+
+    def __init__(self, symbols: list[str], timeframes: list[str], params: "IndicatorParams", concurrency: int = 8):
+        self.symbols = list(symbols)
+        self.timeframes = list(timeframes)
+        self.params = params
+        self._sem = asyncio.Semaphore(max(1, concurrency))
+        self.skipped = 0
+
+    async def _fetch(self, symbol: str, timeframe: str, deadline: float):
+        loop = asyncio.get_running_loop()
+        async with self._sem:
+            left = deadline - loop.time()
+            if left <= 0:
+                self.skipped += 1
+                JOBS_SKIPPED.inc(timeframe=timeframe)
+                log.warning("skip %s %s: past its deadline", symbol, timeframe)
+                return None
+            with STAGE_SECONDS.time(stage="fetch", symbol=symbol, timeframe=timeframe):
+                return await asyncio.wait_for(get_bars(symbol, timeframe, limit=500), timeout=left)
+
+    async def _run_timeframe(self, timeframe: str, fired_at: datetime) -> dict[str, dict]:
+        loop = asyncio.get_running_loop()
+        late = (datetime.now(fired_at.tzinfo) - fired_at).total_seconds()
+        JOB_LAG_SECONDS.observe(max(0.0, late), timeframe=timeframe)
+        deadline = loop.time() + job_deadline(timeframe) - late
+        fetched = await asyncio.gather(*(self._fetch(s, timeframe, deadline) for s in self.symbols),
+                                       return_exceptions=True)
+        frames = {}
+        for sym, df in zip(self.symbols, fetched):
+            if isinstance(df, Exception):
+                log.warning("fetch %s %s failed: %r", sym, timeframe, df)
+            elif df is not None:
+                frames[sym] = df
+        return await evaluate_timeframe(frames, timeframe, self.params)
+
+    async def tick(self, now: datetime | None = None) -> dict[str, dict]:
+        now = now or datetime.now(TICK_TRIGGER.timezone)
+        fired_at = now.replace(second=0, microsecond=0)
+        due = due_timeframes(self.timeframes, fired_at)
+        if not due:
+            return {}
+        try:
+            results = await asyncio.gather(*(self._run_timeframe(tf, fired_at) for tf in due))
+        finally:
+            flush_state()  # one state write for the whole tick
+        return dict(zip(due, results))
+
+def _on_missed(event):
+    # APScheduler drops these silently otherwise
+    JOB_MISFIRES.inc(job=event.job_id)
+    log.warning("scheduler job %s missed its run at %s", event.job_id, getattr(event, "scheduled_run_time", None))
+
 def configure_scheduler(app_state, params: "IndicatorParams"):
     scheduler = AsyncIOScheduler()
     # Use live app settings (from FastAPI state), not static config defaults
@@ -106,14 +290,38 @@ def configure_scheduler(app_state, params: "IndicatorParams"):
         tf_list = settings.timeframes
         symbols = settings.symbols if settings.symbols else [settings.default_symbol]
 
-    # Schedule jobs for each symbol and timeframe
-    for symbol in symbols:
-        for tf, trig in CRON_MAP.items():
-            if tf in tf_list:
-                scheduler.add_job(
-                    run_signal_once,
-                    trig,
-                    args=[symbol, tf, params]
-                )
+    # A single per-minute tick batches everything due (one panel pass per timeframe)
+    dispatcher = Dispatcher(symbols, [tf for tf in CRON_MAP if tf in tf_list], params,
+                            concurrency=settings.scheduler_concurrency)
+    scheduler.add_job(dispatcher.tick, TICK_TRIGGER, max_instances=3, coalesce=True, misfire_grace_time=30,
+                      id="tick")
+    scheduler.add_listener(_on_missed, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+    app_state.dispatcher = dispatcher
     scheduler.start()
-    app_state.scheduler = scheduler
\ No newline at end of file
+    app_state.scheduler = scheduler
+
+def start_kline_stream(app_state, params: "IndicatorParams"):
+    # Push mode: evaluate each (symbol, timeframe) the moment its candle closes on the WebSocket
+    from app.clients.bybit_client import get_client
+    from app.clients.bybit_ws import KlineStream
+
+    try:
+        tf_list = getattr(app_state, "settings").timeframes
+        symbols = getattr(app_state, "settings").symbols
+    except Exception:
+        tf_list = settings.timeframes
+        symbols = settings.symbols if settings.symbols else [settings.default_symbol]
+
+    async def on_close(symbol: str, timeframe: str, df):
+        try:
+            await run_signal_on_bars(symbol, timeframe, params, df)
+        except Exception as e:
+            log.warning("stream signal %s %s failed: %r", symbol, timeframe, e)
+        finally:
+            flush_state()
+
+    stream = KlineStream(symbols, [tf for tf in CRON_MAP if tf in tf_list], on_close,
+                         client=get_client(), url=settings.bybit_ws_url)
+    stream.start()
+    app_state.kline_stream = stream
+    return stream
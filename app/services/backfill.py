@@ -0,0 +1,188 @@
+# app/services/backfill.py
+"""Historical klines beyond Bybit's 1000-bar page, written into the candle store.
+
+    python -m app.services.backfill --symbols BTCUSDT,ETHUSDT --timeframes 15m,1h \\
+        --start 2023-01-01 --end 2025-01-01
+
+A range is split into chunks of PAGE bars on a fixed epoch grid that are fetched
+concurrently; pacing and retries come from the shared client's rate limiter.
+Fetched chunks are merged into the store in batches (the merge dedups on open_time) and
+recorded in the series' `backfill.json`, so an interrupted run resumes where it stopped.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+import numpy as np
+
+from app.services.candle_store import COLUMNS, DTYPES, CandleSeries, CandleStore, frame_to_columns
+from app.services.resample import INTERVAL_MS
+
+log = logging.getLogger(__name__)
+
+PAGE = 1000         # Bybit's kline limit per request
+FLUSH_CHUNKS = 16   # chunks merged into the store per write
+
+def parse_time(value: str | int | float) -> int:
+    """Epoch ms from epoch ms/seconds or an ISO date/datetime (UTC unless it says otherwise)."""
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        v = int(value)
+        return v if v > 10**11 else v * 1000
+    dt = datetime.fromisoformat(str(value))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+def chunk_ranges(start_ms: int, end_ms: int, interval: str, page: int = PAGE) -> list[tuple[int, int]]:
+    """Inclusive [first, last] open_time pairs of `page` bars covering the range.
+
+    Chunks sit on a fixed epoch grid, so overlapping requests (and resumed runs) name the
+    same chunks; the first and last may reach past the requested range.
+    """
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"backfill does not support interval {interval!r}")
+    bar = INTERVAL_MS[interval]
+    span = page * bar
+    return [(s, s + span - bar) for s in range(start_ms // span * span, end_ms + 1, span)]
+
+def _manifest(series: CandleSeries) -> dict:
+    path = series.dir / "backfill.json"
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"done": []}
+
+def _save_manifest(series: CandleSeries, manifest: dict):
+    series.dir.mkdir(parents=True, exist_ok=True)
+    path = series.dir / "backfill.json"
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    tmp.replace(path)
+
+def _covered(series: CandleSeries, chunks: list[tuple[int, int]], interval: str) -> set[tuple[int, int]]:
+    # Chunks the store already holds in full (e.g. from the live sync) need no request
+    ot = series.arrays()["open_time"]
+    if not len(ot):
+        return set()
+    bar = INTERVAL_MS[interval]
+    lo = np.searchsorted(ot, [s for s, _ in chunks], side="left")
+    hi = np.searchsorted(ot, [e for _, e in chunks], side="right")
+    return {c for c, n in zip(chunks, hi - lo) if n == (c[1] - c[0]) // bar + 1}
+
+def _merge(series: CandleSeries, parts: list[dict]):
+    parts = [p for p in parts if len(p["open_time"])]
+    if not parts:
+        return
+    cols = {c: np.concatenate([p[c] for p in parts]).astype(DTYPES[c], copy=False) for c in COLUMNS}
+    _, idx = np.unique(cols["open_time"][::-1], return_index=True)  # sorted, later chunks win
+    idx = len(cols["open_time"]) - 1 - idx
+    series.merge({c: v[idx] for c, v in cols.items()})
+
+async def backfill(client, store: CandleStore, symbol: str, interval: str, start_ms: int, end_ms: int,
+                   concurrency: int = 4, sem: asyncio.Semaphore | None = None,
+                   progress: Callable[[str, str, int, int], None] | None = None) -> int:
+    """Fetch [start_ms, end_ms] for one series into `store`; returns the number of bars fetched.
+
+    Pass a shared `sem` to bound concurrency across several series.
+    """
+    series = store.series(symbol, interval)
+    chunks = chunk_ranges(start_ms, end_ms, interval)
+    manifest = _manifest(series)
+    done = {tuple(c) for c in manifest["done"]} | _covered(series, chunks, interval)
+    todo = [c for c in chunks if c not in done]
+    sem = sem or asyncio.Semaphore(max(1, concurrency))
+    finished = len(chunks) - len(todo)
+    fetched = 0
+    if progress:
+        progress(symbol, interval, finished, len(chunks))
+
+    async def fetch(chunk: tuple[int, int]) -> tuple[tuple[int, int], dict]:
+        async with sem:
+            df = await client.fetch_klines(symbol, interval, limit=PAGE, start=chunk[0], end=chunk[1])
+        return chunk, frame_to_columns(df)
+
+    bar = INTERVAL_MS[interval]
+    pending: list[tuple[tuple[int, int], dict]] = []
+
+    def flush():
+        # merge first, then mark done: a crash in between only costs a refetch
+        _merge(series, [cols for _, cols in pending])
+        closed = int(time.time() * 1000) - bar  # a chunk still forming bars is fetched again next time
+        manifest["done"] = sorted({tuple(c) for c in manifest["done"]} | {c for c, _ in pending if c[1] <= closed})
+        _save_manifest(series, manifest)
+        pending.clear()
+
+    tasks = [asyncio.create_task(fetch(c)) for c in todo]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            chunk, cols = await fut
+            fetched += len(cols["open_time"])
+            pending.append((chunk, cols))
+            finished += 1
+            if len(pending) >= FLUSH_CHUNKS:
+                flush()
+            if progress:
+                progress(symbol, interval, finished, len(chunks))
+    finally:
+        for t in tasks:
+            t.cancel()
+        if pending:
+            flush()
+    return fetched
+
+async def backfill_many(client, store: CandleStore, symbols: list[str], intervals: list[str], start_ms: int, end_ms: int,
+                        concurrency: int = 8, progress: Callable[[str, str, int, int], None] | None = None) -> dict[str, int]:
+    """Every (symbol, interval) under one request budget; {"SYMBOL interval": bars fetched | -1 on error}."""
+    sem = asyncio.Semaphore(max(1, concurrency))
+    pairs = [(s.upper(), tf) for s in symbols for tf in intervals]
+    results = await asyncio.gather(*(backfill(client, store, s, tf, start_ms, end_ms, sem=sem, progress=progress)
+                                     for s, tf in pairs), return_exceptions=True)
+    out = {}
+    for (s, tf), r in zip(pairs, results):
+        if isinstance(r, BaseException):
+            log.warning("backfill %s %s failed: %r", s, tf, r)
+            out[f"{s} {tf}"] = -1
+        else:
+            out[f"{s} {tf}"] = r
+    return out
+
+def main(argv: list[str] | None = None):
+    from app.clients.bybit_client import close_client, get_client
+    from app.services.candle_store import get_store
+
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--symbols", required=True, help="comma-separated")
+    ap.add_argument("--timeframes", default="15m", help="comma-separated")
+    ap.add_argument("--start", required=True, help="ISO date/datetime or epoch ms")
+    ap.add_argument("--end", default=None, help="default: now")
+    ap.add_argument("--concurrency", type=int, default=8)
+    args = ap.parse_args(argv)
+
+    start = parse_time(args.start)
+    end = parse_time(args.end) if args.end else int(time.time() * 1000)
+    symbols = [s.strip() for s in args.symbols.split(",") if s.strip()]
+    intervals = [t.strip() for t in args.timeframes.split(",") if t.strip()]
+
+    def progress(symbol, interval, done, total):
+        print(f"{symbol} {interval}: {done}/{total} chunks", flush=True)
+
+    async def run():
+        try:
+            return await backfill_many(get_client(), get_store(), symbols, intervals, start, end,
+                                       args.concurrency, progress)
+        finally:
+            await close_client()
+
+    t0 = time.perf_counter()
+    out = asyncio.run(run())
+    print(json.dumps({"bars": out, "seconds": round(time.perf_counter() - t0, 1)}))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+# app/services/candle_store.py
+from __future__ import annotations
+import asyncio
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.indicators.buffer import Bars
+
+try:  # POSIX only; on Windows writers fall back to the in-process lock
+    import fcntl
+except ImportError:
+    fcntl = None
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_ROOT = os.getenv("CANDLE_STORE_PATH", str(BASE_DIR / "data" / "candles"))
+
+# One raw little-endian file per column; open_time is epoch milliseconds
+COLUMNS = ("open_time", "open", "high", "low", "close", "volume")
+DTYPES = {"open_time": np.dtype("<i8"), **{c: np.dtype("<f8") for c in COLUMNS[1:]}}
+MAX_PAGE = 1000  # bars per Bybit kline request
+MAX_DERIVE_BARS = 20 * MAX_PAGE  # base history paged in to derive a timeframe; beyond that it is fetched directly
+
+
+class CandleSeries:
+    """Append-mostly columnar OHLCV for one (symbol, interval), memory-mapped for readers.
+
+    `meta.json` names the row count and the generation of the column files, and is swapped
+    in atomically after they are written. Appends (and the rewrite of the still-open last
+    bar) go into the current generation past what readers were told about; a rewrite of
+    the whole series (an out-of-order merge or `reset`) writes a new generation, so a reader
+    in another worker keeps mapping a consistent, fully written set of files.
+    """
+
+    def __init__(self, root: Path, symbol: str, interval: str):
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self.dir = Path(root) / self.symbol / interval
+
+    # ---------- reading ----------
+    def _path(self, col: str, gen: int = 0) -> Path:
+        return self.dir / (f"{col}.bin" if gen == 0 else f"{col}.{gen}.bin")
+
+    def _meta(self) -> tuple[int, int]:
+        """(rows, generation) as last committed."""
+        meta = self.dir / "meta.json"
+        try:
+            with meta.open("r", encoding="utf-8") as f:
+                m = json.load(f)
+            return int(m.get("rows", 0)), int(m.get("gen", 0))
+        except (ValueError, OSError):
+            return 0, 0
+
+    def __len__(self) -> int:
+        return self._meta()[0]
+
+    def _maps(self, cols: tuple[str, ...]) -> Dict[str, np.ndarray]:
+        # A writer drops a generation two rewrites later: if the files named by the meta
+        # just read are already gone, read the meta again
+        for attempt in range(3):
+            n, gen = self._meta()
+            if n == 0:
+                return {c: np.empty(0, dtype=DTYPES[c]) for c in cols}
+            try:
+                return {c: np.memmap(self._path(c, gen), dtype=DTYPES[c], mode="r", shape=(n,)) for c in cols}
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+
+    def arrays(self, tail: int | None = None) -> Dict[str, np.ndarray]:
+        maps = self._maps(COLUMNS)
+        n = len(maps["open_time"])
+        start = max(n - tail, 0) if tail else 0
+        return {c: m[start:] for c, m in maps.items()}
+
+    def frame(self, tail: int | None = None) -> pd.DataFrame:
+        cols = self.arrays(tail)
+        cols["open_time"] = cols["open_time"].view("datetime64[ms]")
+        return pd.DataFrame(cols, copy=False)
+
+    def last_open_time(self) -> Optional[int]:
+        ot = self._maps(("open_time",))["open_time"]
+        return int(ot[-1]) if len(ot) else None
+
+    # ---------- writing ----------
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(self.dir / ".lock", "a+b") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _commit(self, rows: int, gen: int):
+        meta = self.dir / "meta.json"
+        tmp = meta.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"symbol": self.symbol, "interval": self.interval, "rows": rows, "gen": gen}, f)
+        tmp.replace(meta)
+
+    def _write_at(self, gen: int, pos: int, cols: Dict[str, np.ndarray]):
+        for c in COLUMNS:
+            p = self._path(c, gen)
+            with open(p, "r+b" if p.exists() else "w+b") as f:
+                f.seek(pos * DTYPES[c].itemsize)
+                f.write(np.ascontiguousarray(cols[c], dtype=DTYPES[c]).tobytes())
+
+    def _replace(self, cols: Dict[str, np.ndarray]):
+        # Write a whole new generation, publish it through meta, then drop the one before the
+        # previous (a reader may still be opening the previous one; `arrays` retries either way)
+        _, gen = self._meta()
+        new = gen + 1
+        for c in COLUMNS:
+            with open(self._path(c, new), "wb") as f:
+                f.write(np.ascontiguousarray(cols[c], dtype=DTYPES[c]).tobytes())
+        self._commit(len(cols["open_time"]), new)
+        if gen > 0:
+            for c in COLUMNS:
+                self._path(c, gen - 1).unlink(missing_ok=True)
+
+    def reset(self, cols: Dict[str, np.ndarray]):
+        with self._locked():
+            self._replace(cols)
+
+    def merge(self, cols: Dict[str, np.ndarray]):
+        new_ot = np.asarray(cols["open_time"], dtype=DTYPES["open_time"])
+        if len(new_ot) == 0:
+            return
+        with self._locked():
+            n, gen = self._meta()
+            old = self.arrays() if n else None
+            if old is None:
+                self._write_at(gen, 0, cols)
+                self._commit(len(new_ot), gen)
+                return
+            old_ot = old["open_time"]
+            from app.services.resample import INTERVAL_MS
+            step = INTERVAL_MS.get(self.interval)
+            if (step and new_ot[0] >= old_ot[0] and new_ot[-1] >= old_ot[-1] and new_ot[0] <= old_ot[-1] + step
+                    and (np.diff(new_ot) == step).all()):
+                # Fast path: overwrite from the first overlapping bar (usually the still-open one) and append.
+                # Only for a gapless run reaching the stored tail: every stored bar it overwrites is in it
+                pos = int(np.searchsorted(old_ot, new_ot[0], side="left"))
+                self._write_at(gen, pos, cols)
+                self._commit(pos + len(new_ot), gen)
+                return
+            # General case (older or interleaved bars): union on open_time, incoming rows win
+            ot = np.concatenate([old_ot, new_ot])
+            order = np.argsort(ot, kind="stable")
+            keep = np.ones(len(ot), dtype=bool)
+            keep[:-1] = ot[order][1:] != ot[order][:-1]
+            idx = order[keep]
+            merged = {c: np.concatenate([np.asarray(old[c]), np.asarray(cols[c], dtype=DTYPES[c])])[idx] for c in COLUMNS}
+            self._replace(merged)
+
+
+def frame_to_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    ot = df["open_time"]
+    if pd.api.types.is_datetime64_any_dtype(ot):
+        ot = ot.values.astype("datetime64[ms]").astype("<i8")
+    return {"open_time": np.asarray(ot, dtype="<i8"), **{c: df[c].to_numpy(dtype="<f8") for c in COLUMNS[1:]}}
+
+
+def columns_to_frame(cols: Dict[str, np.ndarray]) -> pd.DataFrame:
+    cols = dict(cols)
+    cols["open_time"] = np.asarray(cols["open_time"], dtype="<i8").view("datetime64[ms]")
+    return pd.DataFrame(cols, copy=False)
+
+
+class CandleStore:
+    def __init__(self, root: str | Path = DEFAULT_ROOT, resync_after: float = 2.0):
+        self.root = Path(root)
+        self.resync_after = resync_after  # a series synced this recently is served as-is
+        self._series: Dict[tuple, CandleSeries] = {}
+        self._sync_locks: Dict[tuple, asyncio.Lock] = {}
+        self._synced_at: Dict[tuple, float] = {}
+        self._requested: Dict[tuple, int] = {}  # most history asked of the exchange per series
+        self._resampled: Dict[tuple, object] = {}
+
+    def series(self, symbol: str, interval: str) -> CandleSeries:
+        k = (symbol.upper(), interval)
+        if k not in self._series:
+            self._series[k] = CandleSeries(self.root, symbol, interval)
+        return self._series[k]
+
+    async def sync(self, client, symbol: str, interval: str, limit: int = 500) -> CandleSeries:
+        # Fetch only the bars after the last stored open_time (that bar included, it may have been open)
+        k = (symbol.upper(), interval)
+        lock = self._sync_locks.setdefault(k, asyncio.Lock())
+        async with lock:
+            s = self.series(symbol, interval)
+            last = s.last_open_time()
+            # A series still shorter than `limit` after the exchange was asked for that much
+            # (a new listing) only has that much: it takes the incremental path below
+            if last is None or (len(s) < limit and self._requested.get(k, 0) < limit):
+                from app.services.resample import INTERVAL_MS
+                if limit > MAX_PAGE and interval in INTERVAL_MS:
+                    # more history than one request returns: page it in
+                    from app.services.backfill import backfill
+                    now = int(time.time() * 1000)
+                    await backfill(client, self, symbol, interval, now - limit * INTERVAL_MS[interval], now)
+                else:
+                    s.merge(frame_to_columns(await client.fetch_klines(symbol, interval, limit=limit)))
+                self._requested[k] = max(limit, self._requested.get(k, 0))
+                self._synced_at[k] = time.monotonic()
+                return s
+            if time.monotonic() - self._synced_at.get(k, float("-inf")) < self.resync_after:
+                return s
+            df = await client.fetch_klines(symbol, interval, limit=1000, start=last)
+            cols = frame_to_columns(df)
+            if len(cols["open_time"]) and cols["open_time"][0] > last:
+                # fell more than one page behind: page in the gap rather than dropping the stored history
+                from app.services.resample import INTERVAL_MS
+                if interval in INTERVAL_MS:
+                    from app.services.backfill import backfill
+                    await backfill(client, self, symbol, interval, last, int(cols["open_time"][0]))
+                    s.merge(cols)
+                else:
+                    s.reset(cols)
+            else:
+                s.merge(cols)
+            self._synced_at[k] = time.monotonic()
+            return s
+
+    async def _derived(self, client, symbol: str, interval: str, limit: int) -> Optional[Dict[str, np.ndarray]]:
+        # Build `interval` from a lower timeframe, paging in the base history it needs once;
+        # afterwards the base series' incremental sync keeps both current
+        from app.services.resample import DERIVED_FROM, ResampledSeries, ratio
+        base = DERIVED_FROM.get(interval)
+        if base is None:
+            return None
+        need = (limit + 1) * ratio(base, interval)
+        if need > MAX_DERIVE_BARS:
+            return None
+        bs = await self.sync(client, symbol, base, limit=need)
+        k = (symbol.upper(), interval)
+        rs = self._resampled.get(k)
+        if rs is None:
+            rs = self._resampled[k] = ResampledSeries(base, interval)
+        cols = rs.update(bs.arrays())
+        if cols is None or len(rs) < limit:
+            return None
+        return {c: v[-limit:] for c, v in cols.items()}
+
+    async def get_bars(self, client, symbol: str, interval: str, limit: int = 500) -> Bars:
+        """The newest `limit` bars as column arrays owned by the caller.
+
+        Stored bars are copied out of the maps: the next sync rewrites the still-open bar in
+        place, which must not change bars already handed out (and cached) under the
+        indicators computed from them. Derived bars are fresh arrays already.
+        """
+        derived = await self._derived(client, symbol, interval, limit)
+        if derived is not None:
+            return Bars(derived)
+        s = await self.sync(client, symbol, interval, limit=limit)
+        return Bars(s.arrays(tail=limit)).copy()
+
+    async def get_klines(self, client, symbol: str, interval: str, limit: int = 500) -> pd.DataFrame:
+        return (await self.get_bars(client, symbol, interval, limit=limit)).to_frame()
+
+
+_store: CandleStore | None = None
+
+def get_store() -> CandleStore:
+    global _store
+    if _store is None:
+        _store = CandleStore()
+    return _store
+
+async def get_bars(symbol: str, interval: str, limit: int = 500) -> Bars:
+    from app.clients.bybit_client import get_client
+    return await get_store().get_bars(get_client(), symbol, interval, limit=limit)
+
+async def get_klines(symbol: str, interval: str, limit: int = 500) -> pd.DataFrame:
+    from app.clients.bybit_client import get_client
+    return await get_store().get_klines(get_client(), symbol, interval, limit=limit)
@@ -0,0 +1,125 @@
+# app/services/executor.py
+from __future__ import annotations
+import asyncio
+import functools
+import heapq
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+import numpy as np
+
+from app.config import settings
+
+log = logging.getLogger(__name__)
+
+CHART_COLS = ("open", "high", "low", "close", "ema_fast", "ema_mid", "ema_slow")
+
+_threads: ThreadPoolExecutor | None = None
+_procs: ProcessPoolExecutor | None = None
+
+def thread_pool() -> ThreadPoolExecutor:
+    global _threads
+    if _threads is None:
+        _threads = ThreadPoolExecutor(max_workers=max(1, settings.cpu_threads), thread_name_prefix="cpu")
+    return _threads
+
+def render_pool():
+    global _procs
+    if settings.render_processes <= 0:
+        return thread_pool()
+    if _procs is None:
+        # spawn: forking a process that runs an event loop and scheduler threads is unsafe
+        _procs = ProcessPoolExecutor(max_workers=settings.render_processes, mp_context=multiprocessing.get_context("spawn"))
+    return _procs
+
+async def run_cpu(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a NumPy/pandas stage on the thread pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(thread_pool(), functools.partial(fn, *args, **kwargs))
+
+def chart_arrays(df, bars: int = 200) -> dict[str, np.ndarray]:
+    # Only the columns the chart draws, as contiguous float arrays: cheap to pickle
+    tail = df.tail(bars)
+    return {c: np.ascontiguousarray(tail[c], dtype=float) for c in CHART_COLS if c in tail}
+
+def _render_arrays(cols: dict[str, np.ndarray], symbol: str, timeframe: str, fib, zones, size: str, quantize: bool) -> bytes:
+    import pandas as pd
+    from app.clients.plot import plot_chart  # imported in the worker; templates live there
+    return plot_chart(pd.DataFrame(cols, copy=False), symbol, timeframe, fib=fib, zones=zones, size=size, quantize=quantize)
+
+async def render_chart(df, symbol: str, timeframe: str, fib: dict | None = None,
+                       zones: dict | None = None, size: str = "full", quantize: bool = False) -> bytes:
+    loop = asyncio.get_running_loop()
+    call = functools.partial(_render_arrays, chart_arrays(df), symbol, timeframe, fib, zones, size, quantize)
+    return await loop.run_in_executor(render_pool(), call)
+
+def shutdown():
+    global _threads, _procs
+    if _procs is not None:
+        _procs.shutdown(wait=False, cancel_futures=True)
+        _procs = None
+    if _threads is not None:
+        _threads.shutdown(wait=False, cancel_futures=True)
+        _threads = None
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a timer that should fire every `interval`.
+
+    Keeps the `keep` worst stalls (lag seconds, wall-clock time) and logs any stall above
+    `warn_after`.
+    """
+
+    def __init__(self, interval: float = 0.05, keep: int = 10, warn_after: float = 0.25):
+        self.interval = interval
+        self.keep = keep
+        self.warn_after = warn_after
+        self.samples = 0
+        self.total_lag = 0.0
+        self.last_lag = 0.0
+        self._worst: list[tuple[float, float]] = []  # min-heap of (lag, at)
+        self._task: asyncio.Task | None = None
+
+    def record(self, lag: float, at: float | None = None):
+        self.samples += 1
+        self.total_lag += lag
+        self.last_lag = lag
+        item = (lag, time.time() if at is None else at)
+        if len(self._worst) < self.keep:
+            heapq.heappush(self._worst, item)
+        elif lag > self._worst[0][0]:
+            heapq.heapreplace(self._worst, item)
+        if lag > self.warn_after:
+            log.warning("event loop stalled for %.0f ms", lag * 1000)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, loop.time() - t0 - self.interval))
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def report(self) -> dict:
+        worst = sorted(self._worst, reverse=True)
+        return {
+            "samples": self.samples,
+            "mean_ms": round(self.total_lag / self.samples * 1000, 2) if self.samples else 0.0,
+            "last_ms": round(self.last_lag * 1000, 2),
+            "worst": [{"lag_ms": round(lag * 1000, 2), "at": at} for lag, at in worst],
+        }
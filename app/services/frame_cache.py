@@ -0,0 +1,119 @@
+# app/services/frame_cache.py
+from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import astuple
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.indicators.buffer import Bars, CandleBuffer, open_time_ms
+from app.indicators.ta import IndicatorParams, compute_indicators
+
+DEFAULT_MAX_BYTES = int(os.getenv("FRAME_CACHE_MB", "64")) * 1024 * 1024
+
+def frame_key(symbol: str, interval: str, df, params: IndicatorParams) -> tuple:
+    """(symbol, interval, params, bars, last open_time, last bar's OHLCV).
+
+    The last bar is usually still forming, so its values are part of the key: a moved
+    price is a miss rather than a stale hit. The bar count matters because the EMAs
+    depend on how much history they were warmed up on.
+    """
+    ot = int(open_time_ms(df)[-1])
+    bar = tuple(float(np.asarray(df[c])[-1]) for c in ("open", "high", "low", "close", "volume"))
+    return (symbol.upper(), interval, hash(astuple(params)), len(df), ot, bar)
+
+class FrameCache:
+    """Byte-bounded LRU of computed indicator frames (or Bars) shared by the scheduler and the API.
+
+    Frames handed out are shared: callers must treat them as read-only. Storing a frame
+    for a newer bar drops every older frame of the same (symbol, interval, params).
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._frames: OrderedDict[tuple, tuple[pd.DataFrame, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def get(self, key: tuple) -> Optional[pd.DataFrame]:
+        with self._lock:
+            item = self._frames.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def _drop(self, key: tuple):
+        _, size = self._frames.pop(key)
+        self.bytes -= size
+
+    def put(self, key: tuple, frame):
+        size = frame.nbytes if isinstance(frame, (Bars, CandleBuffer)) else int(frame.memory_usage(index=True, deep=False).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._frames:
+                self._drop(key)
+            # A new bar invalidates the frames computed before it
+            series, last_ot = key[:3], key[4]
+            stale = [k for k in self._frames if k[:3] == series and k[4] < last_ot]
+            for k in stale:
+                self._drop(k)
+            self._frames[key] = (frame, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._frames)))
+                self.evictions += 1
+
+    def get_or_compute(self, symbol: str, interval: str, df: pd.DataFrame, params: IndicatorParams,
+                       compute: Callable[..., pd.DataFrame] = compute_indicators,
+                       outputs: tuple[str, ...] | None = None) -> pd.DataFrame:
+        """Cached `compute(df, params)`; with `outputs`, a full frame for the same bars also serves."""
+        if df is None or not len(df):
+            return compute(df, params) if outputs is None else compute(df, params, outputs=outputs)
+        key = frame_key(symbol, interval, df, params)
+        if outputs is None:
+            frame = self.get(key)
+            if frame is None:
+                frame = compute(df, params)
+                self.put(key, frame)
+            return frame
+        with self._lock:
+            full = self._frames.get(key)
+            if full is not None:  # a hit like any other: counted, and kept from eviction
+                self._frames.move_to_end(key)
+                self.hits += 1
+                return full[0]
+        key += (tuple(outputs),)
+        frame = self.get(key)
+        if frame is None:
+            frame = compute(df, params, outputs=outputs)
+            self.put(key, frame)
+        return frame
+
+    def stats(self) -> dict:
+        return {"entries": len(self._frames), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+_cache: FrameCache | None = None
+
+def get_frame_cache() -> FrameCache:
+    global _cache
+    if _cache is None:
+        _cache = FrameCache()
+    return _cache
+
+def cached_indicators(symbol: str, interval: str, df: pd.DataFrame, params: IndicatorParams,
+                      outputs: tuple[str, ...] | None = None) -> pd.DataFrame:
+    return get_frame_cache().get_or_compute(symbol, interval, df, params, outputs=outputs)
@@ -0,0 +1,161 @@
+# app/services/metrics.py
+"""Process-local metrics rendered in the Prometheus text format (version 0.0.4).
+
+Recording is a dict lookup and a few additions under an uncontended lock; nothing is
+formatted until /api/metrics is scraped. Gauges that mirror existing state (queue
+depths, cache hit ratios) are callbacks read at scrape time, so they cost nothing
+in between.
+"""
+from __future__ import annotations
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+# seconds: pipeline stages are milliseconds, upstream calls and late jobs are seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v))
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels.get(n, "")) for n in self.labelnames), 0.0)
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        out += [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+        return out
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            s[i] += 1
+            s[-1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def count(self, **labels) -> int:
+        s = self._series.get(tuple(str(labels.get(n, "")) for n in self.labelnames))
+        return sum(s[:-1]) if s else 0
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(s)) for k, s in self._series.items())
+        for key, s in items:
+            cum = 0
+            for le, n in zip(self.buckets + (math.inf,), s[:-1]):
+                cum += n
+                le_label = 'le="%s"' % _num(le)
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, key, le_label)} {cum}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(s[-1])}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, key)} {cum}")
+        return out
+
+class CallbackGauge:
+    """A gauge read at scrape time: `fn()` returns a number or {label tuple: number}."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], float | dict], labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames, self.fn = name, help, labels, fn
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            v = self.fn()
+        except Exception:
+            return out  # a failing source must not break the whole scrape
+        items = sorted(v.items()) if isinstance(v, dict) else [((), v)]
+        out += [f"{self.name}{_labels(self.labelnames, k if isinstance(k, tuple) else (k,))} {_num(x)}" for k, x in items]
+        return out
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram | CallbackGauge] = {}
+
+    def _add(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None and not isinstance(metric, CallbackGauge):
+            return existing  # module reloads / repeated registration share one series
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, fn: Callable[[], float | dict], labels: tuple[str, ...] = ()) -> CallbackGauge:
+        return self._add(CallbackGauge(name, help, fn, labels))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for m in self._metrics.values():
+            lines += m.render()
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "signal_stage_seconds", "Time spent in each signal pipeline stage.", ("stage", "symbol", "timeframe"))
+HTTP_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "API request latency until the response starts.",
+    ("route", "method", "status", "symbol", "timeframe"))
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    "upstream_request_duration_seconds", "Latency of outbound HTTP calls.", ("service",))
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    "upstream_requests_total", "Outbound HTTP calls by service and response status.", ("service", "status"))
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "upstream_retries_total", "Outbound HTTP calls that were retried.", ("service", "reason"))
+JOB_LAG_SECONDS = REGISTRY.histogram(
+    "scheduler_job_lag_seconds", "Delay between a job's scheduled fire time and its start.", ("timeframe",))
+JOBS_SKIPPED = REGISTRY.counter(
+    "scheduler_jobs_skipped_total", "Fetches dropped because they could not start before their deadline.", ("timeframe",))
+JOB_MISFIRES = REGISTRY.counter(
+    "scheduler_misfires_total", "APScheduler runs missed past their misfire grace time.", ("job",))
+
+def render() -> str:
+    return REGISTRY.render()
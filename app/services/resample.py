@@ -0,0 +1,97 @@
+# app/services/resample.py
+from __future__ import annotations
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.services.candle_store import COLUMNS, DTYPES
+
+MINUTE = 60_000
+INTERVAL_MS = {
+    "1m": MINUTE, "3m": 3 * MINUTE, "5m": 5 * MINUTE, "15m": 15 * MINUTE, "30m": 30 * MINUTE,
+    "1h": 60 * MINUTE, "2h": 120 * MINUTE, "4h": 240 * MINUTE, "6h": 360 * MINUTE, "12h": 720 * MINUTE,
+    "d": 1440 * MINUTE, "w": 7 * 1440 * MINUTE,
+}
+# Bybit buckets are aligned to UTC midnight; weeks start on Monday (1970-01-01 was a Thursday)
+WEEK_OFFSET_MS = 4 * 1440 * MINUTE
+
+# Which stored base interval each higher timeframe is built from
+DERIVED_FROM = {
+    "30m": "15m", "1h": "15m",
+    "2h": "1h", "4h": "1h", "6h": "1h", "12h": "1h", "d": "1h", "w": "1h",
+}
+
+Columns = Dict[str, np.ndarray]
+
+def ratio(base: str, target: str) -> int:
+    return INTERVAL_MS[target] // INTERVAL_MS[base]
+
+def bucket_start(open_time: np.ndarray, interval: str) -> np.ndarray:
+    size = INTERVAL_MS[interval]
+    off = WEEK_OFFSET_MS if interval == "w" else 0
+    return (np.asarray(open_time, dtype="i8") - off) // size * size + off
+
+def resample(cols: Columns, base: str, target: str) -> Optional[Columns]:
+    """Aggregate base bars into exchange-aligned `target` bars.
+
+    A leading bucket that began before the base history is dropped; the trailing bucket
+    may be incomplete (it is the still-forming bar). Returns None when an interior bucket
+    is missing base bars, i.e. the result would not match the exchange exactly.
+    """
+    ot = np.asarray(cols["open_time"], dtype="i8")
+    if len(ot) == 0:
+        return None
+    b = bucket_start(ot, target)
+    starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+    counts = np.diff(np.r_[starts, len(ot)])
+    full = ratio(base, target)
+    if ot[0] != b[0]:
+        starts, counts = starts[1:], counts[1:]
+    if len(starts) == 0:
+        return None
+    if np.any(counts[:-1] != full):
+        return None
+    if ot[-1] - b[starts[-1]] != (counts[-1] - 1) * INTERVAL_MS[base]:
+        return None  # hole inside the forming bucket
+    first = starts[0]
+    rel = starts - first
+    h = np.asarray(cols["high"], dtype="f8")[first:]
+    low = np.asarray(cols["low"], dtype="f8")[first:]
+    v = np.asarray(cols["volume"], dtype="f8")[first:]
+    return {
+        "open_time": b[starts],
+        "open": np.asarray(cols["open"], dtype="f8")[starts],
+        "high": np.maximum.reduceat(h, rel),
+        "low": np.minimum.reduceat(low, rel),
+        "close": np.asarray(cols["close"], dtype="f8")[starts + counts - 1],
+        "volume": np.add.reduceat(v, rel),
+    }
+
+class ResampledSeries:
+    """Incrementally maintained higher-timeframe bars for one (symbol, target).
+
+    Each update re-aggregates only the base bars from the start of the last derived
+    bucket onward instead of the whole base history.
+    """
+
+    def __init__(self, base: str, target: str):
+        self.base = base
+        self.target = target
+        self.cols: Optional[Columns] = None
+
+    def __len__(self) -> int:
+        return 0 if self.cols is None else len(self.cols["open_time"])
+
+    def update(self, base_cols: Columns) -> Optional[Columns]:
+        ot = np.asarray(base_cols["open_time"], dtype="i8")
+        if self.cols is None or len(ot) == 0 or ot[0] > self.cols["open_time"][-1]:
+            self.cols = resample(base_cols, self.base, self.target)
+            return self.cols
+        last_bucket = self.cols["open_time"][-1]
+        pos = int(np.searchsorted(ot, last_bucket, side="left"))
+        fresh = resample({c: base_cols[c][pos:] for c in COLUMNS}, self.base, self.target)
+        if fresh is None or fresh["open_time"][0] != last_bucket:
+            self.cols = resample(base_cols, self.base, self.target)
+            return self.cols
+        self.cols = {c: np.concatenate([self.cols[c][:-1], fresh[c]]).astype(DTYPES[c], copy=False) for c in COLUMNS}
+        return self.cols
@@ -0,0 +1,142 @@
+# app/services/response_cache.py
+from __future__ import annotations
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+FORMING_TTL = 5.0  # how long a response over a still-forming last bar is reused
+
+def next_close_ms(timeframe: str, open_time_ms: int) -> int:
+    """Epoch ms at which the candle containing `open_time_ms` closes."""
+    from app.services.resample import INTERVAL_MS, bucket_start  # pulls in the candle store (pandas)
+    if timeframe == "m":
+        d = datetime.fromtimestamp(open_time_ms / 1000, tz=timezone.utc)
+        nxt = datetime(d.year + (d.month == 12), d.month % 12 + 1, 1, tzinfo=timezone.utc)
+        return int(nxt.timestamp() * 1000)
+    return int(bucket_start(open_time_ms, timeframe)) + INTERVAL_MS[timeframe]
+
+def response_ttl(timeframe: str, last_open_ms: int, now: float | None = None) -> float:
+    """Seconds a response computed up to the bar opened at `last_open_ms` may be reused.
+
+    Bybit's klines end with the still-forming bar, whose values move until it closes, so
+    such a response is only shared for FORMING_TTL (coalescing bursts, not freezing the
+    bar). A last bar whose close is already past means the new bar has not arrived yet
+    (exchange lag, or the store inside its resync window): that response is not cached.
+    """
+    from app.services.resample import INTERVAL_MS
+    if not last_open_ms or (timeframe != "m" and timeframe not in INTERVAL_MS):
+        return FORMING_TTL
+    now_ms = int((time.time() if now is None else now) * 1000)
+    left = (next_close_ms(timeframe, last_open_ms) - now_ms) / 1000
+    return 0.0 if left <= 0 else min(FORMING_TTL, left)
+
+class _LeaderCancelled(Exception):
+    """Set on a shared future whose leader was cancelled: followers run the call themselves."""
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight computation."""
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        while key in self._inflight:
+            fut = self._inflight[key]
+            self.shared += 1
+            try:
+                return await asyncio.shield(fut)
+            except _LeaderCancelled:
+                continue  # the leader's client went away; the first follower back takes over
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            fut.set_exception(_LeaderCancelled())
+            fut.exception()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else was waiting
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+class ResponseCache:
+    """JSON responses shared while their last bar is still forming (see `response_ttl`).
+
+    Entries carry an ETag built from the request key and the last bar's open_time, so a
+    client revalidating with If-None-Match gets a 304 without any recomputation.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, str, Any]] = OrderedDict()
+        self.flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def etag(key: Hashable, last_open_ms: int) -> str:
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+        return f'W/"{digest}-{last_open_ms}"'
+
+    def get(self, key: Hashable) -> Optional[tuple[float, str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Hashable, expires: float, etag: str, payload: Any):
+        self._entries[key] = (expires, etag, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def respond(self, request: Request, key: Hashable, timeframe: str,
+                      compute: Callable[[], Awaitable[tuple[Any, int]]]) -> Response:
+        """`compute()` returns (payload, last bar open_time in epoch ms)."""
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+            async def run():
+                payload, last_open_ms = await compute()
+                ttl = response_ttl(timeframe, last_open_ms)
+                item = (time.time() + ttl, self.etag(key, last_open_ms), jsonable_encoder(payload))
+                if ttl > 0:
+                    self.put(key, *item)
+                return item
+
+            entry = await self.flight.do(key, run)
+        expires, etag, payload = entry
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={max(0, int(expires - time.time()))}"}
+        if etag in (request.headers.get("if-none-match") or ""):
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(payload, headers=headers)
+
+_cache: ResponseCache | None = None
+
+def get_response_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
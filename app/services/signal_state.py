@@ -1,31 +1,101 @@
 from __future__ import annotations
-import json, os
+import json, os, sqlite3, threading
 from typing import Dict, Any
 
 _STATE_PATH = os.environ.get("SIGNAL_STATE_PATH", "data/signal_state.json")
+# Indexed backend; the legacy JSON file above is imported into it once if the DB is new
+_DB_PATH = os.environ.get("SIGNAL_STATE_DB", os.path.splitext(_STATE_PATH)[0] + ".db")
 
-def _ensure_dir():
-    d = os.path.dirname(_STATE_PATH)
+def _ensure_dir(path: str):
+    d = os.path.dirname(path)
     if d and not os.path.isdir(d):
         os.makedirs(d, exist_ok=True)
 
-def _load() -> Dict[str, Any]:
-    if not os.path.isfile(_STATE_PATH):
+def _load_json(path: str) -> Dict[str, Any]:
+    if not os.path.isfile(path):
         return {}
-    with open(_STATE_PATH, "r", encoding="utf-8") as f:
+    with open(path, "r", encoding="utf-8") as f:
         try:
             return json.load(f)
         except Exception:
             return {}
 
-def _save(data: Dict[str, Any]):
-    _ensure_dir()
-    with open(_STATE_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
 def key(symbol: str, timeframe: str) -> str:
     return f"{symbol.upper()}::{timeframe}"
 
+class SignalStateStore:
+    """Last-seen indicator verdicts per (symbol, timeframe).
+
+    Everything lives in a dict loaded once from SQLite (WAL mode); `save_for` only marks
+    the key dirty and `flush` writes all dirty keys in one transaction, so a scheduler tick
+    costs one commit no matter how many jobs it ran.
+    """
+
+    def __init__(self, db_path: str = _DB_PATH, legacy_json: str | None = _STATE_PATH):
+        self.db_path = db_path
+        self.legacy_json = legacy_json
+        self._data: Dict[str, Dict[str, str]] | None = None
+        self._dirty: set[str] = set()
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            _ensure_dir(self.db_path)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS signal_state (key TEXT PRIMARY KEY, indicators TEXT NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    def load(self) -> Dict[str, Dict[str, str]]:
+        with self._lock:
+            if self._data is None:
+                conn = self._connect()
+                rows = conn.execute("SELECT key, indicators FROM signal_state").fetchall()
+                self._data = {k: json.loads(v) for k, v in rows}
+                if not rows and self.legacy_json:
+                    self._data = _load_json(self.legacy_json)
+                    self._dirty.update(self._data)
+            return self._data
+
+    def get(self, k: str) -> Dict[str, str] | None:
+        return self.load().get(k)
+
+    def set(self, k: str, indicators: Dict[str, str]):
+        data = self.load()
+        with self._lock:
+            data[k] = dict(indicators)
+            self._dirty.add(k)
+
+    def flush(self) -> int:
+        """Write every key changed since the last flush; returns how many were written."""
+        with self._lock:
+            if not self._dirty or self._data is None:
+                return 0
+            rows = [(k, json.dumps(self._data[k], ensure_ascii=False)) for k in self._dirty]
+            conn = self._connect()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO signal_state (key, indicators) VALUES (?, ?)", rows)
+            self._dirty.clear()
+            return len(rows)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+_store: SignalStateStore | None = None
+
+def get_store() -> SignalStateStore:
+    global _store
+    if _store is None:
+        _store = SignalStateStore()
+    return _store
+
 def diff_indicators(old: Dict[str, str] | None, new: Dict[str, str]) -> list[str]:
     changed = []
     old = old or {}
@@ -36,9 +106,11 @@ def diff_indicators(old: Dict[str, str] | None, new: Dict[str, str]) -> list[str
     return changed
 
 def load_for(symbol: str, timeframe: str) -> Dict[str, str] | None:
-    return _load().get(key(symbol, timeframe))
+    return get_store().get(key(symbol, timeframe))
 
 def save_for(symbol: str, timeframe: str, indicators: Dict[str, str]):
-    data = _load()
-    data[key(symbol, timeframe)] = indicators
-    _save(data)
\ No newline at end of file
+    # In memory only; persisted by flush_state() at the end of the tick
+    get_store().set(key(symbol, timeframe), indicators)
+
+def flush_state() -> int:
+    return get_store().flush()
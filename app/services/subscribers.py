@@ -0,0 +1,117 @@
+# app/services/subscribers.py
+from __future__ import annotations
+import itertools
+import json
+import os
+import threading
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_PATH = os.getenv("SUBSCRIBERS_PATH", str(BASE_DIR / "data" / "subscribers.json"))
+ANY = "*"
+
+@dataclass
+class Subscription:
+    """One alert recipient. Empty filter lists mean "any"."""
+    kind: str                       # "telegram" (address = chat id) | "webhook" (address = URL)
+    address: str
+    symbols: list[str] = field(default_factory=list)
+    timeframes: list[str] = field(default_factory=list)
+    indicators: list[str] = field(default_factory=list)  # e.g. "EMA 35/75", "MACD Cross"
+    sides: list[str] = field(default_factory=list)       # "BUY" / "SELL"
+    charts: bool = True
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+
+    def keys(self) -> Iterable[tuple[str, str, str, str]]:
+        # Every (symbol, timeframe, indicator, side) cell this subscription is indexed under
+        return itertools.product(
+            [s.upper() for s in self.symbols] or [ANY],
+            list(self.timeframes) or [ANY],
+            list(self.indicators) or [ANY],
+            [s.upper() for s in self.sides] or [ANY],
+        )
+
+class SubscriberRegistry:
+    """Subscriptions with an inverted index (symbol, timeframe, indicator, side) -> ids.
+
+    A lookup probes the 16 exact/wildcard combinations of each event, so matching costs
+    O(events + matches) regardless of how many subscriptions exist.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_PATH):
+        self.path = path
+        self._subs: dict[str, Subscription] = {}
+        self._index: dict[tuple[str, str, str, str], set[str]] = {}
+        self._lock = threading.Lock()
+        if path and os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for raw in json.load(f):
+                    self._add(Subscription(**raw))
+
+    def __len__(self) -> int:
+        return len(self._subs)
+
+    def all(self) -> list[Subscription]:
+        return list(self._subs.values())
+
+    def _add(self, sub: Subscription):
+        self._subs[sub.id] = sub
+        for k in sub.keys():
+            self._index.setdefault(k, set()).add(sub.id)
+
+    def _remove(self, sub_id: str) -> Subscription | None:
+        sub = self._subs.pop(sub_id, None)
+        if sub is not None:
+            for k in sub.keys():
+                ids = self._index.get(k)
+                if ids is not None:
+                    ids.discard(sub_id)
+                    if not ids:
+                        del self._index[k]
+        return sub
+
+    def _save(self):
+        if not self.path:
+            return
+        p = Path(self.path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump([asdict(s) for s in self._subs.values()], f, ensure_ascii=False, indent=2)
+        tmp.replace(p)
+
+    def add(self, sub: Subscription) -> Subscription:
+        with self._lock:
+            self._remove(sub.id)
+            self._add(sub)
+            self._save()
+        return sub
+
+    def remove(self, sub_id: str) -> bool:
+        with self._lock:
+            gone = self._remove(sub_id) is not None
+            if gone:
+                self._save()
+        return gone
+
+    def match(self, symbol: str, timeframe: str, events: Iterable[tuple[str, str]]) -> list[Subscription]:
+        """Subscriptions interested in any (indicator, side) event of symbol/timeframe."""
+        ids: set[str] = set()
+        sym = symbol.upper()
+        for indicator, side in events:
+            for k in itertools.product((sym, ANY), (timeframe, ANY), (indicator, ANY), (side.upper(), ANY)):
+                hit = self._index.get(k)
+                if hit:
+                    ids |= hit
+        return [self._subs[i] for i in sorted(ids)]
+
+_registry: SubscriberRegistry | None = None
+
+def get_registry() -> SubscriberRegistry:
+    global _registry
+    if _registry is None:
+        _registry = SubscriberRegistry()
+    return _registry
@@ -0,0 +1,69 @@
+# app/services/warmup.py
+"""Startup warm-up and readiness.
+
+Liveness (/api/health) answers as soon as the app is imported; readiness (/api/ready)
+waits for `warm_up`, which syncs the recent candles of every configured (symbol,
+timeframe) into the store and feeds them through the incremental indicator engine, so
+the first scheduler tick and the first API call start with hot caches.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+
+log = logging.getLogger(__name__)
+
+@dataclass
+class Readiness:
+    """Startup progress; `phases` are seconds since `started` (the import of app.main)."""
+    started: float = field(default_factory=time.perf_counter)
+    phases: dict[str, float] = field(default_factory=dict)
+    total: int = 0
+    done: int = 0
+    failed: dict[str, str] = field(default_factory=dict)
+    ready: bool = False
+
+    def mark(self, phase: str) -> float:
+        # first occurrence wins: "first_request" is only the first one
+        if phase not in self.phases:
+            self.phases[phase] = round(time.perf_counter() - self.started, 4)
+        return self.phases[phase]
+
+    def report(self) -> dict:
+        return {"ready": self.ready, "warmed": self.done, "total": self.total,
+                "failed": dict(self.failed), "seconds": dict(self.phases)}
+
+async def warm_up(symbols: list[str], timeframes: list[str], params, readiness: Readiness | None = None,
+                  limit: int = 500, concurrency: int = 8) -> Readiness:
+    """Preload every (symbol, timeframe) concurrently; a series that fails is reported, not retried.
+
+    Readiness is granted once every series was attempted: an exchange outage at boot must
+    not keep the instance out of rotation, the scheduler retries on its own.
+    """
+    from app.scheduler import indicators_on_bars
+    from app.services.candle_store import get_bars
+    from app.services.executor import run_cpu
+
+    readiness = readiness or Readiness()
+    pairs = [(s.upper(), tf) for s in symbols for tf in timeframes]
+    readiness.total = len(pairs)
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(symbol: str, timeframe: str):
+        try:
+            async with sem:
+                bars = await get_bars(symbol, timeframe, limit=limit)
+                await run_cpu(indicators_on_bars, symbol, timeframe, params, bars)
+        except Exception as e:
+            readiness.failed[f"{symbol} {timeframe}"] = repr(e)
+            log.warning("warm-up %s %s failed: %r", symbol, timeframe, e)
+        finally:
+            readiness.done += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(s, tf) for s, tf in pairs))
+    readiness.ready = True
+    readiness.mark("warm")
+    log.info("warm-up: %d series in %.2fs (%d failed)", len(pairs), time.perf_counter() - t0, len(readiness.failed))
+    return readiness
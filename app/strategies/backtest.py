@@ -0,0 +1,180 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+from app.indicators.ta import IndicatorParams, compute_indicators
+from app.strategies.rules import BASE_KEYS, VOTES, _pair_check, find_pivots, neutral_signal, signal_from_votes
+
+MIN_BARS = 30        # make_signal is NEUTRAL below this
+FIB_LOOKBACK = 180   # compute_fib_031 defaults
+FIB_STOP_ATR = 1.8   # suggest_entry_from_fib stop distance
+FIXED_TARGET = 0.01  # signal_from_votes' entry +/- 1% target
+
+def confirmed_crosses(a, b) -> np.ndarray:
+    """`_last_cross_confirmed` evaluated at every bar: +1 / -1 / 0 per bar."""
+    d = np.asarray(a, dtype=float) - np.asarray(b, dtype=float)
+    out = np.zeros(len(d), dtype=np.int8)
+    if len(d) < 3:
+        return out
+    d2, d1, d0 = d[:-2], d[1:-1], d[2:]
+    # NaN compares False, as the pd.isna guard does
+    out[2:] = np.where((d2 <= 0) & (d1 > 0) & (d0 > 0), 1, np.where((d2 >= 0) & (d1 < 0) & (d0 < 0), -1, 0))
+    return out
+
+def divergence_votes(close, stoch_k, win: int = 5) -> np.ndarray:
+    """`_stoch_rsi_divergence(close[:t+1], stoch_k[:t+1])` for every bar t.
+
+    A pivot at i only exists in prefixes that contain its whole window, i.e. from bar
+    i + win//2 on, so bar t judges the pivots at or before t - win//2.
+    """
+    c = np.asarray(close, dtype=float)
+    k = np.asarray(stoch_k, dtype=float)
+    n = len(c)
+    out = np.zeros(n, dtype=np.int8)
+    if n < win * 3:
+        return out
+    ph, pl = find_pivots(c, win)
+    sh, sl = find_pivots(k, win)
+    points = np.arange(n) - win // 2
+    bull = _pair_check(points, pl, sl, c, k, 1)
+    bear = _pair_check(points, ph, sh, c, k, -1) & ~bull
+    out[:] = np.where(bull, 1, np.where(bear, -1, 0))
+    out[:win * 3 - 1] = 0  # _find_swings needs win*3 bars
+    return out
+
+def signal_frame(data: pd.DataFrame, decision_threshold: float = 1.0, swing_window: int = 5) -> pd.DataFrame:
+    """make_signal's votes, score and side for every bar of a compute_indicators frame.
+
+    Row t is what make_signal returns for data.iloc[:t+1]; `signal_at` turns a row back
+    into the full payload.
+    """
+    n = len(data)
+    close = data["close"].to_numpy(dtype=float)
+    votes = {
+        "EMA 35/75": confirmed_crosses(data["ema_fast"], data["ema_mid"]),
+        "EMA 75/200": confirmed_crosses(data["ema_mid"], data["ema_slow"]),
+        "MACD Cross": confirmed_crosses(data["macd"], data["macd_signal"]),
+        "StochRSI Divergence": divergence_votes(close, data["stoch_k"], win=swing_window),
+    }
+    warm = np.arange(n) < MIN_BARS - 1
+    score = np.zeros(n)
+    for k in BASE_KEYS:
+        votes[k][warm] = 0
+        weight = VOTES[k][0]
+        # same accumulation order as signal_from_votes, so the floats match exactly
+        score = score + np.where(votes[k] == 1, weight, np.where(votes[k] == -1, -weight, 0.0))
+    side = np.where(score >= decision_threshold, 1, np.where(score <= -decision_threshold, -1, 0)).astype(np.int8)
+    out = pd.DataFrame(votes, index=data.index)
+    out["score"] = score
+    out["side"] = side
+    out["entry"] = np.where(warm, np.nan, close)
+    return out
+
+def signal_at(sig: pd.DataFrame, i: int, timeframe: str, decision_threshold: float = 1.0) -> dict:
+    """The make_signal payload for row i of `signal_frame`."""
+    if i < MIN_BARS - 1:
+        return neutral_signal(timeframe)
+    row = sig.iloc[i]
+    entry = None if pd.isna(row["entry"]) else float(row["entry"])
+    return signal_from_votes(timeframe, entry, {k: int(row[k]) for k in BASE_KEYS}, decision_threshold)
+
+def _exits(data: pd.DataFrame, side: np.ndarray, entry: np.ndarray, mode: str, risk_reward: float):
+    # (stop, target) per bar; NaN where the bar cannot open a trade
+    if mode == "fixed":
+        # 1% target as in signal_from_votes, stop at target / risk_reward
+        target = np.where(side > 0, np.round(entry * (1 + FIXED_TARGET), 2), np.round(entry * (1 - FIXED_TARGET), 2))
+        stop = entry - side * (entry * FIXED_TARGET / risk_reward)
+        return stop, target
+    if mode != "fib":
+        raise ValueError(f"unknown exit mode: {mode}")
+    # suggest_entry_from_fib(compute_fib_031(data[:t+1]), rr) anchored at the signal close
+    high = data["high"].rolling(FIB_LOOKBACK).max().to_numpy()
+    low = data["low"].rolling(FIB_LOOKBACK).min().to_numpy()
+    close = data["close"].to_numpy(dtype=float)
+    ema_mid, ema_fast = data["ema_mid"].to_numpy(), data["ema_fast"].to_numpy()
+    fib_side = np.where((close > ema_mid) & (ema_fast > ema_mid), 1, -1)
+    risk = FIB_STOP_ATR * np.round(data["atr"].to_numpy(dtype=float), 2)
+    ok = (fib_side == side) & (high - low > 0)
+    stop = np.where(ok, entry - side * risk, np.nan)
+    target = np.where(ok, entry + side * risk_reward * risk, np.nan)
+    return stop, target
+
+def simulate(data: pd.DataFrame, sig: pd.DataFrame, mode: str = "fixed", risk_reward: float = 3.0,
+             max_hold: int = 200, overlap: bool = False) -> pd.DataFrame:
+    """Trades opened at the close of every BUY/SELL bar, closed at target, stop or max_hold.
+
+    Exits are resolved for all entries together, one bar offset at a time; a bar that
+    touches both levels counts as a stop. Without `overlap` a signal is ignored while a
+    trade is open.
+    """
+    side = sig["side"].to_numpy()
+    entry = sig["entry"].to_numpy(dtype=float)
+    stop, target = _exits(data, side, entry, mode, risk_reward)
+    ok = (side != 0) & ~np.isnan(entry) & ~np.isnan(stop) & ~np.isnan(target)
+    ok[-1:] = False  # nothing left to trade after the last bar
+    e = np.flatnonzero(ok)
+    high = data["high"].to_numpy(dtype=float)
+    low = data["low"].to_numpy(dtype=float)
+    close = data["close"].to_numpy(dtype=float)
+    n = len(close)
+    s, st, tg = side[e], stop[e], target[e]
+
+    exit_i = np.minimum(e + max_hold, n - 1)
+    exit_px = close[exit_i]
+    outcome = np.zeros(len(e), dtype=np.int8)  # +1 target, -1 stop, 0 timeout / end of data
+    open_ = np.ones(len(e), dtype=bool)
+    for k in range(1, max_hold + 1):
+        if not open_.any():
+            break
+        idx = np.minimum(e + k, n - 1)
+        live = open_ & (e + k < n)
+        hit_stop = live & np.where(s > 0, low[idx] <= st, high[idx] >= st)
+        hit_tgt = live & ~hit_stop & np.where(s > 0, high[idx] >= tg, low[idx] <= tg)
+        done = hit_stop | hit_tgt
+        exit_i[done] = idx[done]
+        exit_px[hit_stop] = st[hit_stop]
+        exit_px[hit_tgt] = tg[hit_tgt]
+        outcome[hit_stop], outcome[hit_tgt] = -1, 1
+        open_ &= ~done & (e + k < n)
+
+    keep = np.ones(len(e), dtype=bool)
+    if not overlap and len(e):
+        keep[:] = False
+        busy_until = -1
+        for j in range(len(e)):  # one pass over trades, not bars
+            if e[j] > busy_until:
+                keep[j] = True
+                busy_until = exit_i[j]
+
+    ret = s * (exit_px - entry[e]) / entry[e]
+    trades = pd.DataFrame({
+        "entry_i": e, "exit_i": exit_i, "side": s, "entry": entry[e], "stop": st, "target": tg,
+        "exit": exit_px, "outcome": outcome, "ret": ret,
+    })[keep].reset_index(drop=True)
+    if "open_time" in data:
+        ot = data["open_time"].to_numpy()
+        trades.insert(0, "entry_time", ot[trades["entry_i"].to_numpy()])
+    return trades
+
+def summarize(trades: pd.DataFrame) -> dict:
+    """Hit rate, expectancy (mean return per trade) and max drawdown of compounded equity."""
+    if not len(trades):
+        return {"trades": 0, "hit_rate": 0.0, "expectancy": 0.0, "total_return": 0.0, "max_drawdown": 0.0}
+    ret = trades.sort_values("exit_i")["ret"].to_numpy()
+    equity = np.cumprod(1 + ret)
+    drawdown = 1 - equity / np.maximum.accumulate(np.maximum(equity, 1.0))
+    return {
+        "trades": int(len(ret)),
+        "hit_rate": float((trades["outcome"] == 1).mean()),
+        "expectancy": float(ret.mean()),
+        "total_return": float(equity[-1] - 1),
+        "max_drawdown": float(drawdown.max()),
+    }
+
+def backtest(df: pd.DataFrame, params: IndicatorParams, risk_reward: float = 3.0, decision_threshold: float = 1.0,
+             mode: str = "fixed", max_hold: int = 200, swing_window: int = 5, overlap: bool = False) -> dict:
+    """Run the make_signal rule set over a whole OHLCV history: {"stats", "trades", "signals"}."""
+    data = compute_indicators(df, params)
+    sig = signal_frame(data, decision_threshold, swing_window)
+    trades = simulate(data, sig, mode, risk_reward, max_hold, overlap)
+    return {"stats": summarize(trades), "trades": trades, "signals": sig}
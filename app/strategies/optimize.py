@@ -0,0 +1,367 @@
+"""Grid / random search over IndicatorParams and decision_threshold, scored by backtest.
+
+    python -m app.strategies.optimize --symbols BTCUSDT,ETHUSDT --timeframe 1h \\
+        --space ema_fast=20,35,50 --space ema_mid=75,100 --space decision_threshold=0.5,1,1.5 \\
+        --checkpoint data/optimize/btc_eth_1h.jsonl
+
+Candles are packed once into shared memory and mapped by every worker; a task is just a
+handful of parameter dicts. Workers keep an LRU of indicator series per symbol keyed by
+span, so the EMAs / RSIs shared across a grid are computed once per worker. Finished
+combinations are appended to the checkpoint as JSON lines after a header naming the run
+(symbols, timeframe, bars, exit settings); re-running with the same checkpoint skips them,
+and a checkpoint written for a different run is refused.
+"""
+from __future__ import annotations
+import argparse
+import itertools
+import json
+import logging
+import math
+import multiprocessing
+import os
+import random
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, fields
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from app.indicators.ta import IndicatorParams, _atr, _ema, _rsi
+from app.strategies.backtest import signal_frame, simulate, summarize
+
+log = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+CHECKPOINT_DIR = BASE_DIR / "data" / "optimize"
+PARAM_FIELDS = tuple(f.name for f in fields(IndicatorParams))
+SPACE_FIELDS = PARAM_FIELDS + ("decision_threshold",)
+OHLCV = ("open", "high", "low", "close", "volume")
+OBJECTIVES = ("expectancy", "total_return", "hit_rate")
+SERIES_CACHE = 64  # indicator series kept per symbol in each worker (a combination reads ~8)
+
+# ---------- search space ----------
+def _valid(combo: dict) -> bool:
+    p = {**asdict(IndicatorParams()), **combo}
+    return p["ema_fast"] < p["ema_mid"] < p["ema_slow"] and p["macd_fast"] < p["macd_slow"]
+
+def combo_key(combo: dict) -> str:
+    return json.dumps(combo, sort_keys=True)
+
+def _reuse_order(combo: dict) -> tuple:
+    # neighbours in this order share their EMA / MACD / RSI spans, so chunks hit the cache
+    return tuple(combo.get(k, 0) for k in SPACE_FIELDS)
+
+def grid(space: dict[str, list]) -> list[dict]:
+    """Every valid combination of `space` (field -> candidate values)."""
+    bad = [k for k in space if k not in SPACE_FIELDS]
+    if bad:
+        raise ValueError(f"unknown parameters: {bad}")
+    keys = list(space)
+    combos = (dict(zip(keys, vals)) for vals in itertools.product(*(space[k] for k in keys)))
+    return sorted((c for c in combos if _valid(c)), key=_reuse_order)
+
+def random_combos(space: dict[str, list], n: int, seed: int = 0) -> list[dict]:
+    """Up to `n` distinct valid combinations drawn uniformly from `space`."""
+    bad = [k for k in space if k not in SPACE_FIELDS]
+    if bad:
+        raise ValueError(f"unknown parameters: {bad}")
+    if math.prod(len(v) for v in space.values()) <= n:
+        return grid(space)
+    rng = random.Random(seed)
+    out: dict[str, dict] = {}
+    for _ in range(n * 20):
+        if len(out) >= n:
+            break
+        c = {k: rng.choice(v) for k, v in space.items()}
+        if _valid(c):
+            out.setdefault(combo_key(c), c)
+    return sorted(out.values(), key=_reuse_order)
+
+# ---------- shared candles ----------
+class SharedHistory:
+    """OHLCV of every symbol in one shared-memory block of shape (5, total bars)."""
+
+    def __init__(self, history: dict[str, dict[str, np.ndarray]]):
+        total = sum(len(cols["close"]) for cols in history.values())
+        self.shm = SharedMemory(create=True, size=max(1, total * len(OHLCV) * 8))
+        buf = np.ndarray((len(OHLCV), total), dtype=np.float64, buffer=self.shm.buf)
+        self.layout: list[tuple[str, int, int]] = []
+        off = 0
+        for sym, cols in history.items():
+            n = len(cols["close"])
+            for r, c in enumerate(OHLCV):
+                buf[r, off:off + n] = cols[c]
+            self.layout.append((sym, off, n))
+            off += n
+        self.total = total
+
+    def spec(self) -> tuple:
+        return self.shm.name, self.total, self.layout
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+def load_history(symbols: Iterable[str], timeframe: str, bars: int | None = None, store=None) -> dict[str, dict[str, np.ndarray]]:
+    """Stored candles per symbol (empty series are skipped)."""
+    from app.services.candle_store import get_store
+    store = store or get_store()
+    out = {}
+    for sym in symbols:
+        cols = store.series(sym, timeframe).arrays(tail=bars)
+        if len(cols["close"]):
+            out[sym.upper()] = {c: np.asarray(cols[c], dtype=np.float64) for c in OHLCV}
+    return out
+
+# ---------- worker side ----------
+_shm: SharedMemory | None = None
+_history: dict[str, np.ndarray] = {}  # symbol -> (5, bars) view
+_cache: dict[str, OrderedDict] = {}  # symbol -> (name, *spans) -> series, least recently used first
+cache_stats = {"hits": 0, "misses": 0}
+
+def _reset_cache():
+    _cache.clear()
+    cache_stats.update(hits=0, misses=0)
+
+def _init_worker(spec: tuple):
+    global _shm, _history
+    name, total, layout = spec
+    _shm = SharedMemory(name=name)
+    buf = np.ndarray((len(OHLCV), total), dtype=np.float64, buffer=_shm.buf)
+    _history = {sym: buf[:, off:off + n] for sym, off, n in layout}
+    _reset_cache()
+
+def _use_local(history: dict[str, dict[str, np.ndarray]]):
+    # workers=0: evaluate in this process on the caller's arrays
+    global _history
+    _history = {sym: np.vstack([cols[c] for c in OHLCV]) for sym, cols in history.items()}
+    _reset_cache()
+
+def _series(symbol: str, name: str, *args: int) -> np.ndarray:
+    # One LRU per symbol: every symbol is evaluated for each combination, so a shared
+    # cap would be cycled through by the symbols before the next combination reuses a span
+    cache = _cache.setdefault(symbol, OrderedDict())
+    key = (name, *args)
+    out = cache.get(key)
+    if out is not None:
+        cache_stats["hits"] += 1
+        cache.move_to_end(key)
+        return out
+    cache_stats["misses"] += 1
+    out = cache[key] = _compute_series(symbol, name, *args)
+    if len(cache) > SERIES_CACHE:
+        cache.popitem(last=False)
+    return out
+
+def _compute_series(symbol: str, name: str, *args: int) -> np.ndarray:
+    # The same pandas operations compute_indicators runs, memoised per span
+    arr = _history[symbol]
+    close = pd.Series(arr[3])
+    if name == "ema":
+        return _ema(close, args[0]).to_numpy()
+    if name == "macd":
+        return _series(symbol, "ema", args[0]) - _series(symbol, "ema", args[1])
+    if name == "macd_signal":
+        return _ema(pd.Series(_series(symbol, "macd", *args[:2])), args[2]).to_numpy()
+    if name == "rsi":
+        return _rsi(close, args[0]).to_numpy()
+    if name == "stoch_k":
+        rsi = pd.Series(_series(symbol, "rsi", args[0]))
+        lo, hi = rsi.rolling(args[1]).min(), rsi.rolling(args[1]).max()
+        return ((rsi - lo) / (hi - lo)).rolling(args[2]).mean().to_numpy()
+    if name == "stoch_d":
+        return pd.Series(_series(symbol, "stoch_k", *args[:3])).rolling(args[3]).mean().to_numpy()
+    if name == "atr":
+        return _atr(pd.DataFrame({"high": arr[1], "low": arr[2], "close": arr[3]}), 14).to_numpy()
+    raise KeyError(name)
+
+def _frame(symbol: str, p: IndicatorParams) -> pd.DataFrame:
+    arr = _history[symbol]
+    cols = {c: arr[r] for r, c in enumerate(OHLCV)}
+    cols.update({
+        "ema_fast": _series(symbol, "ema", p.ema_fast),
+        "ema_mid": _series(symbol, "ema", p.ema_mid),
+        "ema_slow": _series(symbol, "ema", p.ema_slow),
+        "macd": _series(symbol, "macd", p.macd_fast, p.macd_slow),
+        "macd_signal": _series(symbol, "macd_signal", p.macd_fast, p.macd_slow, p.macd_signal),
+        "stoch_k": _series(symbol, "stoch_k", p.rsi_len, p.stoch_len, p.stoch_k),
+        "stoch_d": _series(symbol, "stoch_d", p.rsi_len, p.stoch_len, p.stoch_k, p.stoch_d),
+        "atr": _series(symbol, "atr"),
+    })
+    return pd.DataFrame(cols, copy=False)
+
+def _combine(per_symbol: list[dict]) -> dict:
+    # pooled across symbols; drawdown is the worst single symbol's
+    n = sum(s["trades"] for s in per_symbol)
+    if not n:
+        return summarize(pd.DataFrame())
+    w = [s["trades"] / n for s in per_symbol]
+    return {
+        "trades": n,
+        "hit_rate": float(sum(wi * s["hit_rate"] for wi, s in zip(w, per_symbol))),
+        "expectancy": float(sum(wi * s["expectancy"] for wi, s in zip(w, per_symbol))),
+        "total_return": float(np.mean([s["total_return"] for s in per_symbol if s["trades"]])),
+        "max_drawdown": float(max(s["max_drawdown"] for s in per_symbol)),
+    }
+
+def evaluate(combo: dict, exit_mode: str = "fixed", risk_reward: float = 3.0, max_hold: int = 200) -> dict:
+    """Backtest one combination over every loaded symbol."""
+    p = IndicatorParams(**{k: int(v) for k, v in combo.items() if k in PARAM_FIELDS})
+    threshold = float(combo.get("decision_threshold", 1.0))
+    stats = []
+    for sym in _history:
+        data = _frame(sym, p)
+        trades = simulate(data, signal_frame(data, threshold), exit_mode, risk_reward, max_hold)
+        stats.append(summarize(trades))
+    return {"params": combo, "stats": _combine(stats)}
+
+def _evaluate_chunk(combos: list[dict], kw: dict) -> list[dict]:
+    return [evaluate(c, **kw) for c in combos]
+
+# ---------- driver ----------
+def run_header(history: dict, exit_mode: str = "fixed", risk_reward: float = 3.0, max_hold: int = 200,
+               **extra) -> dict:
+    """What a checkpoint's results depend on besides the combination itself.
+
+    `extra` names what `history` was loaded from (timeframe, bars).
+    """
+    run = {"symbols": sorted(history), "exit_mode": exit_mode, "risk_reward": float(risk_reward),
+           "max_hold": int(max_hold), **extra}
+    return json.loads(json.dumps(run, sort_keys=True))  # as it reads back from the file
+
+def read_checkpoint(path: str | Path, run: dict | None = None) -> dict[str, dict]:
+    """Finished results in `path` by combo_key.
+
+    With `run` (a `run_header`), a checkpoint written for another run raises ValueError
+    instead of passing its results off as this one's.
+    """
+    done = {}
+    p = Path(path)
+    if not p.exists():
+        return done
+    header = None
+    with p.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                r = json.loads(line)
+            except ValueError:
+                continue  # torn last line of an interrupted run
+            if "run" in r:
+                header = r["run"]
+            elif "params" in r:
+                done[combo_key(r["params"])] = r
+    if run is not None and (done or header is not None) and header != run:
+        raise ValueError(f"checkpoint {p.name} was written for another run: {header}")
+    return done
+
+def rank(results: Iterable[dict], objective: str = "expectancy", min_trades: int = 10) -> list[dict]:
+    """Results best first; combinations with fewer than `min_trades` trades go last."""
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {OBJECTIVES}")
+    def score(r):
+        s = r["stats"]
+        return (s["trades"] >= min_trades, s[objective])
+    return sorted(results, key=score, reverse=True)
+
+def optimize(history: dict[str, dict[str, np.ndarray]], combos: list[dict], checkpoint: str | Path | None = None,
+             workers: int | None = None, chunk: int = 8, exit_mode: str = "fixed", risk_reward: float = 3.0,
+             max_hold: int = 200, progress: Callable[[int, int], None] | None = None,
+             run: dict | None = None) -> list[dict]:
+    """Evaluate `combos` (skipping those already in `checkpoint`) and return every result.
+
+    workers=0 runs in this process; otherwise a spawn-context process pool maps the
+    candles from shared memory. `run` (timeframe, bars) goes into the checkpoint header
+    along with the symbols and exit settings.
+    """
+    kw = {"exit_mode": exit_mode, "risk_reward": risk_reward, "max_hold": max_hold}
+    header = run_header(history, **kw, **(run or {}))
+    done = read_checkpoint(checkpoint, header) if checkpoint else {}
+    todo = [c for c in combos if combo_key(c) not in done]
+    results = [done[combo_key(c)] for c in combos if combo_key(c) in done]
+    total = len(combos)
+    out = None
+    if checkpoint:
+        Path(checkpoint).parent.mkdir(parents=True, exist_ok=True)
+        out = open(checkpoint, "a", encoding="utf-8")
+        if out.tell() == 0:
+            out.write(json.dumps({"run": header}) + "\n")
+            out.flush()
+
+    def record(batch: list[dict]):
+        results.extend(batch)
+        if out is not None:
+            out.write("".join(json.dumps(r) + "\n" for r in batch))
+            out.flush()
+        if progress:
+            progress(len(results), total)
+
+    try:
+        if progress:
+            progress(len(results), total)
+        chunks = [todo[i:i + chunk] for i in range(0, len(todo), chunk)]
+        if workers == 0:
+            _use_local(history)
+            for c in chunks:
+                record(_evaluate_chunk(c, kw))
+            return results
+        shared = SharedHistory(history)
+        try:
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker, initargs=(shared.spec(),)) as pool:
+                futures = [pool.submit(_evaluate_chunk, c, kw) for c in chunks]
+                for fut in as_completed(futures):
+                    record(fut.result())
+        finally:
+            shared.close()
+        return results
+    finally:
+        if out is not None:
+            out.close()
+
+def _parse_space(items: list[str]) -> dict[str, list]:
+    space = {}
+    for item in items:
+        k, _, vals = item.partition("=")
+        conv = float if k == "decision_threshold" else int
+        space[k.strip()] = [conv(v) for v in vals.split(",") if v.strip()]
+    return space
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--symbols", required=True, help="comma-separated")
+    ap.add_argument("--timeframe", default="1h")
+    ap.add_argument("--space", action="append", default=[], metavar="FIELD=V1,V2,...")
+    ap.add_argument("--samples", type=int, default=0, help="random search with this many combinations (0 = full grid)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--bars", type=int, default=None, help="most recent bars per symbol (default: all stored)")
+    ap.add_argument("--exit-mode", choices=("fixed", "fib"), default="fixed")
+    ap.add_argument("--risk-reward", type=float, default=3.0)
+    ap.add_argument("--objective", choices=OBJECTIVES, default="expectancy")
+    ap.add_argument("--min-trades", type=int, default=10)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--checkpoint", default=None, help="JSONL file; re-run with it to resume")
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args(argv)
+
+    space = _parse_space(args.space)
+    combos = random_combos(space, args.samples, args.seed) if args.samples else grid(space)
+    history = load_history([s for s in args.symbols.split(",") if s.strip()], args.timeframe, args.bars)
+    if not history:
+        raise SystemExit(f"no stored candles for {args.symbols} {args.timeframe}")
+    try:
+        results = optimize(history, combos, args.checkpoint, args.workers, exit_mode=args.exit_mode,
+                           risk_reward=args.risk_reward, run={"timeframe": args.timeframe, "bars": args.bars},
+                           progress=lambda d, t: print(f"\r{d}/{t}", end="", flush=True))
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print()
+    for r in rank(results, args.objective, args.min_trades)[:args.top]:
+        print(json.dumps(r))
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,17 @@
 from __future__ import annotations
+import warnings
+import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from app.indicators.ta import IndicatorParams
 
 BASE_KEYS = ["EMA 35/75", "EMA 75/200", "MACD Cross", "StochRSI Divergence"]
 
-def _last_cross_confirmed(a: pd.Series, b: pd.Series) -> int:
+def _last_cross_confirmed(a, b) -> int:
     if len(a) < 3 or len(b) < 3:
         return 0
-    d2 = a.iloc[-3] - b.iloc[-3]
-    d1 = a.iloc[-2] - b.iloc[-2]
-    d0 = a.iloc[-1] - b.iloc[-1]
+    a, b = np.asarray(a, dtype=float)[-3:], np.asarray(b, dtype=float)[-3:]
+    d2, d1, d0 = a - b
     if pd.isna(d2) or pd.isna(d1) or pd.isna(d0):
         return 0
     if d2 <= 0 and d1 > 0 and d0 > 0:
@@ -18,91 +20,122 @@ def _last_cross_confirmed(a: pd.Series, b: pd.Series) -> int:
         return -1
     return 0
 
+def find_pivots(series, win: int = 5) -> tuple[np.ndarray, np.ndarray]:
+    """All swing highs and lows as positional index arrays.
+
+    Bar i is a swing high (low) when it equals the max (min) of the centred window
+    [i - win//2, i + win//2]; NaNs in the window are ignored, a NaN bar is never a pivot.
+    """
+    s = np.asarray(series, dtype=float)
+    half = win // 2
+    if len(s) < 2 * half + 1:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    windows = sliding_window_view(s, 2 * half + 1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN windows
+        wmax = np.nanmax(windows, axis=1)
+        wmin = np.nanmin(windows, axis=1)
+    centre = s[half:len(s) - half]
+    return np.flatnonzero(centre == wmax) + half, np.flatnonzero(centre == wmin) + half
+
 def _find_swings(series: pd.Series, win: int = 5):
     if len(series) < win * 3:
         return None
-    s = series.reset_index(drop=True)
-    highs, lows = [], []
-    half = win // 2
-    for i in range(half, len(s) - half):
-        w = s.iloc[i - half:i + half + 1]
-        if s.iloc[i] == w.max(): highs.append(i)
-        if s.iloc[i] == w.min(): lows.append(i)
-    highs = highs[-2:] if len(highs) >= 2 else []
-    lows  = lows[-2:]  if len(lows)  >= 2 else []
+    highs, lows = find_pivots(series, win)
+    highs = highs[-2:].tolist() if len(highs) >= 2 else []
+    lows  = lows[-2:].tolist()  if len(lows)  >= 2 else []
     return {"highs": highs, "lows": lows}
 
+def _pair_check(points: np.ndarray, piv_p: np.ndarray, piv_s: np.ndarray,
+                close: np.ndarray, stoch: np.ndarray, sign: int) -> np.ndarray:
+    # Compare the last two price pivots and the last two StochRSI pivots known at each point
+    kp = np.searchsorted(piv_p, points, side="right")
+    ks = np.searchsorted(piv_s, points, side="right")
+    ok = (kp >= 2) & (ks >= 2)
+    out = np.zeros(len(points), dtype=bool)
+    if not ok.any():
+        return out
+    p1, p2 = piv_p[kp[ok] - 2], piv_p[kp[ok] - 1]
+    s1, s2 = piv_s[ks[ok] - 2], piv_s[ks[ok] - 1]
+    if sign > 0:
+        out[ok] = (close[p2] < close[p1]) & (stoch[s2] > stoch[s1])
+    else:
+        out[ok] = (close[p2] > close[p1]) & (stoch[s2] < stoch[s1])
+    return out
+
+def divergence_scan(close: pd.Series, stoch_k: pd.Series, win: int = 5) -> tuple[np.ndarray, np.ndarray]:
+    """Full StochRSI divergence history in one pass: (pivot indices, verdicts).
+
+    The verdict (+1 bullish, -1 bearish, 0 none) is re-evaluated at every pivot of either
+    series; a pivot is confirmed win//2 bars after its index. The last verdict is what
+    `_stoch_rsi_divergence` returns for the whole series.
+    """
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int8))
+    if len(close) < win * 3 or len(stoch_k) < win * 3:
+        return empty
+    c = np.asarray(close, dtype=float)
+    k = np.asarray(stoch_k, dtype=float)
+    ph, pl = find_pivots(c, win)
+    sh, sl = find_pivots(k, win)
+    points = np.unique(np.concatenate([ph, pl, sh, sl]))
+    if len(points) == 0:
+        return empty
+    bull = _pair_check(points, pl, sl, c, k, 1)
+    bear = _pair_check(points, ph, sh, c, k, -1) & ~bull
+    return points, np.where(bull, 1, np.where(bear, -1, 0)).astype(np.int8)
+
 def _stoch_rsi_divergence(close: pd.Series, stoch_k: pd.Series, win: int = 5) -> int:
     sp = _find_swings(close, win=win)
     ss = _find_swings(stoch_k, win=win)
     if not sp or not ss:
         return 0
+    c = np.asarray(close, dtype=float)
+    k = np.asarray(stoch_k, dtype=float)
     if len(sp["lows"]) >= 2 and len(ss["lows"]) >= 2:
-        p1, p2 = sp["lows"][-2], sp["lows"][-1]
-        s1, s2 = ss["lows"][-2], ss["lows"][-1]
-        if p1 < p2 and s1 < s2:
-            if close.iloc[p2] < close.iloc[p1] and stoch_k.iloc[s2] > stoch_k.iloc[s1]:
-                return 1
+        p1, p2 = sp["lows"]
+        s1, s2 = ss["lows"]
+        if c[p2] < c[p1] and k[s2] > k[s1]:
+            return 1
     if len(sp["highs"]) >= 2 and len(ss["highs"]) >= 2:
-        p1, p2 = sp["highs"][-2], sp["highs"][-1]
-        s1, s2 = ss["highs"][-2], ss["highs"][-1]
-        if p1 < p2 and s1 < s2:
-            if close.iloc[p2] > close.iloc[p1] and stoch_k.iloc[s2] < stoch_k.iloc[s1]:
-                return -1
+        p1, p2 = sp["highs"]
+        s1, s2 = ss["highs"]
+        if c[p2] > c[p1] and k[s2] < k[s1]:
+            return -1
     return 0
 
-def make_signal(df: pd.DataFrame, timeframe: str, params: IndicatorParams, risk_reward: float = 3.0, decision_threshold: float = 1.0) -> dict:
-    if df is None or len(df) < 30:
-        return {
-            "timeframe": timeframe,
-            "side": "NEUTRAL",
-            "confidence": 0.0,
-            "entry": None,
-            "target": None,
-            "metadata": {"indicators": {k: "NEUTRAL" for k in BASE_KEYS}, "reasons": []},
-        }
-
-    row = df.iloc[-1]
+# name -> (vote weight, rationale when +1, rationale when -1)
+VOTES = {
+    "EMA 35/75":           (0.4,  "Cross up", "Cross down"),
+    "EMA 75/200":          (0.3,  "Cross up", "Cross down"),
+    "MACD Cross":          (0.5,  "Cross up", "Cross down"),
+    "StochRSI Divergence": (0.25, "Bullish",  "Bearish"),
+}
+
+def neutral_signal(timeframe: str) -> dict:
+    return {
+        "timeframe": timeframe,
+        "side": "NEUTRAL",
+        "confidence": 0.0,
+        "entry": None,
+        "target": None,
+        "metadata": {"indicators": {k: "NEUTRAL" for k in BASE_KEYS}, "reasons": []},
+    }
+
+def signal_from_votes(timeframe: str, entry_price: float | None, votes: dict, decision_threshold: float = 1.0) -> dict:
+    """Build the make_signal payload from per-indicator votes (+1 / -1 / 0)."""
     score = 0.0
     notes = []
-    entry_price = float(row["close"]) if "close" in row and pd.notna(row["close"]) else None
     indicators = {k: "NEUTRAL" for k in BASE_KEYS}
 
-    if {"ema_fast","ema_mid"}.issubset(df.columns):
-        c = _last_cross_confirmed(df["ema_fast"], df["ema_mid"])
-        if c == 1:
-            indicators["EMA 35/75"] = "BUY";  score += 0.4
-            notes.append({"name":"EMA 35/75","rationale":"Cross up","entry":entry_price,"target":None,"side":"BUY","confidence":0.4})
-        elif c == -1:
-            indicators["EMA 35/75"] = "SELL"; score -= 0.4
-            notes.append({"name":"EMA 35/75","rationale":"Cross down","entry":entry_price,"target":None,"side":"SELL","confidence":-0.4})
-
-    if {"ema_mid","ema_slow"}.issubset(df.columns):
-        c = _last_cross_confirmed(df["ema_mid"], df["ema_slow"])
-        if c == 1:
-            indicators["EMA 75/200"] = "BUY";  score += 0.3
-            notes.append({"name":"EMA 75/200","rationale":"Cross up","entry":entry_price,"target":None,"side":"BUY","confidence":0.3})
-        elif c == -1:
-            indicators["EMA 75/200"] = "SELL"; score -= 0.3
-            notes.append({"name":"EMA 75/200","rationale":"Cross down","entry":entry_price,"target":None,"side":"SELL","confidence":-0.3})
-
-    if {"macd","macd_signal"}.issubset(df.columns):
-        c = _last_cross_confirmed(df["macd"], df["macd_signal"])
-        if c == 1:
-            indicators["MACD Cross"] = "BUY";  score += 0.5
-            notes.append({"name":"MACD Cross","rationale":"Cross up","entry":entry_price,"target":None,"side":"BUY","confidence":0.5})
-        elif c == -1:
-            indicators["MACD Cross"] = "SELL"; score -= 0.5
-            notes.append({"name":"MACD Cross","rationale":"Cross down","entry":entry_price,"target":None,"side":"SELL","confidence":-0.5})
-
-    if {"stoch_k","stoch_d","close"}.issubset(df.columns):
-        div = _stoch_rsi_divergence(df["close"], df["stoch_k"], win=5)
-        if div == 1:
-            indicators["StochRSI Divergence"] = "BUY";  score += 0.25
-            notes.append({"name":"StochRSI Divergence","rationale":"Bullish","entry":entry_price,"target":None,"side":"BUY","confidence":0.25})
-        elif div == -1:
-            indicators["StochRSI Divergence"] = "SELL"; score -= 0.25
-            notes.append({"name":"StochRSI Divergence","rationale":"Bearish","entry":entry_price,"target":None,"side":"SELL","confidence":-0.25})
+    for k in BASE_KEYS:
+        weight, why_up, why_down = VOTES[k]
+        v = votes.get(k, 0)
+        if v == 1:
+            indicators[k] = "BUY";  score += weight
+            notes.append({"name":k,"rationale":why_up,"entry":entry_price,"target":None,"side":"BUY","confidence":weight})
+        elif v == -1:
+            indicators[k] = "SELL"; score -= weight
+            notes.append({"name":k,"rationale":why_down,"entry":entry_price,"target":None,"side":"SELL","confidence":-weight})
 
     side = "NEUTRAL"
     if score >= decision_threshold: side = "BUY"
@@ -135,4 +168,24 @@ def make_signal(df: pd.DataFrame, timeframe: str, params: IndicatorParams, risk_
         "entry": entry_price,
         "target": target,
         "metadata": {"indicators": indicators, "reasons": notes},
-    }
\ No newline at end of file
+    }
+
+def make_signal(df, timeframe: str, params: IndicatorParams, risk_reward: float = 3.0, decision_threshold: float = 1.0, swing_window: int = 5) -> dict:
+    """Vote on the last bar of an indicator frame, Bars or CandleBuffer."""
+    if df is None or len(df) < 30:
+        return neutral_signal(timeframe)
+
+    last_close = np.asarray(df["close"])[-1] if "close" in df.columns else None
+    entry_price = float(last_close) if last_close is not None and pd.notna(last_close) else None
+    votes = {}
+
+    if {"ema_fast","ema_mid"}.issubset(df.columns):
+        votes["EMA 35/75"] = _last_cross_confirmed(df["ema_fast"], df["ema_mid"])
+    if {"ema_mid","ema_slow"}.issubset(df.columns):
+        votes["EMA 75/200"] = _last_cross_confirmed(df["ema_mid"], df["ema_slow"])
+    if {"macd","macd_signal"}.issubset(df.columns):
+        votes["MACD Cross"] = _last_cross_confirmed(df["macd"], df["macd_signal"])
+    if {"stoch_k","stoch_d","close"}.issubset(df.columns):
+        votes["StochRSI Divergence"] = _stoch_rsi_divergence(df["close"], df["stoch_k"], win=swing_window)
+
+    return signal_from_votes(timeframe, entry_price, votes, decision_threshold)
@@ -0,0 +1,211 @@
+"""Per-stage time and peak memory of the signal pipeline on deterministic synthetic OHLCV.
+
+    python -m benchmarks.bench_pipeline                                  # 500, 10k and 1M bars
+    python -m benchmarks.bench_pipeline --sizes 500,10000 --save benchmarks/baseline.json
+    python -m benchmarks.bench_pipeline --compare benchmarks/baseline.json --threshold 0.25
+
+The math stages run at every size; the per-tick stages (plot_chart, run_signal_once and
+the alert fan-out) always see the 500 bars a job fetches. Bybit and Telegram are
+httpx.MockTransport handlers and candles, signal state and the outbox live in a temp
+directory, so nothing leaves the machine. With --compare the run exits 1 when a stage is
+slower, or peaks higher, than the baseline by more than --threshold.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from app.indicators.buffer import CandleBuffer
+from app.indicators.ta import IndicatorParams, approximate_zones, compute_fib_031, compute_indicators, last_cross
+from app.strategies.rules import _find_swings, make_signal
+
+DEFAULT_SIZES = (500, 10_000, 1_000_000)
+TICK_BARS = 500
+SYMBOL, TIMEFRAME = "BTCUSDT", "15m"
+BAR_MS = 900_000
+
+def synthetic_ohlcv(n: int, seed: int = 0, end_ms: int = 1_700_000_000_000) -> pd.DataFrame:
+    """Geometric random walk with realistic wicks; same seed, same bars."""
+    rng = np.random.default_rng(seed)
+    close = 30_000 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({
+        "open_time": pd.to_datetime(end_ms - (n - 1 - np.arange(n)) * BAR_MS, unit="ms"),
+        "open": open_,
+        "high": np.maximum(open_, close) * (1 + rng.uniform(0, 0.003, n)),
+        "low": np.minimum(open_, close) * (1 - rng.uniform(0, 0.003, n)),
+        "close": close,
+        "volume": rng.uniform(1, 100, n),
+    })
+
+def measure(fn: Callable[[], object], repeat: int) -> dict:
+    """Median wall time over `repeat` runs (after one warm-up) and the peak traced allocation of one more."""
+    fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"ms": round(statistics.median(times) * 1000, 3), "peak_kb": round(peak / 1024, 1), "repeat": repeat}
+
+def math_stages(n: int, params: IndicatorParams) -> dict[str, Callable[[], object]]:
+    df = synthetic_ohlcv(n)
+    data = compute_indicators(df, params)
+    buf = CandleBuffer.from_frame(df)
+    bars = compute_indicators(buf, params)
+    return {
+        "compute_indicators": lambda: compute_indicators(df, params),
+        "compute_indicators_bars": lambda: compute_indicators(buf, params),
+        "last_cross": lambda: last_cross(data["ema_fast"], data["ema_mid"]),
+        "_find_swings": lambda: _find_swings(data["close"]),
+        "make_signal": lambda: make_signal(data, TIMEFRAME, params),
+        "make_signal_bars": lambda: make_signal(bars, TIMEFRAME, params),
+        "compute_fib_031": lambda: compute_fib_031(data),
+        "approximate_zones": lambda: approximate_zones(data),
+    }
+
+# ---------- mocked Bybit / Telegram ----------
+def _bybit_handler(df: pd.DataFrame) -> Callable[[httpx.Request], httpx.Response]:
+    ot = df["open_time"].values.astype("datetime64[ms]").astype("i8")
+    rows = [[str(t), *(repr(float(v)) for v in r), "0"]
+            for t, r in zip(ot, df[["open", "high", "low", "close", "volume"]].to_numpy())]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        q = request.url.params
+        start = int(q.get("start", 0))
+        sel = [r for r in rows if int(r[0]) >= start][-int(q.get("limit", 200)):]
+        return httpx.Response(200, json={"retCode": 0, "result": {"list": sel[::-1]}})  # newest first, like Bybit
+    return handler
+
+@contextmanager
+def mocked_services(tmp: Path, df: pd.DataFrame) -> Iterator[None]:
+    """Point the shared Bybit client, candle store, signal state and outbox at mocks in `tmp`."""
+    from app.clients import bybit_client
+    from app.config import settings
+    from app.notifiers import telegram
+    from app.services import candle_store, signal_state
+
+    saved = (bybit_client._shared, candle_store._store, signal_state._store, telegram._outbox,
+             settings.telegram_bot_token, settings.telegram_chat_id)
+    bybit_client._shared = bybit_client.BybitClient(transport=httpx.MockTransport(_bybit_handler(df)),
+                                                    limiter=bybit_client.AdaptiveRateLimiter(rate=1e6))
+    candle_store._store = candle_store.CandleStore(root=tmp / "candles", resync_after=0)
+    signal_state._store = signal_state.SignalStateStore(db_path=str(tmp / "state.db"), legacy_json=None)
+    settings.telegram_bot_token, settings.telegram_chat_id = "TOKEN", "42"
+    # Alerts are only enqueued inside the timed stage; the paced uploads hit the mock in between
+    telegram._outbox = telegram.TelegramOutbox(
+        "TOKEN", path=str(tmp / "outbox.db"),
+        transport=httpx.MockTransport(lambda r: httpx.Response(200, json={"ok": True})))
+    try:
+        yield
+    finally:
+        signal_state._store.close()
+        (bybit_client._shared, candle_store._store, signal_state._store, telegram._outbox,
+         settings.telegram_bot_token, settings.telegram_chat_id) = saved
+
+def tick_stages(params: IndicatorParams, loop: asyncio.AbstractEventLoop) -> dict[str, Callable[[], object]]:
+    import app.scheduler as sch
+    from app.clients.plot import plot_chart
+    from app.services.signal_state import save_for
+
+    data = compute_indicators(synthetic_ohlcv(TICK_BARS), params)
+    fib, zones = compute_fib_031(data), approximate_zones(data)
+    sig = make_signal(data, TIMEFRAME, params)
+    # Every cross flips to BUY so the fan-out builds its caption and chart
+    alert = {**sig, "metadata": {**sig["metadata"],
+                                 "indicators": {**sig["metadata"]["indicators"], **{k: "BUY" for k in sch.CROSS_KEYS}}}}
+
+    def deliver():
+        save_for(SYMBOL, TIMEFRAME, {k: "NEUTRAL" for k in alert["metadata"]["indicators"]})
+        loop.run_until_complete(sch._deliver(SYMBOL, TIMEFRAME, data, alert))
+
+    return {
+        "plot_chart": lambda: plot_chart(data.tail(200), SYMBOL, TIMEFRAME, fib=fib, zones=zones),
+        "run_signal_once": lambda: loop.run_until_complete(sch.run_signal_once(SYMBOL, TIMEFRAME, params)),
+        "deliver_alert": deliver,
+    }
+
+def run(sizes: list[int], repeat: int, log: Callable[[str], None] = print) -> dict:
+    params = IndicatorParams()
+    stages = {}
+
+    def record(name: str, fn: Callable[[], object], reps: int):
+        stages[name] = r = measure(fn, reps)
+        log(f"{name:<34}{r['ms']:>12.3f}{r['peak_kb']:>14.1f}")
+
+    log(f"{'stage@bars':<34}{'ms':>12}{'peak KiB':>14}")
+    for n in sizes:
+        reps = repeat if n < 1_000_000 else max(1, repeat // 3)
+        for name, fn in math_stages(n, params).items():
+            record(f"{name}@{n}", fn, reps)
+
+    from app.notifiers.telegram import close_outbox
+    from app.services.executor import shutdown
+    loop = asyncio.new_event_loop()
+    try:
+        with tempfile.TemporaryDirectory() as tmp, mocked_services(Path(tmp), synthetic_ohlcv(TICK_BARS + 100)):
+            for name, fn in tick_stages(params, loop).items():
+                record(f"{name}@{TICK_BARS}", fn, repeat)
+            loop.run_until_complete(close_outbox())
+    finally:
+        shutdown()
+        loop.close()
+    return {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+                 "machine": platform.machine(), "sizes": sizes, "repeat": repeat},
+        "stages": stages,
+    }
+
+def compare(current: dict, baseline: dict, threshold: float = 0.25, min_ms: float = 0.5, min_kb: float = 64.0) -> list[str]:
+    """Stages slower / larger than baseline by more than `threshold` (and the absolute floors)."""
+    out = []
+    for name, base in baseline.get("stages", {}).items():
+        cur = current["stages"].get(name)
+        if cur is None:
+            continue
+        if cur["ms"] > base["ms"] * (1 + threshold) and cur["ms"] - base["ms"] > min_ms:
+            out.append(f"{name}: {cur['ms']:.3f} ms vs baseline {base['ms']:.3f} ms")
+        if cur["peak_kb"] > base["peak_kb"] * (1 + threshold) and cur["peak_kb"] - base["peak_kb"] > min_kb:
+            out.append(f"{name}: peak {cur['peak_kb']:.1f} KiB vs baseline {base['peak_kb']:.1f} KiB")
+    return out
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--save", help="write results as JSON (e.g. a new baseline)")
+    ap.add_argument("--compare", help="baseline JSON to check against")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    args = ap.parse_args(argv)
+
+    result = run([int(x) for x in args.sizes.split(",") if x.strip()], args.repeat)
+    if args.save:
+        Path(args.save).write_text(json.dumps(result, indent=2), encoding="utf-8")
+    if args.compare:
+        regressions = compare(result, json.loads(Path(args.compare).read_text(encoding="utf-8")), args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Cold start of the API: import, startup handlers, first request and fully warm, in fresh processes.
+
+    python -m benchmarks.bench_startup                 # 3 cold starts, median per phase
+    python -m benchmarks.bench_startup --runs 5 --save benchmarks/startup.json
+
+Each run is a new interpreter that imports app.main, runs the startup handlers and polls
+/api/health and /api/ready over an in-process ASGI transport. Bybit, Telegram, the candle
+store and signal state are the mocks of bench_pipeline, so the warm-up covers every
+configured (symbol, timeframe) without leaving the machine. Times are seconds from
+the start of the import.
+"""
+from __future__ import annotations
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ("pandas", "matplotlib", "apscheduler", "app.scheduler")
+PHASES = ("import", "startup", "first_request", "warm")
+
+def _child(bars: int) -> dict:
+    t0 = time.perf_counter()
+    import app.main as main
+    out = {"import": time.perf_counter() - t0, "loaded_at_import": [m for m in HEAVY if m in sys.modules]}
+
+    import asyncio
+    import tempfile
+    import httpx
+    from benchmarks.bench_pipeline import mocked_services, synthetic_ohlcv
+
+    app = main.app
+
+    async def serve():
+        await app.router.startup()
+        out["startup"] = time.perf_counter() - t0
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as c:
+                assert (await c.get("/api/health")).status_code == 200
+                out["first_request"] = time.perf_counter() - t0
+                while (await c.get("/api/ready")).status_code != 200:
+                    await asyncio.sleep(0.005)
+                out["warm"] = time.perf_counter() - t0
+        finally:
+            await app.router.shutdown()
+
+    with tempfile.TemporaryDirectory() as tmp, mocked_services(Path(tmp), synthetic_ohlcv(bars)):
+        asyncio.run(serve())
+    r = app.state.readiness.report()
+    out.update(series=r["total"], failed=len(r["failed"]))
+    return out
+
+def run(runs: int, bars: int, log=print) -> dict:
+    results = []
+    for i in range(runs):
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child", "--bars", str(bars)],
+                              cwd=ROOT, capture_output=True, text=True, check=True)
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        log(f"run {i + 1}: " + "  ".join(f"{p}={results[-1][p]:.3f}s" for p in PHASES))
+    median = {p: round(statistics.median(r[p] for r in results), 4) for p in PHASES}
+    last = results[-1]
+    log("median: " + "  ".join(f"{p}={median[p]:.3f}s" for p in PHASES)
+        + f"  ({last['series']} series, {last['failed']} failed; loaded at import: {last['loaded_at_import'] or 'none'})")
+    return {"median": median, "runs": results}
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--bars", type=int, default=600, help="bars the mocked exchange serves per series")
+    ap.add_argument("--save", help="write results as JSON")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.child:
+        print(json.dumps(_child(args.bars)))
+        return 0
+    result = run(args.runs, args.bars)
+    if args.save:
+        Path(args.save).write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.services.backfill import PAGE, backfill, backfill_many, chunk_ranges, parse_time
+from app.services.candle_store import CandleStore
+
+MIN = 60_000
+
+
+class PagedClient:
+    """Serves 1m bars [0, now] honouring start/end/limit, newest `limit` of the window."""
+
+    def __init__(self, now: int, listed: int = 0):
+        self.now = now
+        self.listed = listed
+        self.calls = []
+        self.active = self.peak = 0
+
+    async def fetch_klines(self, symbol, interval, limit=400, start=None, end=None):
+        self.calls.append((start, end))
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.001)
+        self.active -= 1
+        lo = max(self.listed, 0 if start is None else -(-start // MIN))
+        hi = self.now if end is None else min(self.now, end // MIN)
+        idx = np.arange(lo, hi + 1)[-limit:]
+        return pd.DataFrame({
+            "open_time": pd.to_datetime(idx * MIN, unit="ms"),
+            "open": idx * 1.0, "high": idx + 1.0, "low": idx - 1.0, "close": idx * 1.0, "volume": 1.0,
+        })
+
+
+def test_chunks_sit_on_a_fixed_grid():
+    chunks = chunk_ranges(1500 * MIN, 3200 * MIN, "1m")
+    assert chunks == [(1000 * MIN, 1999 * MIN), (2000 * MIN, 2999 * MIN), (3000 * MIN, 3999 * MIN)]
+    assert chunk_ranges(1700 * MIN, 2100 * MIN, "1m")[0] == chunks[0]
+    assert parse_time("1970-01-01T00:01:00") == MIN and parse_time(60) == MIN
+
+
+def test_backfill_pages_concurrently_dedups_and_resumes(tmp_path):
+    store = CandleStore(tmp_path)
+    client = PagedClient(now=10 * PAGE + 500, listed=1200)
+    out = asyncio.run(backfill_many(client, store, ["btcusdt"], ["1m"], 0, client.now * MIN, concurrency=4))
+    s = store.series("BTCUSDT", "1m")
+    ot = s.arrays()["open_time"] // MIN
+    assert out == {"BTCUSDT 1m": client.now - 1200 + 1}
+    np.testing.assert_array_equal(ot, np.arange(1200, client.now + 1))  # sorted, no gaps, no duplicates
+    assert len(client.calls) == 11 and 1 < client.peak <= 4
+
+    # every chunk is either recorded done (pre-listing ones included) or already stored
+    manifest = json.loads((s.dir / "backfill.json").read_text())
+    assert len(manifest["done"]) == 11
+    client.calls.clear()
+    assert asyncio.run(backfill(client, store, "BTCUSDT", "1m", 0, client.now * MIN)) == 0
+    assert client.calls == []
+
+
+def test_large_limit_and_long_outage_page_history_in(tmp_path):
+    store = CandleStore(tmp_path, resync_after=0)
+    client = PagedClient(now=int(pd.Timestamp.now().timestamp() * 1000) // MIN)
+    df = asyncio.run(store.get_klines(client, "BTCUSDT", "1m", limit=2500))
+    assert len(df) == 2500 and df["open_time"].is_monotonic_increasing and len(client.calls) >= 3
+
+    # 3000 bars offline: the gap is paged in and the older history is kept
+    before = len(store.series("BTCUSDT", "1m"))
+    client.now += 3000
+    df = asyncio.run(store.get_klines(client, "BTCUSDT", "1m", limit=2500))
+    ot = store.series("BTCUSDT", "1m").arrays()["open_time"] // MIN
+    assert len(ot) == before + 3000 and (np.diff(ot) == 1).all()
+    assert int(df["open_time"].iloc[-1].value // 1_000_000) // MIN == client.now
+
+
+def test_chunks_completing_out_of_order_keep_every_bar(tmp_path, monkeypatch):
+    import app.services.backfill as backfill_mod
+    monkeypatch.setattr(backfill_mod, "FLUSH_CHUNKS", 2)
+    order = [5, 9, 3, 7, 6, 10, 0, 8, 2, 4, 1]  # completion order of the 11 chunks
+
+    class ShuffledClient(PagedClient):
+        async def fetch_klines(self, symbol, interval, limit=400, start=None, end=None):
+            await asyncio.sleep(0.005 * order.index(start // MIN // PAGE))
+            return await super().fetch_klines(symbol, interval, limit=limit, start=start, end=end)
+
+    store = CandleStore(tmp_path)
+    client = ShuffledClient(now=10 * PAGE + 500)
+    asyncio.run(backfill(client, store, "BTCUSDT", "1m", 0, client.now * MIN, concurrency=11))
+    ot = store.series("BTCUSDT", "1m").arrays()["open_time"] // MIN
+    np.testing.assert_array_equal(ot, np.arange(0, client.now + 1))
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from app.indicators.ta import IndicatorParams, compute_indicators
+from app.strategies.backtest import backtest, signal_at, signal_frame, simulate, summarize
+from app.strategies.rules import make_signal
+
+
+def _frame(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        "open_time": pd.to_datetime(np.arange(n) * 900_000, unit="ms"),
+        "open": close + rng.normal(0, 0.2, n),
+        "high": close + np.abs(rng.normal(0, 1, n)),
+        "low": close - np.abs(rng.normal(0, 1, n)),
+        "close": close,
+        "volume": rng.random(n),
+    })
+
+
+def test_signal_frame_matches_make_signal_on_every_bar():
+    params = IndicatorParams(ema_fast=5, ema_mid=13, ema_slow=34, macd_fast=6, macd_slow=13, macd_signal=5,
+                             stoch_len=14, stoch_k=3, stoch_d=3)
+    data = compute_indicators(_frame(400, seed=3), params)
+    sig = signal_frame(data, decision_threshold=0.4)
+    assert (sig["side"] != 0).sum() > 10
+    for i in range(len(data)):
+        expected = make_signal(data.iloc[:i + 1], "15m", params, decision_threshold=0.4)
+        assert signal_at(sig, i, "15m", decision_threshold=0.4) == expected, i
+
+
+def test_simulate_exits_at_target_or_stop():
+    data = _frame(6)
+    data[["open", "high", "low", "close"]] = 100.0
+    data.loc[2, "high"] = 102.0  # long target (101) hit two bars after entry
+    data.loc[4, "low"] = 98.0    # short stop (100.5) never touched, target (99) hit
+    sig = pd.DataFrame({"side": [1, 0, 0, -1, 0, 0], "entry": 100.0}, index=data.index)
+    trades = simulate(data, sig, "fixed", risk_reward=2.0)
+    assert trades[["entry_i", "exit_i", "outcome"]].values.tolist() == [[0, 2, 1], [3, 4, 1]]
+    np.testing.assert_allclose(trades["ret"], [0.01, 0.01])
+
+    stats = summarize(trades)
+    assert stats["trades"] == 2 and stats["hit_rate"] == 1.0 and stats["max_drawdown"] == 0.0
+
+
+def test_backtest_reports_stats_for_both_exit_modes():
+    df = _frame(3000, seed=1)
+    for mode in ("fixed", "fib"):
+        out = backtest(df, IndicatorParams(), decision_threshold=0.5, mode=mode)
+        stats = out["stats"]
+        assert stats["trades"] == len(out["trades"]) > 0
+        assert 0.0 <= stats["hit_rate"] <= 1.0 and 0.0 <= stats["max_drawdown"] < 1.0
+        # one position at a time
+        t = out["trades"]
+        assert (t["entry_i"].to_numpy()[1:] > t["exit_i"].to_numpy()[:-1]).all()
@@ -0,0 +1,23 @@
+from benchmarks.bench_pipeline import compare, measure, synthetic_ohlcv
+
+
+def test_synthetic_ohlcv_is_deterministic_and_well_formed():
+    a, b = synthetic_ohlcv(1000, seed=7), synthetic_ohlcv(1000, seed=7)
+    assert a.equals(b)
+    assert (a["high"] >= a[["open", "close"]].max(axis=1)).all()
+    assert (a["low"] <= a[["open", "close"]].min(axis=1)).all()
+    assert a["open_time"].is_monotonic_increasing
+
+
+def test_compare_flags_only_real_regressions():
+    base = {"stages": {"a@500": {"ms": 10.0, "peak_kb": 1000.0}, "b@500": {"ms": 0.1, "peak_kb": 10.0}}}
+    cur = {"stages": {"a@500": {"ms": 13.0, "peak_kb": 1100.0}, "b@500": {"ms": 0.3, "peak_kb": 30.0}}}
+    assert compare(cur, base, threshold=0.25) == ["a@500: 13.000 ms vs baseline 10.000 ms"]  # b is under the floors
+    cur["stages"]["a@500"]["peak_kb"] = 2000.0
+    assert len(compare(cur, base, threshold=0.25)) == 2
+    assert compare(cur, base, threshold=1.5) == []
+
+
+def test_measure_reports_time_and_peak():
+    r = measure(lambda: bytearray(1 << 20), repeat=2)
+    assert r["repeat"] == 2 and r["ms"] >= 0 and r["peak_kb"] >= 1024
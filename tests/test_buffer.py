@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.indicators.buffer import Bars, CandleBuffer
+from app.indicators.ta import IndicatorParams, approximate_zones, compute_fib_031, compute_indicators
+from app.strategies.rules import make_signal
+
+
+def _ohlcv(n: int, seed: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        "open_time": pd.to_datetime(np.arange(n) * 900_000, unit="ms"),
+        "open": close + rng.normal(0, 0.3, n),
+        "high": close + np.abs(rng.normal(0, 1, n)),
+        "low": close - np.abs(rng.normal(0, 1, n)),
+        "close": close,
+        "volume": rng.random(n),
+    })
+
+
+def test_ring_keeps_the_newest_bars_contiguous():
+    buf = CandleBuffer(capacity=4)
+    for t in range(1, 11):
+        assert buf.update(t * 60_000, t, t + 1, t - 1, t, 1.0)
+    assert len(buf) == 4 and buf.last_open_time == 600_000
+    w = buf.window()
+    assert w["open_time"].tolist() == [420_000, 480_000, 540_000, 600_000]
+    assert w["close"].tolist() == [7.0, 8.0, 9.0, 10.0] and w["close"].flags.c_contiguous
+    assert buf.window(2)["close"].tolist() == [9.0, 10.0]
+
+    # the still-open bar is replaced in place, visible through an existing view
+    assert not buf.update(600_000, 10, 12, 9, 11.5, 2.0)
+    assert len(buf) == 4 and w["close"][-1] == 11.5
+    with pytest.raises(ValueError):
+        buf.update(60_000, 1, 1, 1, 1, 1)
+
+
+def test_extend_matches_bar_by_bar_updates():
+    df = _ohlcv(50)
+    bulk = CandleBuffer(capacity=32)
+    bulk.extend(df.iloc[:20])
+    bulk.extend(df.iloc[19:])  # overlaps the last stored bar: replaced, not duplicated
+    one = CandleBuffer(capacity=32)
+    for row in df.itertuples(index=False):
+        one.update(row.open_time.value // 1_000_000, row.open, row.high, row.low, row.close, row.volume)
+    for c in one.columns:
+        np.testing.assert_array_equal(bulk[c], one[c])
+    np.testing.assert_array_equal(bulk["close"], df["close"].to_numpy()[-32:])
+
+
+def test_pipeline_accepts_bars_and_buffers():
+    df = _ohlcv(400)
+    params = IndicatorParams(ema_fast=9, ema_mid=21, ema_slow=55)
+    batch = compute_indicators(df, params)
+    buf = CandleBuffer.from_frame(df)
+    data = compute_indicators(buf, params)
+    assert isinstance(data, Bars) and np.shares_memory(data["close"], buf["close"])
+    for col in batch.columns.drop("open_time"):
+        np.testing.assert_allclose(data[col], batch[col].to_numpy(), rtol=1e-12, equal_nan=True)
+    assert make_signal(data, "15m", params, decision_threshold=0.3) == make_signal(batch, "15m", params, decision_threshold=0.3)
+    assert compute_fib_031(data) == compute_fib_031(batch)
+    assert approximate_zones(data) == approximate_zones(batch)
+    assert compute_fib_031(buf) == compute_fib_031(df)  # no indicator columns: computed on the fly
+    pd.testing.assert_frame_equal(data.to_frame(), batch, check_dtype=False)
+
+
+def test_float32_buffer_is_smaller():
+    df = _ohlcv(500)
+    wide, narrow = CandleBuffer.from_frame(df), CandleBuffer.from_frame(df, dtype=np.float32)
+    assert narrow.nbytes < 0.6 * wide.nbytes
+    assert narrow["close"].dtype == np.float32
+    assert compute_indicators(narrow, IndicatorParams())["ema_fast"].dtype == np.float32
@@ -0,0 +1,91 @@
+import asyncio
+
+import httpx
+
+from app.clients.bybit_client import AdaptiveRateLimiter, BybitClient
+
+
+def _kline_rows(n: int = 3):
+    # Bybit returns newest first
+    return [[str(1_700_000_000_000 + i * 60_000), "1", "2", "0.5", "1.5", "10", "15"] for i in reversed(range(n))]
+
+
+def test_category_is_cached_per_symbol():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        category = request.url.params["category"]
+        calls.append(category)
+        if category == "linear":
+            return httpx.Response(200, json={"retCode": 10001, "retMsg": "symbol invalid"})
+        return httpx.Response(200, json={"retCode": 0, "result": {"list": _kline_rows()}})
+
+    async def run():
+        client = BybitClient(transport=httpx.MockTransport(handler))
+        try:
+            df1 = await client.fetch_klines("SPOTONLY", "1m", limit=3)
+            df2 = await client.fetch_klines("SPOTONLY", "1m", limit=3)
+        finally:
+            await client.aclose()
+        return df1, df2
+
+    df1, df2 = asyncio.run(run())
+    assert calls == ["linear", "spot", "spot"]
+    assert list(df1.columns) == ["open_time", "open", "high", "low", "close", "volume"]
+    assert len(df2) == 3 and df2["open_time"].is_monotonic_increasing
+
+
+def test_throttled_request_is_retried_and_slows_the_limiter():
+    responses = [
+        httpx.Response(429, json={"retCode": 10006, "retMsg": "Too many visits!"}),
+        httpx.Response(200, json={"retCode": 0, "result": {"list": _kline_rows()}},
+                       headers={"X-Bapi-Limit-Status": "50", "X-Bapi-Limit": "100"}),
+    ]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return responses.pop(0)
+
+    async def run():
+        limiter = AdaptiveRateLimiter(rate=100.0)
+        client = BybitClient(transport=httpx.MockTransport(handler), limiter=limiter, backoff=0.001)
+        limiter.pause = lambda seconds: None  # don't wait for the reset window in tests
+        try:
+            df = await client.fetch_klines("BTCUSDT", "1m", limit=3)
+        finally:
+            await client.aclose()
+        return df, limiter
+
+    df, limiter = asyncio.run(run())
+    assert len(df) == 3 and not responses
+    assert limiter.rate < 100.0
+
+
+def test_upstream_errors_do_not_switch_the_cached_category():
+    calls = []
+    status = {"linear": 200}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        category = request.url.params["category"]
+        calls.append(category)
+        if category == "linear" and status["linear"] != 200:
+            return httpx.Response(status["linear"], json={})
+        return httpx.Response(200, json={"retCode": 0, "result": {"list": _kline_rows()}})
+
+    async def run():
+        client = BybitClient(transport=httpx.MockTransport(handler), retries=1, backoff=0.001)
+        client.limiter.pause = lambda seconds: None
+        try:
+            await client.fetch_klines("BTCUSDT", "1m", limit=3)
+            status["linear"] = 503
+            try:
+                await client.fetch_klines("BTCUSDT", "1m", limit=3)
+            except httpx.HTTPStatusError:
+                pass
+            else:
+                raise AssertionError("a linear 5xx must not fall back to spot")
+            return client.category_for("BTCUSDT")
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == "linear"
+    assert calls == ["linear", "linear", "linear"]  # first fetch, then the 503 and its retry
@@ -0,0 +1,110 @@
+import asyncio
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.clients.bybit_ws import KlineStream
+from app.clients.fake_bybit_ws import FakeBybitWS
+
+RECORDING = Path(__file__).parent / "data" / "kline_btcusdt_1m.jsonl"
+
+
+def _confirmed_bars():
+    bars = []
+    for line in RECORDING.read_text().splitlines():
+        k = json.loads(line)["data"][0]
+        if k["confirm"]:
+            bars.append(k)
+    return bars
+
+
+class RestClient:
+    """Serves the recording's confirmed bars plus an open one, like the kline REST endpoint."""
+
+    def __init__(self, bars):
+        self.bars = bars
+        self.calls = []
+
+    async def fetch_klines(self, symbol, interval, limit=400, start=None, end=None):
+        self.calls.append(start)
+        rows = [b for b in self.bars if start is None or b["start"] >= start]
+        if start is None:
+            rows = rows[:2]  # history available before the stream starts
+        rows = rows + [dict(rows[-1], start=rows[-1]["start"] + 60_000)] if rows else rows
+        return pd.DataFrame({
+            "open_time": pd.to_datetime([r["start"] for r in rows], unit="ms"),
+            **{c: [float(r[c]) for r in rows] for c in ("open", "high", "low", "close", "volume")},
+        })
+
+
+async def _run_stream(fake: FakeBybitWS, rest: RestClient, until: int):
+    url = await fake.start()
+    closed = []
+
+    async def on_close(symbol, timeframe, df):
+        closed.append((symbol, timeframe, int(df["open_time"][-1]), len(df)))
+
+    stream = KlineStream(["BTCUSDT"], ["1m"], on_close, client=rest, url=url, max_backoff=0.05)
+    stream.start()
+    try:
+        for _ in range(200):
+            if len(stream.buffers[("BTCUSDT", "1m")]) >= until:
+                break
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.05)
+    finally:
+        await stream.stop()
+        await fake.stop()
+    return stream, closed
+
+
+def test_stream_emits_on_every_confirmed_candle():
+    bars = _confirmed_bars()
+    stream, closed = asyncio.run(_run_stream(FakeBybitWS.from_file(RECORDING), RestClient(bars), until=len(bars)))
+    buf = stream.buffers[("BTCUSDT", "1m")]
+    assert buf.window()["open_time"].tolist() == [b["start"] for b in bars]
+    assert [c[2] for c in closed] == [b["start"] for b in bars[2:]]  # first two came from REST history
+    assert stream.frame("BTCUSDT", "1m")["close"].iloc[-1] == float(bars[-1]["close"])
+
+
+def test_reconnect_fills_the_gap_from_rest():
+    bars = _confirmed_bars()
+    rest = RestClient(bars)
+    fake = FakeBybitWS.from_file(RECORDING, drop_after=10)
+    stream, closed = asyncio.run(_run_stream(fake, rest, until=len(bars)))
+    assert fake.connections >= 2 and stream.reconnects >= 1
+    assert any(start is not None for start in rest.calls)  # gap-fill asked only for bars after the last one
+    assert stream.buffers[("BTCUSDT", "1m")].window()["open_time"].tolist() == [b["start"] for b in bars]
+
+
+def test_long_outage_is_paged_in_without_holes():
+    minute, now = 60_000, 5000  # index of the bar still open on the exchange
+
+    class PagedRest:
+        # newest `limit` bars of [start, end], like Bybit
+        def __init__(self):
+            self.calls = 0
+
+        async def fetch_klines(self, symbol, interval, limit=400, start=None, end=None):
+            self.calls += 1
+            hi = now if end is None else min(now, end // minute)
+            lo = max(hi - limit + 1, 0 if start is None else start // minute)
+            idx = np.arange(lo, hi + 1)
+            return pd.DataFrame({"open_time": pd.to_datetime(idx * minute, unit="ms"), "open": idx * 1.0,
+                                 "high": idx + 1.0, "low": idx - 1.0, "close": idx * 1.0, "volume": 1.0})
+
+    async def on_close(symbol, timeframe, bars):
+        pass
+
+    rest = PagedRest()
+    stream = KlineStream(["BTCUSDT"], ["1m"], on_close, client=rest, history=3000)
+    buf = stream.buffers[("BTCUSDT", "1m")]
+    for i in range(100):
+        buf.update(i * minute, i, i + 1, i - 1, i, 1.0)
+
+    assert asyncio.run(stream._fill_from_rest(("BTCUSDT", "1m")))
+    ot = buf.window()["open_time"] // minute
+    assert ot[-1] == now - 1 and (np.diff(ot) == 1).all()  # every closed bar, the open one left out
+    assert len(ot) == 3000 and rest.calls == 5  # 999 new bars per page
@@ -0,0 +1,117 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from app.services.candle_store import CandleStore, frame_to_columns
+
+MIN = 60_000
+
+
+def _bars(start: int, n: int, close: float = 1.0) -> pd.DataFrame:
+    ot = np.arange(start, start + n) * MIN
+    return pd.DataFrame({
+        "open_time": pd.to_datetime(ot, unit="ms"),
+        "open": close, "high": close + 1, "low": close - 1, "close": close, "volume": 1.0,
+    })
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+        self.now = 600  # index of the currently open bar
+
+    async def fetch_klines(self, symbol, interval, limit=400, start=None, end=None):
+        self.calls.append((limit, start))
+        first = self.now - limit + 1 if start is None else start // MIN
+        return _bars(first, self.now - first + 1, close=float(self.now))
+
+
+def test_incremental_sync_fetches_only_new_bars(tmp_path):
+    store = CandleStore(tmp_path, resync_after=0)
+    client = FakeClient()
+
+    df = asyncio.run(store.get_klines(client, "BTCUSDT", "1m", limit=500))
+    assert len(df) == 500 and client.calls == [(500, None)]
+
+    client.now = 602
+    df = asyncio.run(store.get_klines(client, "BTCUSDT", "1m", limit=500))
+    assert client.calls[-1] == (1000, 600 * MIN)
+    assert len(store.series("BTCUSDT", "1m")) == 502
+    assert df["open_time"].iloc[-1] == pd.Timestamp(602 * MIN, unit="ms")
+    # the bar that was still open on the first sync got overwritten
+    assert df["close"].iloc[-3] == 602.0 and df["close"].iloc[-4] == 600.0
+    assert df["open_time"].is_monotonic_increasing
+
+
+def test_frame_is_a_view_over_the_mapped_columns(tmp_path):
+    store = CandleStore(tmp_path)
+    asyncio.run(store.get_klines(FakeClient(), "ETHUSDT", "1m", limit=100))
+    close = store.series("ETHUSDT", "1m").frame(tail=50)["close"].to_numpy()
+    assert len(close) == 50
+    assert isinstance(close, np.memmap) or isinstance(close.base, np.memmap)
+    assert not close.flags.writeable
+
+
+def test_rewrites_publish_a_new_generation_under_open_readers(tmp_path):
+    store = CandleStore(tmp_path)
+    s = store.series("BTCUSDT", "1m")
+    s.merge(frame_to_columns(_bars(100, 100)))
+    before = s.arrays()
+
+    s.merge(frame_to_columns(_bars(0, 50, close=2.0)))  # older bars: full rewrite
+    assert len(s) == 150 and s.arrays()["open_time"][0] == 0
+    # a reader that mapped the previous generation still sees it whole and aligned
+    assert len(before["open_time"]) == 100 and before["open_time"][0] == 100 * MIN
+    np.testing.assert_array_equal(before["close"], np.full(100, 1.0))
+
+    s.reset(frame_to_columns(_bars(500, 10)))  # shrinks
+    np.testing.assert_array_equal(s.arrays()["open_time"] // MIN, np.arange(500, 510))
+    assert len(before["close"]) == 100
+    # only the current and the previous generation stay on disk
+    assert sorted(p.name for p in s.dir.glob("close*.bin")) == ["close.1.bin", "close.2.bin"]
+
+
+def test_short_history_is_synced_incrementally_and_handed_out_as_copies(tmp_path):
+    class Listing(FakeClient):
+        # listed at bar 0: nothing older exists
+        async def fetch_klines(self, symbol, interval, limit=400, start=None, end=None):
+            df = await super().fetch_klines(symbol, interval, limit, start, end)
+            return df[df["open_time"] >= pd.Timestamp(0, unit="ms")]
+
+    store = CandleStore(tmp_path, resync_after=0)
+    client = Listing()
+    client.now = 120
+    first = asyncio.run(store.get_bars(client, "NEWUSDT", "1m", limit=500))
+    asyncio.run(store.get_bars(client, "NEWUSDT", "1m", limit=500))
+    assert len(first) == 121 and client.calls == [(500, None), (1000, 120 * MIN)]  # no second full fetch
+
+    close = first["close"].copy()
+    client.now = 121  # the open bar moves and is rewritten in the column files
+    asyncio.run(store.get_bars(client, "NEWUSDT", "1m", limit=500))
+    np.testing.assert_array_equal(first["close"], close)
+
+
+def test_api_rejects_unknown_timeframes():
+    import httpx
+    from app.main import app
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as c:
+            return [await c.get(f"/api/{route}?symbol=BTCUSDT&timeframe=..%2Fetc") for route in ("analyze", "fib031", "zones")]
+
+    assert [r.status_code for r in asyncio.run(main())] == [422] * 3
+
+
+def test_api_deep_limits_need_the_token(monkeypatch):
+    import httpx
+    from app import main as api
+
+    monkeypatch.setattr(api, "AUTH_TOKEN", "secret")
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://t") as c:
+            return [await c.get(f"/api/{route}?symbol=BTCUSDT&timeframe=1h&limit=5000")
+                    for route in ("analyze", "fib031", "zones", "scan")]
+
+    assert [r.status_code for r in asyncio.run(main())] == [401] * 4
@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services import executor
+from app.services.executor import LoopLagMonitor, chart_arrays, render_chart, run_cpu
+
+
+def test_loop_lag_monitor_reports_worst_stalls():
+    async def main():
+        mon = LoopLagMonitor(interval=0.01, keep=3, warn_after=10)
+        mon.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # blocks the loop
+        await asyncio.sleep(0.05)
+        offloaded = await run_cpu(time.sleep, 0.2)  # same wait, off the loop
+        await mon.stop()
+        return mon.report(), offloaded
+
+    report, offloaded = asyncio.run(main())
+    assert offloaded is None
+    worst = [w["lag_ms"] for w in report["worst"]]
+    assert len(worst) == 3 and worst == sorted(worst, reverse=True)
+    assert worst[0] >= 150 and worst[1] < 150
+
+
+def test_render_chart_ships_arrays_to_a_worker_process():
+    n = 300
+    close = 100 + np.cumsum(np.random.default_rng(2).normal(0, 1, n))
+    df = pd.DataFrame({"open_time": pd.date_range("2024", periods=n, freq="h"), "open": close, "high": close + 1,
+                       "low": close - 1, "close": close, "volume": 1.0, "ema_fast": close, "stoch_k": close})
+    cols = chart_arrays(df)
+    assert set(cols) == {"open", "high", "low", "close", "ema_fast"} and len(cols["close"]) == 200
+
+    async def main():
+        try:
+            return await render_chart(df, "BTCUSDT", "1h", size="small")
+        finally:
+            executor.shutdown()
+
+    assert asyncio.run(main())[:4] == b"\x89PNG"
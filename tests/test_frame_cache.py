@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from app.indicators.ta import IndicatorParams, compute_indicators
+from app.services.frame_cache import FrameCache
+
+
+def _frame(n=300, start="2024-01-01"):
+    close = 100 + np.cumsum(np.random.default_rng(4).normal(0, 1, n))
+    return pd.DataFrame({"open_time": pd.date_range(start, periods=n, freq="h"), "open": close,
+                         "high": close + 1, "low": close - 1, "close": close, "volume": 1.0})
+
+
+def test_hits_misses_and_new_bar_invalidation():
+    cache = FrameCache()
+    calls = []
+
+    def compute(df, p):
+        calls.append(1)
+        return compute_indicators(df, p)
+
+    df = _frame()
+    a = cache.get_or_compute("BTCUSDT", "1h", df, IndicatorParams(), compute)
+    b = cache.get_or_compute("btcusdt", "1h", df.copy(), IndicatorParams(), compute)
+    assert a is b and len(calls) == 1 and (cache.hits, cache.misses) == (1, 1)
+
+    cache.get_or_compute("BTCUSDT", "1h", df, IndicatorParams(ema_fast=10), compute)  # other params
+    moved = df.copy()
+    moved.loc[moved.index[-1], "close"] += 5  # forming bar moved: not a stale hit
+    cache.get_or_compute("BTCUSDT", "1h", moved, IndicatorParams(), compute)
+    assert len(calls) == 3 and len(cache) == 3
+
+    newer = _frame(start="2024-01-01 01:00")
+    cache.get_or_compute("BTCUSDT", "1h", newer, IndicatorParams(), compute)
+    assert len(cache) == 2  # the new bar dropped both default-params frames of the old bar
+
+
+def test_eviction_is_by_bytes():
+    one = compute_indicators(_frame(), IndicatorParams())
+    size = int(one.memory_usage(index=True, deep=False).sum())
+    cache = FrameCache(max_bytes=int(size * 2.5))
+    for sym in ("A", "B", "C"):
+        cache.get_or_compute(sym, "1h", _frame(), IndicatorParams())
+    assert len(cache) == 2 and cache.evictions == 1 and cache.bytes <= cache.max_bytes
+    cache.get_or_compute("C", "1h", _frame(), IndicatorParams())
+    assert cache.stats()["hits"] == 1
+
+
+def test_full_frame_serving_an_outputs_request_is_a_recent_hit():
+    one = compute_indicators(_frame(), IndicatorParams())
+    size = int(one.memory_usage(index=True, deep=False).sum())
+    cache = FrameCache(max_bytes=int(size * 2.5))
+    a = cache.get_or_compute("A", "1h", _frame(), IndicatorParams())
+    cache.get_or_compute("B", "1h", _frame(), IndicatorParams())
+    assert cache.get_or_compute("A", "1h", _frame(), IndicatorParams(), outputs=("atr",)) is a
+    assert cache.hits == 1
+    cache.get_or_compute("C", "1h", _frame(), IndicatorParams())  # evicts B, the least recently used
+    assert cache.get_or_compute("A", "1h", _frame(), IndicatorParams()) is a
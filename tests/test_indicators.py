@@ -5,12 +5,13 @@ from unittest.mock import AsyncMock, patch
 
 from app.indicators.ta import (
     last_cross,
+    crosses,
     compute_indicators,
     compute_fib_031,
     approximate_zones,
     IndicatorParams,
 )
-from app.strategies.rules import _stoch_rsi_divergence, make_signal
+from app.strategies.rules import _stoch_rsi_divergence, divergence_scan, find_pivots, make_signal
 from app.notifiers import telegram
 from app.config import settings
 
@@ -88,4 +89,86 @@ def test_telegram_notification_on_signal():
         # Call the notifier as in scheduler.py
         import asyncio
         asyncio.run(telegram.send_telegram_photo(token, chat_id, png, caption))
-        mock_send.assert_awaited_once_with(token, chat_id, png, caption)
\ No newline at end of file
+        mock_send.assert_awaited_once_with(token, chat_id, png, caption)
+
+def _last_cross_loop(a, b):
+    # reference: the original per-row implementation
+    diff = pd.to_numeric(a - b, errors="coerce")
+    last_dir, prev = 0, diff.iloc[0]
+    for i in range(1, len(diff)):
+        curr = diff.iloc[i]
+        if pd.isna(prev) or pd.isna(curr):
+            prev = curr
+            continue
+        if prev <= 0 and curr > 0:
+            last_dir = 1
+        elif prev >= 0 and curr < 0:
+            last_dir = -1
+        prev = curr
+    return last_dir
+
+
+def test_crosses_ties_and_nan_gaps():
+    fast = pd.Series([1.0, 2.0, 2.0, 3.0, np.nan, 1.0, 2.0, 0.0])
+    slow = pd.Series([2.0, 2.0, 2.0, 2.0, 2.0, 2.0, 2.0, 2.0])
+    idx, dirs = crosses(fast, slow)
+    # moves off an exact tie count (3: 0 -> +1, 7: 0 -> -2); the pairs around the NaN are skipped
+    assert idx.tolist() == [3, 7] and dirs.tolist() == [1, -1]
+    assert last_cross(fast, slow) == -1
+
+    rng = np.random.default_rng(3)
+    a = pd.Series(np.round(rng.normal(size=2000), 1))
+    b = pd.Series(np.round(rng.normal(size=2000), 1))
+    a[rng.integers(0, 2000, 50)] = np.nan
+    assert last_cross(a, b) == _last_cross_loop(a, b)
+
+
+def _find_swings_loop(series, win):
+    # reference: the original per-window implementation
+    s = series.reset_index(drop=True)
+    highs, lows, half = [], [], win // 2
+    for i in range(half, len(s) - half):
+        w = s.iloc[i - half:i + half + 1]
+        if s.iloc[i] == w.max():
+            highs.append(i)
+        if s.iloc[i] == w.min():
+            lows.append(i)
+    return highs, lows
+
+
+def test_pivots_and_divergence_scan_match_reference():
+    rng = np.random.default_rng(11)
+    close = pd.Series(np.round(100 + np.cumsum(rng.normal(size=300)), 0))
+    stoch_k = pd.Series(np.round(rng.random(300), 1))
+    stoch_k[:20] = np.nan
+    for win in (2, 3, 5):
+        highs, lows = find_pivots(close, win)
+        ref_h, ref_l = _find_swings_loop(close, win)
+        assert highs.tolist() == ref_h and lows.tolist() == ref_l
+
+    win, half = 5, 2
+    points, dirs = divergence_scan(close, stoch_k, win=win)
+    assert dirs[-1] == _stoch_rsi_divergence(close, stoch_k, win=win)
+    for n in range(win * 3, 300, 7):
+        known = points <= n - 1 - half
+        expected = int(dirs[known][-1]) if known.any() else 0
+        assert _stoch_rsi_divergence(close[:n], stoch_k[:n], win=win) == expected
+
+
+def test_registry_computes_only_the_requested_subgraph(monkeypatch):
+    from dataclasses import replace
+    from app.indicators import ta
+
+    df = _fake_ohlcv(300)
+    full = compute_indicators(df, IndicatorParams())
+    calls = []
+    rsi = ta.INDICATORS["rsi"]
+    monkeypatch.setitem(ta.INDICATORS, "rsi", replace(rsi, fn=lambda v, p: calls.append(1) or rsi.fn(v, p)))
+
+    part = compute_indicators(df, IndicatorParams(), outputs=["stoch_d", "stoch_k"])
+    assert calls == [1]  # shared by %K and %D
+    assert [c for c in part.columns if c not in df.columns] == ["stoch_k", "stoch_d"]
+    pd.testing.assert_series_equal(part["stoch_d"], full["stoch_d"])
+
+    assert ta.required(["atr"]) == ["atr"]
+    assert "rsi" not in compute_indicators(df, IndicatorParams(), outputs=["macd_signal"]).columns
@@ -0,0 +1,58 @@
+import asyncio
+
+import httpx
+
+from app.clients.bybit_client import AdaptiveRateLimiter, BybitClient
+from app.services.metrics import UPSTREAM_REQUESTS, UPSTREAM_RETRIES, Registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    reg = Registry()
+    h = reg.histogram("stage_seconds", "Stage time.", ("stage",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.1, 0.5, 3.0):
+        h.observe(v, stage="fetch")
+    with h.time(stage="plot"):
+        pass
+    text = reg.render()
+    assert 'stage_seconds_bucket{stage="fetch",le="0.1"} 2' in text  # le is inclusive
+    assert 'stage_seconds_bucket{stage="fetch",le="1.0"} 3' in text
+    assert 'stage_seconds_bucket{stage="fetch",le="+Inf"} 4' in text
+    assert 'stage_seconds_sum{stage="fetch"} 3.65' in text
+    assert 'stage_seconds_count{stage="plot"} 1' in text
+    assert text.endswith("\n") and "# TYPE stage_seconds histogram" in text
+
+
+def test_counters_gauges_and_escaping():
+    reg = Registry()
+    c = reg.counter("calls_total", "Calls.", ("service",))
+    assert reg.counter("calls_total", "Calls.", ("service",)) is c
+    c.inc(service='a"b')
+    c.inc(2, service='a"b')
+    reg.gauge("depth", "Depth.", lambda: {"outbox": 3}, ("queue",))
+    reg.gauge("broken", "Raises.", lambda: 1 / 0)
+    text = reg.render()
+    assert 'calls_total{service="a\\"b"} 3.0' in text
+    assert 'depth{queue="outbox"} 3.0' in text
+    assert "# TYPE broken gauge" in text  # a failing callback leaves the rest of the scrape intact
+
+
+def test_bybit_requests_and_retries_are_counted():
+    responses = [
+        httpx.Response(503, json={}),
+        httpx.Response(200, json={"retCode": 0, "result": {"list": []}}),
+    ]
+    before = (UPSTREAM_REQUESTS.value(service="bybit", status=503), UPSTREAM_REQUESTS.value(service="bybit", status=200),
+              UPSTREAM_RETRIES.value(service="bybit", reason="http_503"))
+
+    async def run():
+        client = BybitClient(transport=httpx.MockTransport(lambda r: responses.pop(0)),
+                             limiter=AdaptiveRateLimiter(rate=1000), backoff=0.001)
+        try:
+            await client.fetch_kline_rows("BTCUSDT", "1m", limit=1)
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+    after = (UPSTREAM_REQUESTS.value(service="bybit", status=503), UPSTREAM_REQUESTS.value(service="bybit", status=200),
+             UPSTREAM_RETRIES.value(service="bybit", reason="http_503"))
+    assert [a - b for a, b in zip(after, before)] == [1, 1, 1]
@@ -0,0 +1,89 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.indicators.ta import IndicatorParams
+from app.strategies import optimize as opt
+from app.strategies.backtest import backtest
+
+
+def _cols(n: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return {
+        "open": close * (1 + rng.normal(0, 0.001, n)),
+        "high": close * (1 + np.abs(rng.normal(0, 0.005, n))),
+        "low": close * (1 - np.abs(rng.normal(0, 0.005, n))),
+        "close": close,
+        "volume": rng.random(n),
+    }
+
+
+SPACE = {"ema_fast": [10, 35], "ema_mid": [30, 75], "macd_fast": [12], "macd_slow": [26],
+         "decision_threshold": [0.5, 1.0]}
+
+
+def test_grid_drops_invalid_and_groups_shared_spans():
+    combos = opt.grid(SPACE)
+    assert len(combos) == 6  # ema_fast=35 / ema_mid=30 is not a valid ordering
+    assert [c["ema_fast"] for c in combos] == sorted(c["ema_fast"] for c in combos)
+    sample = opt.random_combos({**SPACE, "rsi_len": list(range(5, 30))}, 10, seed=1)
+    assert len(sample) == 10 and len({opt.combo_key(c) for c in sample}) == 10
+
+
+def test_evaluate_matches_backtest():
+    history = {"AAA": _cols(1500, 1)}
+    opt._use_local(history)
+    combo = {"ema_fast": 10, "ema_mid": 30, "macd_fast": 12, "macd_slow": 26, "decision_threshold": 0.5}
+    got = opt.evaluate(combo)["stats"]
+    p = IndicatorParams(ema_fast=10, ema_mid=30, macd_fast=12, macd_slow=26)
+    assert got == backtest(pd.DataFrame(history["AAA"]), p, decision_threshold=0.5)["stats"]
+
+
+def test_pool_sweep_checkpoints_and_resumes(tmp_path):
+    history = {"AAA": _cols(800, 1), "BBB": _cols(800, 2)}
+    combos = opt.grid(SPACE)
+    ckpt = tmp_path / "sweep.jsonl"
+    first = opt.optimize(history, combos[:4], ckpt, workers=2, chunk=2)
+    assert len(first) == 4 and len(ckpt.read_text().splitlines()) == 1 + 4  # run header + results
+
+    seen = []
+    full = opt.optimize(history, combos, ckpt, workers=0, progress=lambda d, t: seen.append(d))
+    assert seen[0] == 4 and seen[-1] == len(combos)  # only the remaining two were evaluated
+    assert len(ckpt.read_text().splitlines()) == 1 + len(combos)
+
+    local = {opt.combo_key(r["params"]): r["stats"] for r in opt.optimize(history, combos, workers=0)}
+    for line in ckpt.read_text().splitlines()[1:]:
+        r = json.loads(line)
+        assert r["stats"] == local[opt.combo_key(r["params"])]
+    assert opt.rank(full, min_trades=0)[0]["stats"]["expectancy"] == max(s["expectancy"] for s in local.values())
+
+
+def test_series_cache_is_reused_across_combinations_with_many_symbols():
+    opt._use_local({f"S{i:02d}": _cols(300, i) for i in range(14)})  # the 14 symbols of the default .env
+    combos = [{"ema_fast": 10, "ema_mid": 30, "decision_threshold": t} for t in (0.5, 1.0, 1.5, 2.0)]
+    for c in combos:
+        opt.evaluate(c)
+    # every span is computed once per symbol on the first combination and hit afterwards
+    misses = opt.cache_stats["misses"]
+    assert misses == 14 * 11  # five EMAs, MACD and its signal, RSI, stoch k/d, ATR
+    assert opt.cache_stats["hits"] >= 3 * 14 * 8
+
+
+def test_checkpoint_of_another_run_is_refused(tmp_path):
+    history = {"AAA": _cols(400, 1)}
+    combos = opt.grid(SPACE)[:2]
+    ckpt = tmp_path / "sweep.jsonl"
+    run = {"timeframe": "1h", "bars": 400}
+    opt.optimize(history, combos, ckpt, workers=0, run=run)
+    assert len(opt.optimize(history, combos, ckpt, workers=0, run=run)) == 2  # same run resumes
+
+    with pytest.raises(ValueError):
+        opt.optimize({"BBB": _cols(400, 2)}, combos, ckpt, workers=0, run=run)
+    with pytest.raises(ValueError):
+        opt.optimize(history, combos, ckpt, workers=0, risk_reward=2.0, run=run)
+    with pytest.raises(ValueError):
+        opt.optimize(history, combos, ckpt, workers=0, run={"timeframe": "4h", "bars": 400})
+    assert len(ckpt.read_text().splitlines()) == 1 + 2
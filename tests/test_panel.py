@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from app.indicators.panel import build_panel, compute_panel, make_signal_panel
+from app.indicators.ta import IndicatorParams, compute_indicators
+from app.strategies.rules import make_signal
+
+
+def _frame(n: int, seed: int, offset: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 50 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        "open_time": pd.to_datetime((np.arange(n) + offset) * 900_000, unit="ms"),
+        "open": close + rng.normal(0, 0.2, n),
+        "high": close + np.abs(rng.normal(0, 1, n)),
+        "low": close - np.abs(rng.normal(0, 1, n)),
+        "close": close,
+        "volume": rng.random(n),
+    })
+
+
+def test_panel_matches_per_symbol_pipeline():
+    # the second symbol listed later: its row is NaN-padded at the front
+    frames = {f"S{i}": _frame(300 - 40 * (i % 2), seed=i, offset=40 * (i % 2)) for i in range(6)}
+    params = IndicatorParams(ema_fast=9, ema_mid=21, ema_slow=55, macd_fast=12, macd_slow=26, macd_signal=9)
+    panel = build_panel(frames)
+    ind = compute_panel(panel, params)
+    sigs = make_signal_panel(panel, ind, "15m", params, decision_threshold=0.3)
+
+    for i, (sym, df) in enumerate(frames.items()):
+        batch = compute_indicators(df, params)
+        got = panel.frame(i, ind)
+        assert len(got) == len(df)
+        for col in ind:
+            np.testing.assert_allclose(got[col].to_numpy(), batch[col].to_numpy(), rtol=1e-9, atol=1e-9, equal_nan=True)
+        assert sigs[i] == make_signal(batch, "15m", params, decision_threshold=0.3)
+
+
+def test_symbol_missing_newest_bar_is_evaluated_at_its_own_last_bar():
+    # S1's newest bar has not arrived: its row ends in padding, which must not read as NEUTRAL
+    frames = {"S0": _frame(300, seed=0)}
+    params = IndicatorParams(ema_fast=9, ema_mid=21, ema_slow=55, macd_fast=12, macd_slow=26, macd_signal=9)
+    for n in range(240, 299):
+        frames["S1"] = _frame(300, seed=1).iloc[:n]
+        panel = build_panel(frames)
+        ind = compute_panel(panel, params)
+        sigs = make_signal_panel(panel, ind, "15m", params, decision_threshold=0.3)
+        batch = compute_indicators(frames["S1"], params)
+        assert len(panel.bars(1, ind)) == n
+        assert sigs[1] == make_signal(batch, "15m", params, decision_threshold=0.3)
@@ -0,0 +1,37 @@
+import io
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from app.clients.plot import CHART_SIZES, get_template, plot_chart
+
+
+def _frame(n=250):
+    close = 100 + np.cumsum(np.random.default_rng(1).normal(0, 1, n))
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({"open": open_, "high": np.maximum(open_, close) + 0.5,
+                         "low": np.minimum(open_, close) - 0.5, "close": close,
+                         "ema_fast": close, "ema_mid": close, "ema_slow": close})
+
+
+def test_template_is_reused_and_draws_candles_as_collections():
+    df = _frame()
+    png = plot_chart(df, "BTCUSDT", "1h", zones={"demand": {"low": 95, "high": 96}})
+    tpl = get_template("full")
+    assert png[:8] == b"\x89PNG\r\n\x1a\n"
+    assert Image.open(io.BytesIO(png)).size == (int(11 * 140), int(5.2 * 140))
+    assert len(tpl.wicks.get_segments()) == 200 and len(tpl.bodies.get_paths()) == 200
+    artists = len(tpl.ax.get_children())
+
+    plot_chart(df.drop(columns=["ema_slow"]), "ETHUSDT", "4h")  # no zones, fewer EMAs
+    assert get_template("full") is tpl and len(tpl.ax.get_children()) == artists
+    assert not tpl.zones["demand"][0].get_visible() and not tpl.emas["ema_slow"].get_visible()
+    assert tpl.ax.get_title() == "ETHUSDT · 4h"
+
+
+def test_small_quantized_output():
+    png = plot_chart(_frame(), "BTCUSDT", "1h", size="small", quantize=True)
+    img = Image.open(io.BytesIO(png))
+    (w, h), dpi = CHART_SIZES["small"]
+    assert img.mode == "P" and img.size == (int(w * dpi), int(h * dpi))
@@ -0,0 +1,101 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from app.services.candle_store import CandleStore, frame_to_columns
+from app.services.resample import INTERVAL_MS, ResampledSeries, resample
+
+HOUR = INTERVAL_MS["1h"]
+
+
+def _hourly(n: int, start_ms: int = 1_704_103_200_000) -> pd.DataFrame:  # 2024-01-01 10:00 UTC (mid-day)
+    rng = np.random.default_rng(5)
+    close = 100 + np.cumsum(rng.normal(size=n))
+    return pd.DataFrame({
+        "open_time": pd.to_datetime(start_ms + np.arange(n) * HOUR, unit="ms"),
+        "open": close + rng.normal(size=n), "high": close + 2, "low": close - 2,
+        "close": close, "volume": rng.random(n),
+    })
+
+
+def _pandas_reference(df: pd.DataFrame, rule: str, first_bucket: pd.Timestamp) -> pd.DataFrame:
+    agg = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    ref = df.set_index("open_time").resample(rule, label="left", closed="left").agg(agg)
+    return ref[ref.index >= first_bucket]
+
+
+def test_resample_matches_exchange_buckets():
+    df = _hourly(24 * 30 + 5)  # starts Monday 2024-01-01 10:00 UTC
+    cols = frame_to_columns(df)
+    for target, rule, first_bucket in (("4h", "4h", "2024-01-01 12:00"),
+                                       ("d", "1D", "2024-01-02"),
+                                       ("w", "W-MON", "2024-01-08")):
+        out = resample(cols, "1h", target)
+        ref = _pandas_reference(df, rule, pd.Timestamp(first_bucket))
+        got_index = pd.to_datetime(out["open_time"], unit="ms")
+        assert list(got_index) == list(ref.index)
+        for c in ("open", "high", "low", "close", "volume"):
+            np.testing.assert_allclose(out[c], ref[c].to_numpy())
+
+
+def test_incremental_update_equals_full_rebuild():
+    cols = frame_to_columns(_hourly(500))
+    rs = ResampledSeries("1h", "4h")
+    rs.update({c: v[:300] for c, v in cols.items()})
+    for n in list(range(301, 500, 3)) + [500]:
+        rs.update({c: v[:n] for c, v in cols.items()})
+    full = resample(cols, "1h", "4h")
+    for c in full:
+        np.testing.assert_array_equal(rs.cols[c], full[c])
+    # a missing base bar makes the result inexact
+    holed = {c: np.delete(v, 50) for c, v in cols.items()}
+    assert resample(holed, "1h", "4h") is None
+
+
+def test_store_derives_higher_timeframe_without_fetching_it(tmp_path):
+    base = _hourly(2100)
+    calls = []
+
+    class Client:
+        async def fetch_klines(self, symbol, interval, limit=400, start=None, end=None):
+            calls.append(interval)
+            return base[base["open_time"] >= pd.Timestamp(start, unit="ms")] if start else base.tail(limit)
+
+    store = CandleStore(tmp_path, resync_after=0)
+    store.series("BTCUSDT", "1h").merge(frame_to_columns(base))
+    df = asyncio.run(store.get_klines(Client(), "BTCUSDT", "4h", limit=500))
+    assert calls == ["1h"] and len(df) == 500
+    assert (df["open_time"].dt.hour % 4 == 0).all()
+    # more hourly history than worth paging in (500 weeks): falls back to a direct fetch
+    asyncio.run(store.get_klines(Client(), "BTCUSDT", "w", limit=500))
+    assert calls[-1] == "w"
+
+
+def test_default_500_bar_setup_derives_instead_of_fetching(tmp_path):
+    now_ms = int(pd.Timestamp.now(tz="UTC").timestamp() * 1000)
+    calls = []
+
+    class Client:
+        # bars on the exchange grid, honouring start/end/limit like Bybit; close is the bar's end time
+        async def fetch_klines(self, symbol, interval, limit=400, start=None, end=None):
+            calls.append(interval)
+            step = INTERVAL_MS[interval]
+            hi = min(now_ms, now_ms if end is None else end) // step
+            lo = hi - limit + 1 if start is None else max(-(-start // step), hi - limit + 1)
+            ot = np.arange(lo, hi + 1) * step
+            return pd.DataFrame({"open_time": pd.to_datetime(ot, unit="ms"), "open": ot * 1.0,
+                                 "high": ot + 1.0, "low": ot - 1.0, "close": ot + float(step), "volume": 1.0})
+
+    store = CandleStore(tmp_path, resync_after=60)
+    client = Client()
+    asyncio.run(store.get_bars(client, "BTCUSDT", "15m", limit=500))  # what the scheduler keeps
+    for tf in ("1h", "4h", "d"):
+        bars = asyncio.run(store.get_bars(client, "BTCUSDT", tf, limit=500))
+        assert len(bars) == 500 and (bars["open_time"] % INTERVAL_MS[tf] == 0).all()
+        np.testing.assert_array_equal(bars["close"][:-1], bars["open_time"][:-1] + INTERVAL_MS[tf])
+    assert set(calls) == {"15m", "1h"}  # the base timeframes were paged in, nothing else fetched
+    paged = len(calls)
+    for tf in ("1h", "4h", "d"):
+        asyncio.run(store.get_bars(client, "BTCUSDT", tf, limit=500))
+    assert len(calls) == paged  # the next tick serves them from the stored bars
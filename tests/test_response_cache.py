@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+import numpy as np
+import pandas as pd
+
+import app.services.candle_store as candle_store
+from app.main import app
+from app.services import response_cache
+from app.services.response_cache import FORMING_TTL, ResponseCache, SingleFlight, next_close_ms, response_ttl
+
+
+def test_next_close_follows_exchange_buckets():
+    t = 1717200000000 + 90 * 60_000  # 2024-06-01 01:30 UTC
+    assert next_close_ms("1h", t) == 1717200000000 + 2 * 3_600_000
+    assert next_close_ms("4h", t) == 1717200000000 + 4 * 3_600_000
+    assert next_close_ms("m", t) == 1719792000000  # 2024-07-01
+
+
+def test_identical_requests_share_one_computation_and_revalidate(monkeypatch):
+    n = 300
+    close = 100 + np.cumsum(np.random.default_rng(3).normal(0, 1, n))
+    last = pd.Timestamp.now(tz="UTC").floor("h").tz_localize(None)  # still forming
+    df = pd.DataFrame({"open_time": pd.date_range(end=last, periods=n, freq="h"), "open": close,
+                       "high": close + 1, "low": close - 1, "close": close, "volume": 1.0})
+    fetches = []
+
+    async def fake_klines(symbol, interval, limit=500):
+        fetches.append(symbol)
+        await asyncio.sleep(0.05)
+        return df
+
+    monkeypatch.setattr(candle_store, "get_klines", fake_klines)
+    monkeypatch.setattr(response_cache, "_cache", ResponseCache())
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as c:
+            url = "/api/zones?symbol=BTCUSDT&timeframe=1h"
+            first = await asyncio.gather(*(c.get(url) for _ in range(5)))
+            etag = first[0].headers["etag"]
+            again = await c.get(url, headers={"If-None-Match": etag})
+            other = await c.get("/api/zones?symbol=ETHUSDT&timeframe=1h")
+            return first, again, other
+
+    first, again, other = asyncio.run(main())
+    assert [r.status_code for r in first] == [200] * 5
+    assert len({r.headers["etag"] for r in first}) == 1
+    assert str(int(df["open_time"].iloc[-1].value // 1_000_000)) in first[0].headers["etag"]
+    assert "max-age=" in first[0].headers["cache-control"]
+    assert again.status_code == 304 and again.content == b""
+    assert other.status_code == 200
+    assert fetches == ["BTCUSDT", "ETHUSDT"]
+
+
+def test_ttl_follows_the_last_bar_not_the_clock():
+    hour = 3_600_000
+    now = 1717200000.0 + 90 * 60  # 2024-06-01 01:30 UTC
+    forming = 1717200000000 + hour  # opened 01:00, closes 02:00
+    assert response_ttl("d", forming - hour, now=now) == FORMING_TTL  # the daily bar is still forming
+    assert response_ttl("1h", forming, now=now) == FORMING_TTL
+    assert response_ttl("1h", forming, now=now + 30 * 60 - 2) == 2.0  # capped by the close
+    assert response_ttl("1h", forming - hour, now=now) == 0.0  # the new bar has not arrived: not cached
+
+
+def test_followers_survive_a_cancelled_leader():
+    flight = SingleFlight()
+    runs = []
+
+    async def slow():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def main():
+        leader = asyncio.create_task(flight.do("k", slow))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flight.do("k", slow)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.gather(*followers), leader.cancelled()
+
+    results, cancelled = asyncio.run(main())
+    assert results == ["ok"] * 3 and cancelled and len(runs) == 2
@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime
+
+import app.scheduler as sch
+from app.indicators.ta import IndicatorParams
+
+
+def test_due_timeframes_shortest_first():
+    tz = sch.TICK_TRIGGER.timezone
+    tfs = ["w", "d", "4h", "2h", "1h", "30m", "15m"]
+    assert sch.due_timeframes(tfs, datetime(2024, 1, 1, 4, 1, 30, tzinfo=tz)) == ["1h", "2h", "4h"]
+    assert sch.due_timeframes(tfs, datetime(2024, 1, 1, 4, 30, tzinfo=tz)) == ["15m", "30m"]
+    assert sch.due_timeframes(tfs, datetime(2024, 1, 1, 4, 7, tzinfo=tz)) == []
+
+
+def test_dispatcher_bounds_concurrency_and_skips_late_jobs(monkeypatch):
+    active, peak, order = 0, 0, []
+
+    async def fake_klines(symbol, timeframe, limit=500):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        order.append(timeframe)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return symbol
+
+    async def fake_eval(frames, timeframe, params):
+        return frames
+
+    monkeypatch.setattr(sch, "get_bars", fake_klines)
+    monkeypatch.setattr(sch, "evaluate_timeframe", fake_eval)
+    monkeypatch.setattr(sch, "due_timeframes", lambda tfs, now: ["1h", "4h"])
+    tz = sch.TICK_TRIGGER.timezone
+    d = sch.Dispatcher([f"S{i}" for i in range(6)], ["4h", "1h"], IndicatorParams(), concurrency=2)
+
+    out = asyncio.run(d.tick(datetime.now(tz)))
+    assert peak == 2 and len(out["1h"]) == 6 and len(out["4h"]) == 6
+    assert order[:6] == ["1h"] * 6  # shorter timeframe is served first
+
+    # a tick processed long after its fire time is past every deadline
+    out = asyncio.run(d.tick(datetime(2020, 1, 1, 4, 1, tzinfo=tz)))
+    assert out == {"1h": {}, "4h": {}} and d.skipped == 12
+
+
+def test_engine_output_is_cached_apart_from_batch_frames(monkeypatch):
+    import numpy as np
+    from app.indicators.buffer import Bars
+    from app.indicators.ta import compute_indicators
+    from app.services import frame_cache
+
+    monkeypatch.setattr(frame_cache, "_cache", frame_cache.FrameCache())
+    n = 1300
+    close = 100 + np.cumsum(np.random.default_rng(3).normal(0, 1, n))
+    bars = Bars({"open_time": np.arange(n, dtype="i8") * 3_600_000, "open": close, "high": close + 1,
+                 "low": close - 1, "close": close, "volume": np.ones(n)})
+    params = IndicatorParams()
+
+    # seeded on an earlier window, the engine's EMAs differ from a batch run on the later one
+    sch.indicators_on_bars("KEYUSDT", "1h", params, bars.tail(600))
+    window = bars.tail(500)
+    sch.indicators_on_bars("KEYUSDT", "1h", params, window)
+    batch = frame_cache.get_frame_cache().get_or_compute("KEYUSDT", "1h", window, params)
+    np.testing.assert_allclose(batch["ema_slow"], compute_indicators(window, params)["ema_slow"], equal_nan=True)
+
+    # more bars than the engine holds: computed in batch, nothing truncated
+    data = sch.indicators_on_bars("KEYUSDT", "1h", params, bars)
+    assert len(data) == n
+    np.testing.assert_allclose(data["ema_slow"], compute_indicators(bars, params)["ema_slow"], equal_nan=True)
@@ -0,0 +1,35 @@
+import json
+import sqlite3
+
+from app.services.signal_state import SignalStateStore, diff_indicators, key
+
+
+def test_writes_are_batched_until_flush(tmp_path):
+    db = tmp_path / "state.db"
+    store = SignalStateStore(str(db), legacy_json=None)
+    for sym in ("BTCUSDT", "ETHUSDT", "SOLUSDT"):
+        store.set(key(sym, "1h"), {"MACD Cross": "BUY"})
+    store.set(key("BTCUSDT", "1h"), {"MACD Cross": "SELL"})
+    assert store.get(key("BTCUSDT", "1h")) == {"MACD Cross": "SELL"}
+    assert sqlite3.connect(db).execute("SELECT COUNT(*) FROM signal_state").fetchone()[0] == 0
+
+    assert store.flush() == 3
+    assert store.flush() == 0
+    store.close()
+
+    again = SignalStateStore(str(db), legacy_json=None)
+    assert again.get(key("BTCUSDT", "1h")) == {"MACD Cross": "SELL"}
+    assert len(again.load()) == 3
+    assert sqlite3.connect(db).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_legacy_json_is_imported_once(tmp_path):
+    legacy = tmp_path / "signal_state.json"
+    legacy.write_text(json.dumps({"BTCUSDT::4h": {"EMA 35/75": "BUY"}}))
+    store = SignalStateStore(str(tmp_path / "state.db"), legacy_json=str(legacy))
+    old = store.get("BTCUSDT::4h")
+    assert diff_indicators(old, {"EMA 35/75": "SELL"}) == ["EMA 35/75"]
+    store.close()
+
+    legacy.write_text(json.dumps({"BTCUSDT::4h": {"EMA 35/75": "SELL"}}))
+    assert SignalStateStore(str(tmp_path / "state.db"), legacy_json=str(legacy)).get("BTCUSDT::4h") == {"EMA 35/75": "BUY"}
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from app.indicators.ta import IndicatorParams, compute_indicators
+from app.indicators.stream import IndicatorEngine, INDICATOR_COLS, _Window, get_engine
+
+
+def _ohlcv(n: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        "open_time": pd.to_datetime(np.arange(n) * 3_600_000, unit="ms"),
+        "open": close + rng.normal(0, 0.3, n),
+        "high": close + np.abs(rng.normal(0, 1, n)),
+        "low": close - np.abs(rng.normal(0, 1, n)),
+        "close": close,
+        "volume": rng.random(n),
+    })
+
+
+def _assert_matches_batch(df: pd.DataFrame, out: pd.DataFrame, params: IndicatorParams):
+    batch = compute_indicators(df, params)
+    for col in INDICATOR_COLS:
+        np.testing.assert_allclose(out[col].to_numpy(), batch[col].to_numpy(), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def test_streaming_matches_batch_bar_by_bar():
+    df = _ohlcv(400)
+    params = IndicatorParams()
+    eng = IndicatorEngine(params)
+    eng.seed(df.iloc[:300])
+    for n in range(301, 401):
+        out = eng.sync(df.iloc[:n])
+    _assert_matches_batch(df, eng.frame(), params)
+    assert len(out) == 400
+
+
+def test_open_bar_is_replaced_not_appended():
+    df = _ohlcv(300)
+    params = IndicatorParams(ema_fast=9, ema_mid=21, ema_slow=50)
+    eng = IndicatorEngine(params)
+    provisional = df.copy()
+    provisional.loc[299, ["high", "close"]] = [provisional.loc[299, "high"] + 5, provisional.loc[299, "close"] + 4]
+    eng.sync(provisional)
+    eng.sync(df)
+    assert len(eng) == 300
+    _assert_matches_batch(df, eng.frame(), params)
+
+
+def test_params_change_reseeds():
+    df = _ohlcv(250)
+    a = get_engine("BTCUSDT", "1h", IndicatorParams())
+    a.sync(df)
+    b = get_engine("BTCUSDT", "1h", IndicatorParams(ema_fast=10))
+    assert b is not a and len(b) == 0
+    _assert_matches_batch(df, b.sync(df), IndicatorParams(ema_fast=10))
+
+
+def test_window_matches_pandas_rolling_with_replaced_values():
+    rng = np.random.default_rng(3)
+    x = rng.normal(0, 1, 600)
+    x[rng.random(600) < 0.05] = np.nan
+    for n in (1, 3, 14):
+        w, mins, maxs, means = _Window(n), [], [], []
+        for v in x:
+            w.push(rng.normal(0, 5))  # a provisional value, replaced by the final one
+            w.push(v, replace=True)
+            mins.append(w.min())
+            maxs.append(w.max())
+            means.append(w.mean())
+        r = pd.Series(x).rolling(n)
+        np.testing.assert_array_equal(mins, r.min().to_numpy())
+        np.testing.assert_array_equal(maxs, r.max().to_numpy())
+        np.testing.assert_allclose(means, r.mean().to_numpy(), rtol=1e-12, atol=1e-12, equal_nan=True)
@@ -0,0 +1,63 @@
+import asyncio
+
+import app.scheduler as sch
+from app.services.subscribers import SubscriberRegistry, Subscription
+
+
+def test_inverted_index_matches_filters_and_wildcards(tmp_path):
+    path = str(tmp_path / "subs.json")
+    reg = SubscriberRegistry(path)
+    anyone = reg.add(Subscription("telegram", "1"))
+    btc_macd = reg.add(Subscription("telegram", "2", symbols=["btcusdt"], indicators=["MACD Cross"]))
+    sells_4h = reg.add(Subscription("webhook", "https://x.test/hook", timeframes=["4h"], sides=["SELL"]))
+
+    def ids(subs):
+        return {s.id for s in subs}
+
+    assert ids(reg.match("BTCUSDT", "1h", [("MACD Cross", "BUY")])) == {anyone.id, btc_macd.id}
+    assert ids(reg.match("ETHUSDT", "4h", [("EMA 35/75", "SELL")])) == {anyone.id, sells_4h.id}
+    assert ids(reg.match("BTCUSDT", "4h", [("EMA 35/75", "BUY"), ("MACD Cross", "SELL")])) == {anyone.id, btc_macd.id, sells_4h.id}
+
+    assert reg.remove(anyone.id) and not reg.remove(anyone.id)
+    reloaded = SubscriberRegistry(path)
+    assert len(reloaded) == 2
+    assert ids(reloaded.match("ETHUSDT", "1h", [("MACD Cross", "BUY")])) == set()
+
+
+def test_deliver_renders_once_and_fans_out_to_matching_subscribers(tmp_path, monkeypatch):
+    reg = SubscriberRegistry(None)
+    reg.add(Subscription("telegram", "10", indicators=["MACD Cross"]))
+    reg.add(Subscription("telegram", "11", symbols=["BTCUSDT"]))
+    reg.add(Subscription("telegram", "12", sides=["SELL"]))  # does not match a BUY
+    reg.add(Subscription("webhook", "https://x.test/hook", charts=False))
+
+    sent, hooks, renders = [], [], []
+
+    class Outbox:
+        def enqueue_message(self, chat, text):
+            sent.append((chat, "message"))
+
+        def enqueue_photo(self, chat, png, caption):
+            sent.append((chat, png))
+
+    async def render(*a, **kw):
+        renders.append(1)
+        return b"png"
+
+    monkeypatch.setattr(sch, "get_registry", lambda: reg)
+    monkeypatch.setattr(sch, "get_outbox", lambda token: Outbox())
+    monkeypatch.setattr(sch, "enqueue_webhook", lambda url, payload: hooks.append((url, payload["changed"])))
+    monkeypatch.setattr(sch, "render_chart", render)
+    monkeypatch.setattr(sch, "_fib_and_zones", lambda data: (None, None))
+    monkeypatch.setattr(sch, "load_for", lambda s, tf: {"MACD Cross": "NEUTRAL"})
+    monkeypatch.setattr(sch, "save_for", lambda s, tf, ind: None)
+    monkeypatch.setattr(sch.settings, "telegram_bot_token", "T")
+    monkeypatch.setattr(sch.settings, "telegram_chat_id", None)
+
+    sig = {"side": "BUY", "entry": 1.0, "confidence": 0.5,
+           "metadata": {"indicators": {"MACD Cross": "BUY"}, "reasons": []}}
+    asyncio.run(sch._deliver("BTCUSDT", "1h", None, sig))
+
+    assert renders == [1]
+    assert sorted(sent, key=str) == [("10", "message"), ("10", b"png"), ("11", "message"), ("11", b"png")]
+    assert hooks == [("https://x.test/hook", ["MACD Cross"])]
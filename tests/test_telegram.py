@@ -0,0 +1,110 @@
+import asyncio
+import json
+import sqlite3
+
+import httpx
+
+from app.notifiers import telegram
+from app.notifiers.telegram import TelegramOutbox
+
+
+def _outbox(tmp_path, handler, monkeypatch, **kw):
+    monkeypatch.setattr(telegram, "CHAT_RATE", 1000.0)
+    return TelegramOutbox("TOKEN", path=str(tmp_path / "outbox.db"), transport=httpx.MockTransport(handler),
+                          batch_window=0.05, **kw)
+
+
+def test_retry_after_is_honoured_and_item_is_kept_until_delivered(tmp_path, monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(asyncio.get_running_loop().time())
+        if len(calls) == 1:
+            return httpx.Response(429, json={"ok": False, "parameters": {"retry_after": 0.2}})
+        return httpx.Response(200, json={"ok": True})
+
+    async def main():
+        box = _outbox(tmp_path, handler, monkeypatch)
+        box.enqueue_message("42", "BTCUSDT cross")
+        await box.flush(timeout=5)
+        await box.stop()
+        return box
+
+    box = asyncio.run(main())
+    assert box.sent == 1 and len(calls) == 2 and calls[1] - calls[0] >= 0.2
+    assert sqlite3.connect(tmp_path / "outbox.db").execute("SELECT COUNT(*) FROM outbox").fetchone()[0] == 0
+
+
+def test_charts_of_one_tick_go_out_as_one_album(tmp_path, monkeypatch):
+    paths = []
+
+    def handler(request):
+        paths.append(request.url.path.rsplit("/", 1)[-1])
+        if paths[-1] == "sendMediaGroup":
+            body = request.read().decode("latin-1")
+            assert body.count('filename="chart') == 3
+            assert json.loads(body.split('name="media"\r\n\r\n', 1)[1].split("\r\n", 1)[0])[2]["caption"] == "SOL"
+        return httpx.Response(200, json={"ok": True})
+
+    async def main():
+        box = _outbox(tmp_path, handler, monkeypatch)
+        for sym in ("BTC", "ETH", "SOL"):
+            box.enqueue_message("42", sym)
+            box.enqueue_photo("42", b"\x89PNG", sym)
+        await box.flush(timeout=5)
+        await box.stop()
+
+    asyncio.run(main())
+    assert paths == ["sendMessage"] * 3 + ["sendMediaGroup"]
+
+
+def test_undelivered_items_survive_a_restart(tmp_path, monkeypatch):
+    def down(request):
+        return httpx.Response(502)
+
+    up_calls = []
+
+    async def first_run():
+        box = _outbox(tmp_path, down, monkeypatch, backoff=10)
+        box.enqueue_message("42", "kept")
+        await asyncio.sleep(0.1)
+        await box.stop()
+
+    async def second_run():
+        box = _outbox(tmp_path, lambda r: up_calls.append(r) or httpx.Response(200, json={"ok": True}), monkeypatch)
+        box.start()
+        await box.flush(timeout=5)
+        await box.stop()
+        return box
+
+    asyncio.run(first_run())
+    assert asyncio.run(second_run()).sent == 1
+    assert json.loads(up_calls[0].read())["text"] == "kept"
+
+
+def test_rows_of_a_live_worker_are_not_resent_by_another(tmp_path, monkeypatch):
+    sent = {"a": [], "b": []}
+
+    def worker(name, status):
+        return lambda r: sent[name].append(json.loads(r.read())["text"]) or httpx.Response(status, json={"ok": True})
+
+    async def main():
+        a = _outbox(tmp_path, worker("a", 502), monkeypatch, backoff=10)
+        a.start()
+        a.enqueue_message("42", "from a")
+        await asyncio.sleep(0.1)  # a is alive, its item is backing off
+        b = _outbox(tmp_path, worker("b", 200), monkeypatch)
+        b.start()
+        await b.flush(timeout=1)
+        assert sent["b"] == []
+
+        with sqlite3.connect(tmp_path / "outbox.db") as db:  # a stops renewing: its lease runs out
+            db.execute("UPDATE outbox SET lease_until = 0")
+        for item in b._claim():
+            b._put(item)
+        await b.flush(timeout=5)
+        await a.stop()
+        await b.stop()
+
+    asyncio.run(main())
+    assert sent["a"] == ["from a"] and sent["b"] == ["from a"]
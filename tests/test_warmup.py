@@ -0,0 +1,114 @@
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+import app.services.candle_store as candle_store
+from app.indicators.buffer import Bars
+from app.indicators.stream import get_engine
+from app.indicators.ta import IndicatorParams
+from app.main import app
+from app.services import executor
+from app.services.warmup import Readiness, warm_up
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _bars(n: int) -> Bars:
+    close = 100 + np.cumsum(np.random.default_rng(8).normal(0, 1, n))
+    return Bars({"open_time": np.arange(n, dtype="i8") * 3_600_000, "open": close, "high": close + 1,
+                 "low": close - 1, "close": close, "volume": np.ones(n)})
+
+
+def test_importing_the_app_skips_heavy_modules():
+    code = ("import sys, app.main; "
+            "print(','.join(m for m in ('pandas', 'matplotlib', 'apscheduler', 'app.scheduler') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
+
+
+def test_warm_up_preloads_every_series_and_reports_failures(monkeypatch):
+    fetched = []
+
+    async def fake_bars(symbol, interval, limit=500):
+        fetched.append((symbol, interval))
+        if symbol == "BADUSDT":
+            raise RuntimeError("no such symbol")
+        await asyncio.sleep(0.01)
+        return _bars(300)
+
+    monkeypatch.setattr(candle_store, "get_bars", fake_bars)
+    params = IndicatorParams()
+
+    async def main():
+        try:
+            return await warm_up(["warmaUSDT", "BADUSDT"], ["1h", "4h"], params, concurrency=2)
+        finally:
+            executor.shutdown()
+
+    r = asyncio.run(main())
+    assert len(fetched) == 4 and (r.done, r.total) == (4, 4)
+    assert r.ready and "warm" in r.phases
+    assert set(r.failed) == {"BADUSDT 1h", "BADUSDT 4h"}
+    assert len(get_engine("WARMAUSDT", "4h", params)) == 300
+
+
+def test_readiness_is_separate_from_liveness(monkeypatch):
+    monkeypatch.setattr(app.state, "readiness", Readiness())
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as c:
+            health, before = await c.get("/api/health"), await c.get("/api/ready")
+            app.state.readiness.ready = True
+            return health, before, await c.get("/api/ready")
+
+    health, before, after = asyncio.run(main())
+    assert health.status_code == 200 and before.status_code == 503 and after.status_code == 200
+    assert "first_request" in after.json()["seconds"]
+
+
+def test_shutdown_stops_producers_before_closing_what_they_use(monkeypatch):
+    import app.main as main
+    order = []
+
+    class Stream:
+        async def stop(self):
+            order.append("stream")
+
+    class Scheduler:
+        running = True
+
+        def shutdown(self, wait=True):
+            order.append("scheduler")
+
+    class StateStore:
+        def close(self):
+            order.append("state")
+
+    async def closing(name):
+        order.append(name)
+
+    monkeypatch.setattr(main, "close_client", lambda: closing("client"))
+    monkeypatch.setattr(main, "close_outbox", lambda: closing("outbox"))
+    monkeypatch.setattr(main, "close_webhooks", lambda: closing("webhooks"))
+    monkeypatch.setattr(main, "get_state_store", StateStore)
+    monkeypatch.setattr(main, "shutdown_executors", lambda: order.append("executors"))
+    monkeypatch.setattr(app.state, "kline_stream", Stream(), raising=False)
+    monkeypatch.setattr(app.state, "scheduler", Scheduler(), raising=False)
+
+    async def run():
+        async def warm():
+            try:
+                await asyncio.sleep(10)
+            finally:
+                order.append("warmup")
+
+        monkeypatch.setattr(app.state, "warmup", asyncio.create_task(warm()), raising=False)
+        await asyncio.sleep(0)
+        await main._shutdown()
+
+    asyncio.run(run())
+    assert order == ["warmup", "stream", "scheduler", "client", "outbox", "webhooks", "state", "executors"]